@@ -1,27 +1,66 @@
-from azure.ai.inference.aio import ChatCompletionsClient
-from semantic_kernel.connectors.ai.azure_ai_inference import AzureAIInferenceChatCompletion
-from azure.core.credentials import AzureKeyCredential
-from semantic_kernel.connectors.ai import FunctionChoiceBehavior
-from semantic_kernel.functions import KernelArguments
-from semantic_kernel.contents.chat_history import ChatHistory
-from semantic_kernel.connectors.ai.prompt_execution_settings import PromptExecutionSettings
-from semantic_kernel.kernel import Kernel
-from semantic_kernel.contents import ChatHistory
+import asyncio
+import itertools
 import os
-from dotenv import load_dotenv, find_dotenv
-from browser_interaction_plugin import BrowserInteractionPlugin
-from credentials_plugin import CredentialExtractionPlugin
+import sys
+import time
+from typing import TYPE_CHECKING
+from action_trace import ActionTrace, TraceReplayer
+from browser_automation_actions import BrowserAutomationActions
+from llm_scheduler import calls_from, shared_scheduler
+from plan_cache import CachedPlan, PlanCache
+from storage_state import StorageStateStore
+from url_utils import origin_of
 from system_instructions import SYSTEM_INSTRUCTIONS
+from tracing import tracer
+
+# semantic-kernel, the Azure SDK and the plugins take seconds to import; they are
+# loaded by initialize() on first use (or by prewarm()), not when this module is imported.
+if TYPE_CHECKING:
+    from semantic_kernel.filters import AutoFunctionInvocationContext, FunctionInvocationContext
+    from history_manager import HistoryManager
+
+_agent_ids = itertools.count(1)
+
+# Functions whose results are read off the page. The final answer of a run that
+# called one may be built from what the page showed then, so it is not cached.
+_PAGE_DATA_FUNCTIONS = {"get_page_elements", "list_tabs", "visit_pages"}
+
+
+def _usage_tokens(messages: list) -> int:
+    """Total prompt + completion tokens reported on the messages of a turn, including tool-call round trips."""
+    total = 0
+    for message in messages:
+        usage = getattr(message, "metadata", {}).get("usage")
+        if usage is not None:
+            total += (getattr(usage, "prompt_tokens", 0) or 0) + (getattr(usage, "completion_tokens", 0) or 0)
+    return total
 
 
 class BrowserAgentHandler:
 
-    def __init__(self, headless: bool):
+    def __init__(self, headless: bool, browser_automation: BrowserAutomationActions = None,
+                 plan_cache: PlanCache = None, history_manager: "HistoryManager" = None,
+                 chat_completion_service=None, agent_id: str = None, priority: int = 0):
         self.headless = headless
-        self.fetch_keys()
-        self.initialize()
+        # Identity and priority of this agent's model calls in the shared scheduler (lower priority runs first)
+        self.agent_id = agent_id or f"agent-{next(_agent_ids)}"
+        self.priority = priority
+        # Creating the actions is cheap: the browser is launched by the first action or by prewarm()
+        self.browser_automation = browser_automation or BrowserAutomationActions(headless=headless)
+        # Any chat completion service with function calling; Azure AI Inference when None
+        self.chat_completion_service = chat_completion_service
+        self.plan_cache = plan_cache if plan_cache is not None else PlanCache()
+        self.history_manager = history_manager
+        self.kernel = None
+        self.browser_plugin = None
+        self.history = None
+        self.last_trace = None
+        self._function_calls = []
+        self._prewarm = None
 
     def fetch_keys(self):
+        from dotenv import load_dotenv, find_dotenv
+
         dotenv_path = find_dotenv()
         load_dotenv(dotenv_path)
 
@@ -29,45 +68,338 @@ class BrowserAgentHandler:
         self.endpoint = os.environ.get('OPEN_AI_AZURE_ENDPOINT')
         self.model_name = "gpt-4o"
 
+    def _create_chat_service(self):
+        # Every agent of the process shares one client, rate limited by the shared ModelScheduler
+        from pooled_chat_client import shared_chat_service
+
+        self.fetch_keys()
+        return shared_chat_service(self.model_name, self.endpoint, self.KEY, max_tokens=2500, temperature=0)
+
     def initialize(self):
-        self.chat_completion_service = AzureAIInferenceChatCompletion(
-            ai_model_id=self.model_name,
-            client=ChatCompletionsClient(
-                endpoint=self.endpoint,
-                credential=AzureKeyCredential(self.KEY),
-                max_tokens=2500,
-                temperature = 0
-            )
-        )
-        
-        self.kernel = Kernel()
-        self.kernel.add_service(self.chat_completion_service)
-        self.kernel.add_plugin(BrowserInteractionPlugin(headless = self.headless), plugin_name="BrowserInteractionPlugin")
-        self.kernel.add_plugin(CredentialExtractionPlugin(), plugin_name="CredentialExtractionPlugin")
-        
+        """Import the heavy modules and build the chat service, kernel and plugins; only the first call does work."""
+        if self.kernel is not None:
+            return
+        from semantic_kernel.filters import FilterTypes
+        from semantic_kernel.kernel import Kernel
+        from browser_interaction_plugin import BrowserInteractionPlugin
+        from credentials_plugin import CredentialExtractionPlugin
+        from history_manager import HistoryManager
+
+        if self.chat_completion_service is None:
+            self.chat_completion_service = self._create_chat_service()
+        if self.history_manager is None:
+            self.history_manager = HistoryManager()
+
+        kernel = Kernel()
+        kernel.add_service(self.chat_completion_service)
+        self.browser_plugin = BrowserInteractionPlugin(headless = self.headless, browser_automation=self.browser_automation)
+        kernel.add_plugin(self.browser_plugin, plugin_name="BrowserInteractionPlugin")
+        kernel.add_plugin(CredentialExtractionPlugin(), plugin_name="CredentialExtractionPlugin")
+        kernel.add_filter(FilterTypes.AUTO_FUNCTION_INVOCATION, self._record_function_call)
+        kernel.add_filter(FilterTypes.FUNCTION_INVOCATION, self._trace_function)
+        if self.history is None:
+            self.reset_history()
+        # Set last, so that a failed build is retried by the next call
+        self.kernel = kernel
+
+    def start_prewarm(self) -> asyncio.Task:
+        """
+        Start loading the model stack and launching the browser in the background.
+
+        The first interact() waits for the prewarm instead of starting the
+        same work again; calling this is optional.
+        """
+        if self._prewarm is None:
+            self._prewarm = asyncio.ensure_future(self.prewarm())
+        return self._prewarm
+
+    async def prewarm(self) -> bool:
+        """Build the kernel (in a worker thread, since it is mostly imports) while the browser launches."""
+        _, started = await asyncio.gather(asyncio.to_thread(self.initialize), self.browser_automation.start())
+        return started
+
+    async def _ensure_ready(self):
+        if self._prewarm is not None:
+            prewarm, self._prewarm = self._prewarm, None
+            try:
+                await prewarm
+            except Exception as e:
+                # Whatever failed is retried below (and the browser on first use), where its error surfaces
+                print(f"Prewarm failed, initializing on demand: {e}")
+        self.initialize()
+
+    def reset_history(self):
+        """Start a new conversation that only holds the system instructions."""
+        from semantic_kernel.contents import ChatHistory
+
         self.history = ChatHistory()
         self.history.add_system_message(SYSTEM_INSTRUCTIONS)
         
+    async def _record_function_call(self, context: "AutoFunctionInvocationContext", next):
+        """Kernel filter that records each function the model invokes, for the plan cache."""
+        await next(context)
+        function = context.function
+        arguments = {
+            parameter.name: context.arguments[parameter.name]
+            for parameter in function.metadata.parameters
+            if parameter.name in context.arguments
+        }
+        value = context.function_result.value if context.function_result else None
+        self._function_calls.append({
+            "plugin": function.plugin_name,
+            "function": function.name,
+            "arguments": arguments,
+            "result": value,
+        })
+
+    async def _trace_function(self, context: "FunctionInvocationContext", next):
+        """Kernel filter that wraps every function invocation, including the prompt itself, in a span."""
+        from action_result import succeeded
+
+        with tracer.span(f"kernel.{context.function.plugin_name or 'prompt'}.{context.function.name}") as span:
+            await next(context)
+            span.set(ok=succeeded(context.result.value) if context.result else False)
+
+    def _build_plan(self, response: str, tokens: int, latency_ms: float) -> CachedPlan:
+        """
+        Turn the recorded function calls into a replayable plan, or None if the run cannot be cached.
+
+        Failed calls are dropped, since the model retried them differently, and
+        argument values that came from an earlier call's result are stored as
+        references to that call. Runs that read page data are not cached (see
+        _PAGE_DATA_FUNCTIONS).
+        """
+        from action_result import succeeded
+
+        calls = self._function_calls
+        if not calls or not succeeded(calls[-1]["result"]):
+            return None
+        if any(call["function"] in _PAGE_DATA_FUNCTIONS for call in calls):
+            return None
+        plan_calls = []
+        produced = {}
+        for call in calls:
+            if not succeeded(call["result"]):
+                continue
+            arguments = {}
+            for name, value in call["arguments"].items():
+                if isinstance(value, str) and value in produced:
+                    arguments[name] = {"$result_of": produced[value]}
+                else:
+                    arguments[name] = value
+            if isinstance(call["result"], str) and call["result"]:
+                produced.setdefault(call["result"], len(plan_calls))
+            plan_calls.append({"plugin": call["plugin"], "function": call["function"], "arguments": arguments})
+        return CachedPlan(calls=plan_calls, response=response, tokens=tokens, latency_ms=latency_ms)
+
+    async def _replay_plan(self, plan: CachedPlan) -> int:
+        """
+        Invoke a cached plan's function calls directly, stopping at the first failure.
+
+        Returns:
+            Number of calls that succeeded; the whole plan replayed when it equals len(plan.calls)
+        """
+        from semantic_kernel.functions import KernelArguments
+        from action_result import succeeded
+
+        results = []
+        for call in plan.calls:
+            arguments = {
+                name: results[value["$result_of"]] if isinstance(value, dict) and "$result_of" in value else value
+                for name, value in call["arguments"].items()
+            }
+            result = await self.kernel.invoke(
+                plugin_name=call["plugin"], function_name=call["function"], arguments=KernelArguments(**arguments)
+            )
+            value = result.value if result else None
+            if not succeeded(value):
+                break
+            results.append(value)
+        return len(results)
+
+    @staticmethod
+    def _describe_partial_replay(plan: CachedPlan, replayed: int) -> str:
+        """Tell the model which calls of a failed cached plan already ran, and so what state the browser is in."""
+        def describe(call):
+            arguments = ", ".join(
+                f"{name}=<result of step {value['$result_of'] + 1}>" if isinstance(value, dict) else f"{name}={value!r}"
+                for name, value in call["arguments"].items()
+            )
+            return f"{call['function']}({arguments})"
+
+        done = "\n".join(f"{index + 1}. {describe(call)}" for index, call in enumerate(plan.calls[:replayed]))
+        return (f"Note: these browser steps were already carried out for this instruction, and the browser is in "
+                f"the state they left it in:\n{done}\nThe next step, {describe(plan.calls[replayed])}, failed. "
+                f"Continue from the current state.")
+
+    def _current_origin(self) -> str:
+        page = self.browser_automation.page
+        return origin_of(page.url) if page is not None and not page.is_closed() else ""
+
+    @tracer.instrument("agent.interact")
     async def interact(self, query):
-        arguments = KernelArguments(
-            settings=PromptExecutionSettings(
-                function_choice_behavior=FunctionChoiceBehavior.Auto(),
-                parallel_tool_calls=False  # disable parallel/concurrent execution
-            ),
-            chat_history=self.history
+        with calls_from(self.agent_id, self.priority):
+            return await self._interact(query)
+
+    async def _interact(self, query):
+        from semantic_kernel.connectors.ai import FunctionChoiceBehavior
+        from semantic_kernel.connectors.ai.prompt_execution_settings import PromptExecutionSettings
+        from semantic_kernel.functions import KernelArguments
+
+        await self._ensure_ready()
+        self.last_trace = self.browser_automation.begin_trace()
+        origin = self._current_origin()
+
+        plan = self.plan_cache.get(query, origin) if self.plan_cache is not None else None
+        replayed = 0
+        if plan is not None:
+            started = time.perf_counter()
+            with tracer.span("agent.plan_replay") as span:
+                replayed = await self._replay_plan(plan)
+                span.set(ok=replayed == len(plan.calls))
+            if replayed == len(plan.calls):
+                self.plan_cache.record_replay(plan, (time.perf_counter() - started) * 1000)
+                print(f"WebMancer (cached plan):> {plan.response}")
+                self.history.add_message({"role": "user", "content": query})
+                self.history.add_message({"role": "assistant", "content": plan.response})
+                return self.history
+            print("Cached plan failed, asking the model")
+            self.plan_cache.invalidate(query, origin)
+
+        self._function_calls = []
+        if replayed:
+            # The failed replay has already moved the browser on; the model must start from there
+            self.history.add_user_message(f"{query}\n\n{self._describe_partial_replay(plan, replayed)}")
+        else:
+            self.history.add_user_message(query)
+        self.history_manager.compact(self.history)
+        turn_start = len(self.history.messages)
+        started = time.perf_counter()
+        settings = PromptExecutionSettings(
+            function_choice_behavior=FunctionChoiceBehavior.Auto(),
+            parallel_tool_calls=False  # disable parallel/concurrent execution
         )
 
-        result = await self.kernel.invoke_prompt(query, arguments=arguments)
+        # The whole history goes to the model; tool calls and their results are appended to it as they happen
+        with tracer.span("model.invoke_prompt") as span:
+            result = await self.chat_completion_service.get_chat_message_content(
+                chat_history=self.history, settings=settings, kernel=self.kernel, arguments=KernelArguments()
+            )
+            self.history.add_message(result)
+            tokens = _usage_tokens(self.history.messages[turn_start:])
+            span.set(tokens=tokens)
         print(f"WebMancer:> {result}")
 
-        self.history.add_message({
-        "role": "user",
-        "content": query
-        })
-        self.history.add_message({
-        "role": "assistant",
-        "content": str(result)
-        })
+        # After a partial replay the model only did the rest of the work, which is not a plan for the instruction
+        if self.plan_cache is not None and not replayed:
+            plan = self._build_plan(str(result), tokens, (time.perf_counter() - started) * 1000)
+            if plan is not None:
+                self.plan_cache.put(query, origin, plan)
 
         return self.history
 
+    async def ensure_login(self, url: str, identity: str, instruction: str) -> bool:
+        """
+        Make sure the browser is logged in to a site, asking the model to log in only when needed.
+
+        A saved session of the identity is restored first; the login
+        instruction is only sent to the model when there is none or the site
+        rejects it, and the new session is then saved encrypted (see
+        StorageStateStore) for later runs.
+
+        Args:
+            url: A page of the site that requires being logged in
+            identity: Name of the account, e.g. the user name
+            instruction: Instruction that makes the agent log in
+        """
+        if self.browser_automation.storage_states is None:
+            self.browser_automation.storage_states = StorageStateStore()
+
+        async def login() -> bool:
+            await self.interact(instruction)
+            # Judged by the final action, as in BatchRunner: the model may recover from failed attempts
+            return not self.last_trace or self.last_trace.steps[-1].ok
+
+        return await self.browser_automation.start_authenticated(url, identity, login)
+
+    async def replay(self, trace: ActionTrace) -> list[dict]:
+        """
+        Re-run a recorded action trace locally; only steps that fail are sent to the model.
+
+        Args:
+            trace: A trace recorded by a previous interact() call (see last_trace)
+
+        Returns:
+            Per-step replay results from TraceReplayer
+        """
+        async def ask_agent(step):
+            await self.interact(step.describe())
+            # interact() records into a trace of its own; fold it into the replay's and keep recording there
+            fallback_steps = list(self.last_trace)
+            for recorded in fallback_steps:
+                replay_trace.record(recorded)
+            self.browser_automation.trace = replay_trace
+            self.last_trace = replay_trace
+            return not fallback_steps or fallback_steps[-1].ok
+
+        # Record the replay into a trace of its own rather than appending to the one being replayed
+        replay_trace = self.last_trace = self.browser_automation.begin_trace()
+        return await TraceReplayer(self.browser_automation, fallback=ask_agent).replay(trace)
+
+    def history_stats(self) -> dict:
+        """Estimated prompt tokens per turn before and after history compaction."""
+        return self.history_manager.stats() if self.history_manager is not None else {"turns": [], "saved_tokens": 0}
+
+    def browser_stats(self) -> dict:
+        """Launch vs. reuse cost of the browser session behind this agent."""
+        return self.browser_automation.session.stats()
+
+    def action_stats(self) -> dict:
+        """Counts of recorded and failed actions and the most recent errors, from the bounded action log."""
+        log = self.browser_automation.action_log
+        return {**log.stats(), "recent_errors": log.export(limit=10, errors_only=True)}
+
+    def strategy_report(self, origin: str = None) -> list[dict]:
+        """Win rate and cost of each click and fill strategy, globally or for one origin."""
+        return self.browser_automation.strategy_stats.report(origin=origin)
+
+    def model_call_stats(self) -> dict:
+        """
+        Queue wait vs. model latency and per-agent calls of the scheduler this agent's model calls go through.
+
+        Returns None when the agent was given a chat service whose calls are not scheduled.
+        """
+        if self.chat_completion_service is None:
+            # Not built yet; _create_chat_service will use the shared scheduler
+            return shared_scheduler().stats()
+        scheduler = getattr(getattr(self.chat_completion_service, "client", None), "scheduler", None)
+        return scheduler.stats() if scheduler is not None else None
+
+    def trace_stats(self) -> dict:
+        """p50/p95 span latencies per action and per strategy, when tracing is enabled."""
+        return tracer.report()
+
+    async def close(self):
+        """Shut down the browser session owned by this agent, cancelling a prewarm still in progress."""
+        if self._prewarm is not None:
+            prewarm, self._prewarm = self._prewarm, None
+            prewarm.cancel()
+            await asyncio.gather(prewarm, return_exceptions=True)
+        if self.browser_plugin is not None:
+            await self.browser_plugin.close()
+        else:
+            await self.browser_automation.stop()
+
+    @staticmethod
+    async def close_shared_services():
+        """
+        Close the connections the process-wide chat services opened on the running event loop.
+
+        The services outlive any one agent, so this is called once, when the
+        program is done with the loop, rather than by close().
+        """
+        # Only an agent that built its chat service imported the module; without one there is nothing to close
+        pooled_chat_client = sys.modules.get("pooled_chat_client")
+        if pooled_chat_client is not None:
+            await pooled_chat_client.close_shared_chat_services()
+
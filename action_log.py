@@ -0,0 +1,147 @@
+import json
+import time
+from collections import deque
+from enum import Enum
+
+
+class ActionKind(str, Enum):
+    """Browser actions recorded in the action log."""
+    NAVIGATE = "navigate"
+    CLICK = "click"
+    FILL = "fill"
+    TYPE = "type"
+    PRESS = "press"
+
+
+class ActionRecord:
+    """One performed action. Targets are stored already redacted (see ActionLog.record)."""
+    __slots__ = ("kind", "target", "started_at", "elapsed_ms", "ok", "strategy", "error")
+
+    def __init__(self, kind: ActionKind, target: str, started_at: float, elapsed_ms: float, ok: bool,
+                 strategy: str = None, error: str = None):
+        self.kind = kind
+        self.target = target
+        self.started_at = started_at
+        self.elapsed_ms = elapsed_ms
+        self.ok = ok
+        self.strategy = strategy
+        self.error = error
+
+    def describe(self) -> str:
+        """The call this record stands for, in the format of the old command history, e.g. navigate('https://...')."""
+        name = "type_text" if self.kind == ActionKind.TYPE else self.kind.value
+        return f"{name}('{self.target}')"
+
+    def to_dict(self) -> dict:
+        return {
+            "kind": self.kind.value,
+            "target": self.target,
+            "started_at": self.started_at,
+            "elapsed_ms": round(self.elapsed_ms, 2),
+            "ok": self.ok,
+            "strategy": self.strategy,
+            "error": self.error,
+        }
+
+
+def redact_target(kind: ActionKind, target: str) -> str:
+    """
+    The part of an action's target that is safe to keep.
+
+    Typed text is reduced to its length and URLs lose their query and
+    fragment, which often carry tokens; filled values are never passed in.
+    """
+    if target is None:
+        return None
+    if kind == ActionKind.TYPE:
+        return f"<{len(target)} chars>"
+    if kind == ActionKind.NAVIGATE:
+        return target.split("#", 1)[0].split("?", 1)[0]
+    return target
+
+
+class ActionLog:
+    """
+    Fixed-capacity ring buffer of the actions performed by a BrowserAutomationActions.
+
+    The newest ``capacity`` actions are kept, and failed actions are also kept
+    in a separate, smaller ring so that errors are not pushed out by a long
+    run of successful actions. Records are plain slotted objects; nothing is
+    formatted until a snapshot is exported, so recording costs the same
+    however long the process runs.
+    """
+
+    def __init__(self, capacity: int = 256, error_capacity: int = 64):
+        """
+        Initialize the log.
+
+        Args:
+            capacity: Number of most recent actions kept
+            error_capacity: Number of most recent failed actions kept
+        """
+        self.capacity = capacity
+        self.error_capacity = error_capacity
+        self._records = deque(maxlen=capacity)
+        self._errors = deque(maxlen=error_capacity)
+        self.recorded = 0
+        self.failed = 0
+
+    def record(self, kind: ActionKind, target: str, elapsed_ms: float, ok: bool, strategy: str = None,
+               error: str = None, started_at: float = None) -> ActionRecord:
+        """
+        Append an action, dropping the oldest one when the log is full.
+
+        Args:
+            kind: The action performed
+            target: URL, element description, field name, key or typed text; redacted before it is stored
+            elapsed_ms: Duration of the action
+            ok: Whether it succeeded
+            strategy: Strategy that resolved the element (click and fill)
+            error: Error of a failed action
+            started_at: Wall-clock start time; defaults to now minus elapsed_ms
+        """
+        kind = ActionKind(kind)
+        if started_at is None:
+            started_at = time.time() - elapsed_ms / 1000
+        record = ActionRecord(kind, redact_target(kind, target), started_at, elapsed_ms, ok, strategy,
+                              None if ok else error)
+        self._records.append(record)
+        self.recorded += 1
+        if not ok:
+            self._errors.append(record)
+            self.failed += 1
+        return record
+
+    def __len__(self) -> int:
+        return len(self._records)
+
+    def snapshot(self, limit: int = None) -> list[ActionRecord]:
+        """The most recent records, oldest first (all kept records when limit is None)."""
+        records = list(self._records)
+        return records[-limit:] if limit else records
+
+    def errors(self, limit: int = None) -> list[ActionRecord]:
+        """The most recent failed records, oldest first."""
+        records = list(self._errors)
+        return records[-limit:] if limit else records
+
+    def export(self, limit: int = None, errors_only: bool = False) -> list[dict]:
+        """Recent records as JSON-serializable dicts."""
+        return [record.to_dict() for record in (self.errors(limit) if errors_only else self.snapshot(limit))]
+
+    def to_jsonl(self, limit: int = None, errors_only: bool = False) -> str:
+        return "\n".join(json.dumps(entry) for entry in self.export(limit, errors_only))
+
+    def stats(self) -> dict:
+        """Totals since the log was created, including records that have been dropped."""
+        return {
+            "recorded": self.recorded,
+            "failed": self.failed,
+            "kept": len(self._records),
+            "dropped": self.recorded - len(self._records),
+            "capacity": self.capacity,
+        }
+
+    def clear(self):
+        self._records.clear()
+        self._errors.clear()
@@ -0,0 +1,80 @@
+import json
+
+from semantic_kernel.kernel_pydantic import KernelBaseModel
+
+
+class ActionResult(KernelBaseModel):
+    """
+    Outcome of a browser action as returned to the model.
+
+    The model sees the compact JSON form (see __str__), so fields that are
+    not set are left out.
+    """
+    success: bool
+    strategy: str | None = None
+    elapsed_ms: float = 0.0
+    error: str | None = None
+    steps: list[dict] | None = None
+
+    def __bool__(self) -> bool:
+        return self.success
+
+    def __str__(self) -> str:
+        return self.model_dump_json(exclude_none=True)
+
+
+class PageElements(ActionResult):
+    """Interactive elements of the current page, each as [id, role, name, placeholder?] (see DomSnapshotter)."""
+    url: str | None = None
+    title: str | None = None
+    elements: list[list[str]] | None = None
+    removed: list[str] | None = None
+    total: int | None = None
+    truncated: bool | None = None
+    reset: bool | None = None
+
+
+class TabInfo(KernelBaseModel):
+    name: str
+    url: str
+    active: bool
+
+
+class TabList(ActionResult):
+    """The open tabs of the session."""
+    tabs: list[TabInfo] = []
+
+
+class PageVisit(KernelBaseModel):
+    """Text read from one page by visit_pages: the matches of the selector, or the page text."""
+    url: str
+    ok: bool
+    title: str | None = None
+    matches: list[str] | None = None
+    text: str | None = None
+    error: str | None = None
+    elapsed_ms: float = 0.0
+
+
+class PageVisits(ActionResult):
+    """Per-URL results of visit_pages, in the order the URLs were given."""
+    pages: list[PageVisit] = []
+
+
+def succeeded(value) -> bool:
+    """
+    Whether a function result reports success.
+
+    Functions of the browser plugin return an ActionResult; a string holding
+    one in its serialized form is parsed. Anything else only counts as a
+    failure when it is literally False.
+    """
+    if isinstance(value, str):
+        try:
+            value = json.loads(value)
+        except ValueError:
+            return True
+        if isinstance(value, dict) and isinstance(value.get("success"), bool):
+            return value["success"]
+        return value is not False
+    return getattr(value, "success", value) is not False
@@ -0,0 +1,205 @@
+import functools
+import inspect
+import json
+import logging
+import re
+import time
+from dataclasses import asdict, dataclass
+
+from tracing import tracer
+
+# Fill targets whose text must never be written into a trace; replaying them
+# goes back to the agent, which looks the value up again.
+SENSITIVE_FIELD = re.compile(r"pass(word|code)?|secret|token|otp|pin\b|cvv|card", re.IGNORECASE)
+
+# Step argument naming the element of a click or fill. Actions addressing an
+# element some other way (by snapshot id) set last_target to its name, which is
+# stored under this argument so the step replays like a by-name action.
+_TARGET_ARG = {"click": "target", "fill": "field"}
+
+
+@dataclass
+class TraceStep:
+    """One action performed through BrowserAutomationActions."""
+    action: str
+    args: dict
+    selector: str = None
+    strategy: str = None
+    ok: bool = True
+    elapsed_ms: float = 0.0
+    redacted: bool = False
+
+    def describe(self) -> str:
+        """Describe the step as an instruction the agent can carry out on its own."""
+        element = self.args.get(_TARGET_ARG.get(self.action, "")) or f"element {self.args.get('element_id')}"
+        if self.action == "navigate":
+            return f"Go to {self.args['url']}."
+        if self.action == "click":
+            return f"Click on {element}."
+        if self.action == "fill":
+            value = "the appropriate value" if self.redacted else f"'{self.args['text']}'"
+            return f"Fill {element} with {value}."
+        if self.action == "type":
+            return f"Type '{self.args['text']}'."
+        if self.action == "press":
+            return f"Press the {self.args['key']} key."
+        return f"{self.action} {self.args}"
+
+
+class ActionTrace:
+    """Ordered list of TraceSteps that can be saved as JSONL and replayed."""
+
+    def __init__(self, steps: list[TraceStep] = None):
+        self.steps = steps or []
+
+    def record(self, step: TraceStep):
+        self.steps.append(step)
+
+    def __len__(self) -> int:
+        return len(self.steps)
+
+    def __iter__(self):
+        return iter(self.steps)
+
+    def to_jsonl(self) -> str:
+        return "\n".join(json.dumps(asdict(step)) for step in self.steps)
+
+    @classmethod
+    def from_jsonl(cls, text: str) -> "ActionTrace":
+        return cls([TraceStep(**json.loads(line)) for line in text.splitlines() if line.strip()])
+
+    def save(self, path: str):
+        with open(path, "w", encoding="utf-8") as f:
+            f.write(self.to_jsonl())
+
+    @classmethod
+    def load(cls, path: str) -> "ActionTrace":
+        with open(path, encoding="utf-8") as f:
+            return cls.from_jsonl(f.read())
+
+
+def traced(action: str, arg_names: list[str]):
+    """
+    Record calls of a BrowserAutomationActions method into its current trace,
+    its action log and, when tracing is enabled, as an ``action.<name>`` span.
+
+    Args:
+        action: Action name stored in the step (an ActionKind value)
+        arg_names: Parameters of the method that are stored as step arguments; the first is the action's target
+    """
+    def decorator(method):
+        signature = inspect.signature(method)
+
+        @functools.wraps(method)
+        async def wrapper(self, *args, **kwargs):
+            bound = signature.bind(self, *args, **kwargs)
+            step_args = {name: bound.arguments.get(name) for name in arg_names}
+
+            self.last_selector = None
+            self.last_target = None
+            self.last_error = None
+            started_at = time.time()
+            started = time.perf_counter()
+            with tracer.span(f"action.{action}") as span:
+                ok = await method(self, *args, **kwargs)
+                strategy = self.last_strategy if action in ("click", "fill") else None
+                span.set(ok=bool(ok), strategy=strategy)
+            elapsed_ms = (time.perf_counter() - started) * 1000
+            if self.last_target is not None:
+                step_args[_TARGET_ARG[action]] = self.last_target
+            redacted = action == "fill" and bool(SENSITIVE_FIELD.search(step_args.get("field") or ""))
+            if redacted:
+                step_args["text"] = None
+            if self.trace is not None:
+                self.trace.record(TraceStep(
+                    action=action,
+                    args=step_args,
+                    selector=self.last_selector,
+                    strategy=strategy,
+                    ok=bool(ok),
+                    elapsed_ms=elapsed_ms,
+                    redacted=redacted,
+                ))
+            # The log keeps no filled text at all; redacted or not, only the field name goes in
+            target = self.last_target or bound.arguments.get(arg_names[0])
+            self.action_log.record(action, target, elapsed_ms, bool(ok), strategy,
+                                   self.last_error or "Action failed", started_at=started_at)
+            return ok
+        return wrapper
+    return decorator
+
+
+class TraceReplayer:
+    """
+    Re-runs a recorded trace directly through BrowserAutomationActions, without the LLM.
+
+    Clicks and fills use the recorded selector first and the smart resolver
+    second. A step that still fails, or whose value was redacted, is handed
+    to the fallback (normally the agent) on its own; the remaining steps keep
+    replaying locally.
+    """
+
+    def __init__(self, actions, fallback=None):
+        """
+        Initialize the replayer.
+
+        Args:
+            actions: The BrowserAutomationActions to replay on
+            fallback: Async callable taking a TraceStep and returning truthy on success
+        """
+        self.actions = actions
+        self.fallback = fallback
+        self.logger = logging.getLogger(__name__)
+
+    async def _run_step(self, step: TraceStep) -> bool:
+        actions = self.actions
+        if step.redacted:
+            return False
+        if step.action == "navigate":
+            # Also opens the page when the replay starts on a fresh session
+            return await actions.start_and_navigate(step.args["url"])
+        if step.action == "type":
+            return await actions.type_text(step.args["text"])
+        if step.action == "press":
+            return await actions.press_key(step.args["key"])
+        if step.action == "click":
+            if step.selector and await actions.act_on_selector(step.selector, lambda locator, timeout: locator.click(timeout=timeout)):
+                return True
+            return bool(step.args.get("target")) and await actions._smart_click(step.args["target"])
+        if step.action == "fill":
+            text = step.args["text"]
+            if step.selector and await actions.act_on_selector(step.selector, lambda locator, timeout: locator.fill(text, timeout=timeout)):
+                return True
+            return bool(step.args.get("field")) and await actions._smart_fill(step.args["field"], text)
+        raise ValueError(f"Unknown trace action: {step.action}")
+
+    async def replay(self, trace: ActionTrace) -> list[dict]:
+        """
+        Replay every successful step of a trace, stopping at the first step that cannot be completed.
+
+        Returns:
+            Per-step dicts with the action, status ('replayed', 'fallback' or 'failed') and elapsed_ms
+        """
+        results = []
+        # Replayed steps are recorded again; iterate over a copy in case that is into this very trace
+        for step in list(trace.steps):
+            if not step.ok:
+                continue
+            started = time.perf_counter()
+            status = "replayed"
+            try:
+                ok = await self._run_step(step)
+            except Exception as e:
+                self.logger.warning(f"Replaying {step.action} failed: {e}")
+                ok = False
+            if not ok and self.fallback is not None:
+                self.logger.info(f"Falling back to the agent for: {step.describe()}")
+                status = "fallback"
+                ok = bool(await self.fallback(step))
+            if not ok:
+                status = "failed"
+            results.append({"action": step.action, "status": status,
+                            "elapsed_ms": (time.perf_counter() - started) * 1000})
+            if not ok:
+                break
+        return results
@@ -0,0 +1,169 @@
+import argparse
+import asyncio
+import itertools
+import json
+import os
+import sys
+import time
+from dataclasses import asdict
+
+from task_io import TaskLineError, iter_tasks
+
+
+class BatchRunner:
+    """
+    Runs a task file through one agent and streams a result line per task to a JSONL file.
+
+    Tasks are read lazily and results are written and flushed as soon as each
+    task finishes, so memory stays flat however long the input is. After every
+    task a checkpoint records how many tasks are done and how long the output
+    is at that point; a restarted run skips those tasks and truncates any
+    partial line written after the checkpoint, so each task appears exactly
+    once in the output.
+    """
+
+    def __init__(self, agent=None, headless: bool = True, task_timeout: float = 600.0,
+                 reset_history: bool = True):
+        """
+        Initialize the runner.
+
+        Args:
+            agent: BrowserAgentHandler to run the tasks with; one is created on first use when omitted
+            headless: Whether the browser of a created agent runs headless
+            task_timeout: Seconds after which a task is abandoned and recorded as failed
+            reset_history: Start every task with a fresh conversation (tasks are independent)
+        """
+        self.agent = agent
+        self.owns_agent = agent is None
+        self.headless = headless
+        self.task_timeout = task_timeout
+        self.reset_history = reset_history
+
+    @staticmethod
+    def checkpoint_path_for(output_path: str) -> str:
+        return output_path + ".checkpoint"
+
+    @staticmethod
+    def _read_checkpoint(path: str, input_path: str) -> dict:
+        try:
+            with open(path, encoding="utf-8") as f:
+                checkpoint = json.load(f)
+        except (OSError, ValueError):
+            return None
+        return checkpoint if checkpoint.get("input") == os.path.abspath(input_path) else None
+
+    @staticmethod
+    def _write_checkpoint(path: str, checkpoint: dict):
+        tmp_path = f"{path}.tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump(checkpoint, f)
+        os.replace(tmp_path, path)
+
+    async def run_task(self, task_id: str, instruction: str) -> dict:
+        """Run one instruction and describe its outcome, timing and action trace."""
+        if self.agent is None:
+            from BrowserAgentHandler import BrowserAgentHandler
+            self.agent = BrowserAgentHandler(headless=self.headless)
+        if self.reset_history:
+            self.agent.reset_history()
+
+        started_at = time.time()
+        started = time.perf_counter()
+        result = {"task_id": task_id, "instruction": instruction, "ok": False, "output": None, "error": None}
+        try:
+            history = await asyncio.wait_for(self.agent.interact(instruction), timeout=self.task_timeout)
+            trace = list(self.agent.last_trace or [])
+            result["output"] = str(history.messages[-1].content)
+            # The model retries failed actions, so only the last one tells whether the task got done
+            result["ok"] = not trace or trace[-1].ok
+            if not result["ok"]:
+                result["error"] = f"The last browser action ({trace[-1].action}) failed"
+        except asyncio.TimeoutError:
+            trace = list(self.agent.last_trace or [])
+            result["error"] = f"Timed out after {self.task_timeout} seconds"
+        except Exception as e:
+            trace = list(self.agent.last_trace or [])
+            result["error"] = str(e)
+        result.update(
+            started_at=started_at,
+            latency_ms=round((time.perf_counter() - started) * 1000, 1),
+            trace=[asdict(step) for step in trace],
+        )
+        return result
+
+    async def run(self, input_path: str, output_path: str, checkpoint_path: str = None,
+                  resume: bool = True) -> dict:
+        """
+        Run every task of a task file, resuming from the checkpoint of an earlier run if there is one.
+
+        Args:
+            input_path: Task file in the format read by task_io.iter_tasks
+            output_path: JSONL file receiving one result per task
+            checkpoint_path: Checkpoint file; defaults to the output path plus '.checkpoint'
+            resume: Continue an interrupted run instead of starting over
+
+        Returns:
+            Counts of tasks run, succeeded, failed and skipped, and the mean and max latency
+        """
+        checkpoint_path = checkpoint_path or self.checkpoint_path_for(output_path)
+        checkpoint = self._read_checkpoint(checkpoint_path, input_path) if resume else None
+        done = checkpoint["tasks_done"] if checkpoint else 0
+        summary = {"run": 0, "ok": 0, "failed": 0, "skipped": done, "mean_latency_ms": 0.0, "max_latency_ms": 0.0}
+
+        mode = "r+b" if checkpoint and os.path.exists(output_path) else "wb"
+        try:
+            with open(output_path, mode) as output:
+                if mode == "r+b":
+                    # Drop whatever was written after the last checkpoint
+                    output.truncate(checkpoint["output_bytes"])
+                    output.seek(checkpoint["output_bytes"])
+                else:
+                    done = summary["skipped"] = 0
+                for task_id, instruction in itertools.islice(iter_tasks(input_path), done, None):
+                    if isinstance(instruction, TaskLineError):
+                        # Recorded and checkpointed like any failed task, so a resumed run gets past it
+                        result = {"task_id": task_id, "instruction": None, "ok": False, "output": None,
+                                  "error": str(instruction), "started_at": time.time(), "latency_ms": 0.0, "trace": []}
+                    else:
+                        result = await self.run_task(task_id, instruction)
+                    output.write((json.dumps(result, ensure_ascii=False, default=str) + "\n").encode("utf-8"))
+                    output.flush()
+                    done += 1
+                    self._write_checkpoint(checkpoint_path, {"input": os.path.abspath(input_path),
+                                                             "tasks_done": done, "output_bytes": output.tell()})
+
+                    summary["run"] += 1
+                    summary["ok" if result["ok"] else "failed"] += 1
+                    summary["mean_latency_ms"] += (result["latency_ms"] - summary["mean_latency_ms"]) / summary["run"]
+                    summary["max_latency_ms"] = max(summary["max_latency_ms"], result["latency_ms"])
+                    print(f"{'EXECUTED' if result['ok'] else 'FAILED'} TASK {task_id} ({done} done)")
+        finally:
+            if self.owns_agent and self.agent is not None:
+                from BrowserAgentHandler import BrowserAgentHandler
+                await self.agent.close()
+                await BrowserAgentHandler.close_shared_services()
+                self.agent = None
+        return summary
+
+
+def main(argv: list[str] = None) -> int:
+    parser = argparse.ArgumentParser(description="Run a JSONL task file through WebMancer, streaming results to JSONL.")
+    parser.add_argument("tasks", help="Task file: JSON lines with 'instruction' (and optionally 'id') or plain lines")
+    parser.add_argument("output", help="JSONL file receiving one result per task")
+    parser.add_argument("--checkpoint", help="Checkpoint file (default: OUTPUT.checkpoint)")
+    parser.add_argument("--restart", action="store_true", help="Ignore an existing checkpoint and start over")
+    parser.add_argument("--headed", action="store_true", help="Show the browser")
+    parser.add_argument("--task-timeout", type=float, default=600.0, help="Seconds before a task is abandoned")
+    parser.add_argument("--keep-history", action="store_true", help="Carry the conversation over from task to task")
+    args = parser.parse_args(argv)
+
+    runner = BatchRunner(headless=not args.headed, task_timeout=args.task_timeout,
+                         reset_history=not args.keep_history)
+    summary = asyncio.run(runner.run(args.tasks, args.output, checkpoint_path=args.checkpoint,
+                                     resume=not args.restart))
+    print("BATCH: ", summary)
+    return 0 if summary["failed"] == 0 else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,155 @@
+import json
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlsplit
+
+_LAYOUT = """<!DOCTYPE html>
+<html><head><meta charset="utf-8"><title>{title}</title></head>
+<body>{body}</body></html>"""
+
+_LOGIN = """
+<h1>Sign in to Bench</h1>
+<form id="login" onsubmit="event.preventDefault(); location.href = '/dashboard?user=' + encodeURIComponent(this.username.value);">
+    <label for="username">Username or email address</label>
+    <input id="username" name="username" type="text" autocomplete="username">
+    <label for="password">Password</label>
+    <input id="password" name="password" type="password">
+    <input type="submit" value="Sign in">
+</form>
+<a href="/password_reset">Forgot password?</a>
+"""
+
+_SEARCH = """
+<header>
+    <a href="/">Home</a>
+    <input name="q" placeholder="Search or jump to..." aria-label="Search"
+           onkeydown="if (event.key === 'Enter') location.href = '/results?q=' + encodeURIComponent(this.value);">
+    <button onclick="location.href = '/login'">Sign in</button>
+</header>
+"""
+
+_SPA = """
+<nav>
+    <button data-route="home">Home</button>
+    <button data-route="settings">Settings</button>
+    <button data-route="profile">Profile</button>
+</nav>
+<main id="view">Loading…</main>
+<script>
+const view = document.getElementById("view");
+async function render(route) {
+    const data = await (await fetch("/api/route?name=" + route)).json();
+    view.innerHTML = "<h2>" + data.title + "</h2>" + data.items.map(
+        item => "<label>" + item + " <input placeholder='" + item + "'></label>").join("")
+        + "<button>Save " + data.title + "</button>";
+}
+document.querySelectorAll("nav button").forEach(button => button.addEventListener("click", () => {
+    history.pushState({}, "", "/spa/" + button.dataset.route);
+    render(button.dataset.route);
+}));
+render("home");
+</script>
+"""
+
+
+def _large_dom(links: int) -> str:
+    rows = "".join(f'<li><a href="/item/{i}">Link {i}</a> <span>description of item {i}</span></li>'
+                   for i in range(links))
+    return f'<input placeholder="Filter items"><button>Load more</button><ul>{rows}</ul>'
+
+
+def _results(query: str) -> str:
+    names = [f"{query}-python", f"{query}-java", f"{query}-dotnet", f"awesome-{query}"]
+    return _SEARCH + "".join(f'<div class="result"><a href="/repo/{name}">{name}</a></div>' for name in names)
+
+
+class _Handler(BaseHTTPRequestHandler):
+    site = None
+
+    def do_GET(self):
+        url = urlsplit(self.path)
+        query = parse_qs(url.query)
+        path = url.path.rstrip("/") or "/"
+        if path == "/api/route":
+            name = query.get("name", ["home"])[0]
+            time.sleep(self.site.api_delay_ms / 1000)
+            body = json.dumps({"title": name.title(), "items": [f"{name.title()} field {i}" for i in range(3)]})
+            return self._send(body, "application/json")
+        if path == "/login":
+            return self._page("Sign in", _LOGIN)
+        if path == "/dashboard":
+            return self._page("Dashboard", f"<h1>Welcome, {query.get('user', [''])[0]}</h1>" + _SEARCH)
+        if path in ("/", "/search"):
+            return self._page("Bench", _SEARCH)
+        if path == "/results":
+            return self._page("Search results", _results(query.get("q", [""])[0]))
+        if path == "/large":
+            return self._page("Large DOM", _large_dom(self.site.large_links))
+        if path == "/spa" or path.startswith("/spa/"):
+            return self._page("SPA", _SPA)
+        if path.startswith(("/repo/", "/item/", "/password_reset")):
+            return self._page(path.rsplit("/", 1)[-1], f"<h1>{path}</h1>" + _SEARCH)
+        self.send_error(404)
+
+    def _page(self, title: str, body: str):
+        self._send(_LAYOUT.format(title=title, body=body), "text/html; charset=utf-8")
+
+    def _send(self, body: str, content_type: str):
+        data = body.encode("utf-8")
+        self.send_response(200)
+        self.send_header("Content-Type", content_type)
+        self.send_header("Content-Length", str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+    def log_message(self, format, *args):
+        pass
+
+
+class FixtureSite:
+    """
+    Local HTTP server with the synthetic pages the benchmarks run against.
+
+    Pages: /login (label-based login form leading to /dashboard), /search and
+    /results (search box submitted with Enter), /large (thousands of links) and
+    /spa (client-side routes rendered from a delayed JSON endpoint).
+    """
+
+    def __init__(self, large_links: int = 3000, api_delay_ms: int = 50, port: int = 0):
+        """
+        Initialize the site.
+
+        Args:
+            large_links: Number of links on /large
+            api_delay_ms: Delay of the SPA's JSON endpoint, simulating a backend call
+            port: Port to listen on; a free port when 0
+        """
+        self.large_links = large_links
+        self.api_delay_ms = api_delay_ms
+        self.port = port
+        self._server = None
+        self._thread = None
+
+    def start(self) -> "FixtureSite":
+        handler = type("FixtureHandler", (_Handler,), {"site": self})
+        self._server = ThreadingHTTPServer(("127.0.0.1", self.port), handler)
+        self.port = self._server.server_address[1]
+        self._thread = threading.Thread(target=self._server.serve_forever, daemon=True)
+        self._thread.start()
+        return self
+
+    def url(self, path: str = "/") -> str:
+        return f"http://127.0.0.1:{self.port}{path}"
+
+    def stop(self):
+        if self._server is not None:
+            self._server.shutdown()
+            self._server.server_close()
+            self._server = None
+
+    def __enter__(self) -> "FixtureSite":
+        return self.start()
+
+    def __exit__(self, exc_type, exc, tb):
+        self.stop()
@@ -0,0 +1,100 @@
+import argparse
+import asyncio
+import json
+import sys
+import time
+
+from azure.ai.inference.aio import ChatCompletionsClient
+from azure.ai.inference.models import UserMessage
+from azure.core.credentials import AzureKeyCredential
+from azure.core.exceptions import HttpResponseError
+
+from benchmarks.mock_model_endpoint import MockModelEndpoint
+from llm_scheduler import ModelScheduler, calls_from
+from pooled_chat_client import ScheduledChatCompletionsClient
+
+
+async def _agent_calls(client, agent: str, calls: int, priority: int = 0) -> tuple[float, int]:
+    """Make an agent's calls one after another; returns the agent's total time in ms and its failed calls."""
+    failed = 0
+    started = time.perf_counter()
+    with calls_from(agent, priority):
+        for i in range(calls):
+            try:
+                await client.complete(messages=[UserMessage(content=f"{agent} step {i}: click Sign in")], max_tokens=50)
+            except HttpResponseError:
+                failed += 1
+    return (time.perf_counter() - started) * 1000, failed
+
+
+async def run_load(agents: int = 20, calls: int = 10, scheduled: bool = True, latency_ms: int = 100,
+                   endpoint_rpm: int = 600, scheduler_rpm: float = None, concurrency: int = 8,
+                   window_seconds: float = 10.0) -> dict:
+    """
+    Run concurrent agents' model calls against a local rate-limited endpoint.
+
+    Args:
+        agents: Number of agents calling at once
+        calls: Sequential calls per agent
+        scheduled: Share one scheduled client; otherwise every agent has its own client with azure-core retries
+        latency_ms: Latency of the mock endpoint
+        endpoint_rpm: Rate limit of the mock endpoint
+        scheduler_rpm: Request budget of the scheduler; the endpoint's limit when None
+        concurrency: Maximum calls in flight through the scheduler
+        window_seconds: Window the endpoint enforces its limit over
+
+    Returns:
+        Wall time, what the endpoint saw (accepted, throttled, peak concurrency) and the scheduler's metrics
+    """
+    with MockModelEndpoint(latency_ms=latency_ms, requests_per_minute=endpoint_rpm,
+                           window_seconds=window_seconds) as endpoint:
+        credential = AzureKeyCredential("mock-key")
+        scheduler = None
+        if scheduled:
+            # Leave a little headroom below the endpoint's limit
+            scheduler = ModelScheduler(requests_per_minute=scheduler_rpm or endpoint_rpm * 0.9,
+                                       max_concurrency=concurrency)
+            client = ScheduledChatCompletionsClient(endpoint.url(), credential, scheduler=scheduler)
+            clients = [client] * agents
+        else:
+            clients = [ChatCompletionsClient(endpoint.url(), credential) for _ in range(agents)]
+
+        started = time.perf_counter()
+        try:
+            agent_results = await asyncio.gather(*(_agent_calls(clients[i], f"agent-{i}", calls) for i in range(agents)))
+        finally:
+            for client in set(clients):
+                await client.close()
+        elapsed = time.perf_counter() - started
+        return {
+            "mode": "scheduled" if scheduled else "independent",
+            "elapsed_s": round(elapsed, 3),
+            "calls": agents * calls,
+            "failed": sum(failed for _, failed in agent_results),
+            "endpoint": endpoint.stats(),
+            "slowest_agent_ms": round(max(total_ms for total_ms, _ in agent_results), 1),
+            "scheduler": scheduler.stats() if scheduler else None,
+        }
+
+
+def main(argv: list[str] = None) -> int:
+    parser = argparse.ArgumentParser(description="Concurrent agents' model calls against a local rate-limited endpoint.")
+    parser.add_argument("--agents", type=int, default=20)
+    parser.add_argument("--calls", type=int, default=10, help="Sequential calls per agent")
+    parser.add_argument("--latency-ms", type=int, default=100, help="Latency of the mock endpoint")
+    parser.add_argument("--endpoint-rpm", type=int, default=600, help="Rate limit of the mock endpoint")
+    parser.add_argument("--concurrency", type=int, default=8, help="Maximum calls in flight through the scheduler")
+    parser.add_argument("--independent", action="store_true", help="Also run with one unscheduled client per agent")
+    args = parser.parse_args(argv)
+
+    options = dict(agents=args.agents, calls=args.calls, latency_ms=args.latency_ms, endpoint_rpm=args.endpoint_rpm,
+                   concurrency=args.concurrency)
+    reports = [asyncio.run(run_load(scheduled=True, **options))]
+    if args.independent:
+        reports.append(asyncio.run(run_load(scheduled=False, **options)))
+    print(json.dumps(reports, indent=2))
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,128 @@
+import json
+import threading
+import time
+from collections import deque
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+
+class _Handler(BaseHTTPRequestHandler):
+    endpoint = None
+
+    def do_POST(self):
+        body = json.loads(self.rfile.read(int(self.headers.get("Content-Length", 0))) or b"{}")
+        if not self.path.split("?", 1)[0].endswith("/chat/completions"):
+            return self.send_error(404)
+        status, retry_after_ms = self.endpoint._admit()
+        if status != 200:
+            return self._send(status, {"error": {"code": str(status), "message": "Mock endpoint rejected the call"}},
+                              {"retry-after-ms": str(retry_after_ms)} if retry_after_ms else {})
+        try:
+            time.sleep(self.endpoint.latency_ms / 1000)
+            prompt_tokens = len(json.dumps(body.get("messages", []))) // 4
+            completion_tokens = self.endpoint.completion_tokens
+            self._send(200, {
+                "id": "mock",
+                "created": int(time.time()),
+                "model": body.get("model") or "mock",
+                "choices": [{"index": 0, "finish_reason": "stop",
+                             "message": {"role": "assistant", "content": "Done."}}],
+                "usage": {"prompt_tokens": prompt_tokens, "completion_tokens": completion_tokens,
+                          "total_tokens": prompt_tokens + completion_tokens},
+            })
+        finally:
+            self.endpoint._release()
+
+    def _send(self, status: int, payload: dict, headers: dict = None):
+        data = json.dumps(payload).encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(data)))
+        for name, value in (headers or {}).items():
+            self.send_header(name, value)
+        self.end_headers()
+        self.wfile.write(data)
+
+    def log_message(self, format, *args):
+        pass
+
+
+class MockModelEndpoint:
+    """
+    Local stand-in for an Azure AI Inference chat completions endpoint.
+
+    It answers every call with a fixed reply after a simulated latency and
+    enforces a requests-per-minute limit like the real service: calls over
+    the limit get a 429 with a retry-after-ms header. It counts the calls it
+    accepted and throttled and the highest number in flight at once.
+    """
+
+    def __init__(self, latency_ms: int = 200, requests_per_minute: int = None, completion_tokens: int = 20,
+                 window_seconds: float = 60.0, port: int = 0):
+        """
+        Initialize the endpoint.
+
+        Args:
+            latency_ms: Time each accepted call takes
+            requests_per_minute: Calls accepted per minute; unlimited when None
+            completion_tokens: Completion tokens reported in the usage of every reply
+            window_seconds: Length of the sliding window the limit is enforced over (shorter keeps benchmarks fast)
+            port: Port to listen on; a free port when 0
+        """
+        self.latency_ms = latency_ms
+        self.requests_per_minute = requests_per_minute
+        self.completion_tokens = completion_tokens
+        self.window_seconds = window_seconds
+        self.port = port
+        self.accepted = 0
+        self.throttled = 0
+        self.in_flight = 0
+        self.max_in_flight = 0
+        self._window = deque()
+        self._lock = threading.Lock()
+        self._server = None
+        self._thread = None
+
+    def _admit(self) -> tuple[int, int]:
+        with self._lock:
+            now = time.monotonic()
+            while self._window and now - self._window[0] >= self.window_seconds:
+                self._window.popleft()
+            limit = self.requests_per_minute and max(int(self.requests_per_minute * self.window_seconds / 60), 1)
+            if limit and len(self._window) >= limit:
+                self.throttled += 1
+                return 429, int((self.window_seconds - (now - self._window[0])) * 1000) + 1
+            self._window.append(now)
+            self.accepted += 1
+            self.in_flight += 1
+            self.max_in_flight = max(self.max_in_flight, self.in_flight)
+            return 200, None
+
+    def _release(self):
+        with self._lock:
+            self.in_flight -= 1
+
+    def stats(self) -> dict:
+        return {"accepted": self.accepted, "throttled": self.throttled, "max_in_flight": self.max_in_flight}
+
+    def start(self) -> "MockModelEndpoint":
+        handler = type("MockModelHandler", (_Handler,), {"endpoint": self})
+        self._server = ThreadingHTTPServer(("127.0.0.1", self.port), handler)
+        self.port = self._server.server_address[1]
+        self._thread = threading.Thread(target=self._server.serve_forever, daemon=True)
+        self._thread.start()
+        return self
+
+    def url(self) -> str:
+        return f"http://127.0.0.1:{self.port}"
+
+    def stop(self):
+        if self._server is not None:
+            self._server.shutdown()
+            self._server.server_close()
+            self._server = None
+
+    def __enter__(self) -> "MockModelEndpoint":
+        return self.start()
+
+    def __exit__(self, exc_type, exc, tb):
+        self.stop()
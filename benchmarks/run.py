@@ -0,0 +1,305 @@
+import argparse
+import asyncio
+import json
+import os
+import sys
+import time
+import tracemalloc
+
+from benchmarks.fixture_site import FixtureSite
+from benchmarks.scripted_chat import ScriptedChatCompletion
+from BrowserAgentHandler import BrowserAgentHandler
+from browser_automation_actions import BrowserAutomationActions
+from metrics import latency_summary
+from selector_cache import SelectorCache
+
+BASELINE_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "baselines")
+
+_JS_HEAP = "() => performance.memory ? performance.memory.usedJSHeapSize : null"
+
+
+def build_flows(site: FixtureSite) -> dict:
+    """Scripted interact flows against the fixture site, keyed by flow name."""
+    def steps(*items):
+        return [{"action": action, "target": target, "text": text} for action, target, text in items]
+
+    login = [("navigate_to_url", {"url": site.url("/login")}),
+             ("find_and_fill", {"field": "Username or email address", "text": "bench"}),
+             ("find_and_fill", {"field": "Password", "text": "bench-password"}),
+             ("find_and_click", {"text": "Sign in"})]
+    return {
+        "login": {
+            "query": "Sign in to the bench site as bench.",
+            "rounds": [[call] for call in login],
+            "answer": "Signed in as bench.",
+        },
+        "login_batched": {
+            "query": "Sign in to the bench site as bench in one batch.",
+            "rounds": [[("execute_steps", {"steps": steps(
+                ("navigate", site.url("/login"), ""),
+                ("fill", "Username or email address", "bench"),
+                ("fill", "Password", "bench-password"),
+                ("click", "Sign in", ""),
+            )})]],
+            "answer": "Signed in as bench.",
+        },
+        "search": {
+            "query": "Search the bench site for playwright and open playwright-python.",
+            "rounds": [[("navigate_to_url", {"url": site.url("/search")})],
+                       [("find_and_fill", {"field": "Search", "text": "playwright"})],
+                       [("press_key", {"key": "Enter"})],
+                       [("find_and_click", {"text": "playwright-python"})]],
+            "answer": "Opened playwright-python.",
+        },
+        "large_dom": {
+            "query": "Open Link 2500 on the large page.",
+            "rounds": [[("navigate_to_url", {"url": site.url("/large")})],
+                       [("get_page_elements", {})],
+                       [("find_and_click", {"text": "Link 2500"})]],
+            "answer": "Opened Link 2500.",
+        },
+        "spa": {
+            "query": "Fill the first settings field of the single-page app, then open the profile.",
+            "rounds": [[("navigate_to_url", {"url": site.url("/spa")})],
+                       [("find_and_click", {"text": "Settings"})],
+                       [("find_and_fill", {"field": "Settings field 0", "text": "bench"})],
+                       [("find_and_click", {"text": "Profile"})]],
+            "answer": "Opened the profile.",
+        },
+    }
+
+
+# (name, page, action, target) of the direct action benchmarks
+ACTION_CASES = [
+    ("navigate_login", "/login", "navigate", None),
+    ("fill_label", "/login", "fill", "Username or email address"),
+    ("fill_password", "/login", "fill", "Password"),
+    ("click_submit", "/login", "click", "Sign in"),
+    ("fill_placeholder", "/search", "fill", "Search"),
+    ("click_large_dom", "/large", "click", "Link 2500"),
+    ("click_spa_route", "/spa", "click", "Settings"),
+]
+
+
+class ProtocolCounter:
+    """
+    Counts the messages sent to the Playwright driver, i.e. browser round trips.
+
+    Patches the driver connection for as long as it is active; this relies on
+    a private Playwright method and counts nothing if that method is missing.
+    """
+
+    def __init__(self):
+        self.count = 0
+        self._original = None
+
+    def __enter__(self) -> "ProtocolCounter":
+        try:
+            from playwright._impl._connection import Connection
+        except ImportError:
+            return self
+        original = getattr(Connection, "_send_message_to_server", None)
+        if original is None:
+            return self
+
+        def counting(connection, *args, **kwargs):
+            self.count += 1
+            return original(connection, *args, **kwargs)
+
+        self._original = original
+        Connection._send_message_to_server = counting
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        if self._original is not None:
+            from playwright._impl._connection import Connection
+            Connection._send_message_to_server = self._original
+        return False
+
+
+async def _js_heap_kb(actions: BrowserAutomationActions):
+    try:
+        used = await actions.page.evaluate(_JS_HEAP)
+    except Exception:
+        return None
+    return round(used / 1024, 1) if used else None
+
+
+async def bench_actions(actions: BrowserAutomationActions, site: FixtureSite, iterations: int) -> dict:
+    """
+    Time navigate, _smart_click and _smart_fill directly, without the model.
+
+    Clicks and fills are measured cold (empty selector cache, so the resolver
+    runs) and warm (the selector resolved by the cold run is reused).
+    """
+    results = {}
+    for name, path, action, target in ACTION_CASES:
+        timings = {"cold": [], "warm": []}
+        round_trips = {"cold": 0, "warm": 0}
+        failures = 0
+        for _ in range(iterations):
+            for phase in ("cold", "warm"):
+                if phase == "cold":
+                    actions.selector_cache = SelectorCache()
+                if action != "navigate":
+                    await actions.navigate(site.url(path))
+                with ProtocolCounter() as counter:
+                    started = time.perf_counter()
+                    if action == "navigate":
+                        ok = await actions.navigate(site.url(path))
+                    elif action == "click":
+                        ok = await actions._smart_click(target)
+                    else:
+                        ok = await actions._smart_fill(target, "bench")
+                    timings[phase].append((time.perf_counter() - started) * 1000)
+                round_trips[phase] += counter.count
+                failures += not ok
+        results[name] = {
+            phase: {**latency_summary(values), "round_trips": round(round_trips[phase] / iterations, 1)}
+            for phase, values in timings.items()
+        }
+        results[name]["failures"] = failures
+    return results
+
+
+async def bench_flows(actions: BrowserAutomationActions, site: FixtureSite, iterations: int,
+                      model_latency_ms: float) -> dict:
+    """
+    Time full interact() flows driven by the scripted chat service.
+
+    Every iteration uses a fresh agent, so the first interact goes through the
+    model and the second one replays the plan cached by the first.
+    """
+    flows = build_flows(site)
+    service = ScriptedChatCompletion({flow["query"]: flow for flow in flows.values()}, latency_ms=model_latency_ms)
+    results = {}
+    for name, flow in flows.items():
+        interact_ms, replay_ms, steps = [], [], {}
+        model_calls = browser_round_trips = tokens = 0
+        tracemalloc.start()
+        for _ in range(iterations):
+            agent = BrowserAgentHandler(headless=actions.headless, browser_automation=actions,
+                                        chat_completion_service=service)
+            calls_before = service.calls
+            with ProtocolCounter() as counter:
+                started = time.perf_counter()
+                await agent.interact(flow["query"])
+                interact_ms.append((time.perf_counter() - started) * 1000)
+            model_calls += service.calls - calls_before
+            browser_round_trips += counter.count
+            tokens += sum(turn["after"] for turn in agent.history_stats()["turns"])
+            for step in agent.last_trace:
+                steps.setdefault(step.action, []).append(step.elapsed_ms)
+
+            started = time.perf_counter()
+            await agent.interact(flow["query"])
+            replay_ms.append((time.perf_counter() - started) * 1000)
+        _, peak = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+        results[name] = {
+            "interact": latency_summary(interact_ms),
+            "interact_cached_plan": latency_summary(replay_ms),
+            "actions": {action: latency_summary(values) for action, values in steps.items()},
+            "model_round_trips": round(model_calls / iterations, 1),
+            "browser_round_trips": round(browser_round_trips / iterations, 1),
+            "prompt_tokens_estimate": round(tokens / iterations),
+            "python_peak_kb": round(peak / 1024, 1),
+            "js_heap_kb": await _js_heap_kb(actions),
+        }
+    return results
+
+
+async def run_benchmarks(iterations: int = 5, headless: bool = True, model_latency_ms: float = 0.0,
+                         large_links: int = 3000) -> dict:
+    with FixtureSite(large_links=large_links) as site:
+        actions = BrowserAutomationActions(headless=headless, log_level="WARNING")
+        try:
+            with ProtocolCounter() as counter:
+                started = time.perf_counter()
+                await actions.start()
+                startup_ms = (time.perf_counter() - started) * 1000
+            return {
+                "meta": {"iterations": iterations, "model_latency_ms": model_latency_ms, "large_links": large_links},
+                "startup": {"ms": round(startup_ms, 1), "round_trips": counter.count},
+                "actions": await bench_actions(actions, site, iterations),
+                "flows": await bench_flows(actions, site, iterations, model_latency_ms),
+            }
+        finally:
+            await actions.stop()
+
+
+def _flatten(report: dict, prefix: str = "") -> dict:
+    flat = {}
+    for key, value in report.items():
+        path = f"{prefix}.{key}" if prefix else key
+        if isinstance(value, dict):
+            flat.update(_flatten(value, path))
+        elif isinstance(value, (int, float)) and not isinstance(value, bool):
+            flat[path] = value
+    return flat
+
+
+# Metrics compared against a baseline; lower is better for all of them
+_COMPARED_SUFFIXES = ("p50_ms", "p95_ms", "round_trips", "_kb", "tokens_estimate", "startup.ms")
+
+
+def compare(report: dict, baseline: dict, tolerance: float = 0.2, min_delta: float = 1.0) -> list[dict]:
+    """
+    Compare a report with a saved baseline.
+
+    Returns:
+        One entry per compared metric with the baseline and current values and
+        whether it regressed by more than ``tolerance`` (relative) and ``min_delta`` (absolute)
+    """
+    current, previous = _flatten(report), _flatten(baseline)
+    rows = []
+    for path, value in current.items():
+        if not path.endswith(_COMPARED_SUFFIXES) or path not in previous:
+            continue
+        before = previous[path]
+        regressed = value - before > min_delta and value > before * (1 + tolerance)
+        rows.append({"metric": path, "baseline": before, "current": value, "regressed": regressed})
+    return rows
+
+
+def _baseline_path(name: str) -> str:
+    return os.path.join(BASELINE_DIR, f"{name}.json")
+
+
+def main(argv: list[str] = None) -> int:
+    parser = argparse.ArgumentParser(description="Offline WebMancer benchmarks against a local fixture site.")
+    parser.add_argument("--iterations", type=int, default=5)
+    parser.add_argument("--headed", action="store_true", help="Show the browser")
+    parser.add_argument("--model-latency-ms", type=float, default=0.0, help="Simulated latency per model round trip")
+    parser.add_argument("--large-links", type=int, default=3000, help="Number of links on the large-DOM page")
+    parser.add_argument("--output", help="Write the report to this JSON file")
+    parser.add_argument("--save-baseline", metavar="NAME", help="Save the report as benchmarks/baselines/NAME.json")
+    parser.add_argument("--compare", metavar="NAME", help="Compare with benchmarks/baselines/NAME.json")
+    parser.add_argument("--tolerance", type=float, default=0.2, help="Relative slowdown counted as a regression")
+    args = parser.parse_args(argv)
+
+    report = asyncio.run(run_benchmarks(args.iterations, headless=not args.headed,
+                                        model_latency_ms=args.model_latency_ms, large_links=args.large_links))
+    print(json.dumps(report, indent=2))
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump(report, f, indent=2)
+    if args.save_baseline:
+        os.makedirs(BASELINE_DIR, exist_ok=True)
+        with open(_baseline_path(args.save_baseline), "w", encoding="utf-8") as f:
+            json.dump(report, f, indent=2)
+        print(f"Saved baseline {args.save_baseline}")
+
+    if args.compare:
+        with open(_baseline_path(args.compare), encoding="utf-8") as f:
+            rows = compare(report, json.load(f), tolerance=args.tolerance)
+        for row in rows:
+            marker = "REGRESSED" if row["regressed"] else "ok"
+            print(f"{marker:>9}  {row['metric']}: {row['baseline']} -> {row['current']}")
+        if any(row["regressed"] for row in rows):
+            return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
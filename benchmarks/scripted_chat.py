@@ -0,0 +1,69 @@
+import asyncio
+import json
+from typing import ClassVar
+
+from semantic_kernel.connectors.ai.chat_completion_client_base import ChatCompletionClientBase
+from semantic_kernel.connectors.ai.completion_usage import CompletionUsage
+from semantic_kernel.contents import AuthorRole, ChatMessageContent, FunctionCallContent
+
+
+class ScriptedChatCompletion(ChatCompletionClientBase):
+    """
+    Deterministic stand-in for AzureAIInferenceChatCompletion.
+
+    Each script maps a user query to the function calls the model would make,
+    one list of calls per round trip, followed by the final answer. The round
+    is derived from the chat history (tool-call messages after the last user
+    message), so the same query always produces the same conversation.
+    Token usage is estimated from message length and reported like the real
+    service does, so plan-cache and history accounting see realistic numbers.
+    """
+
+    SUPPORTS_FUNCTION_CALLING: ClassVar[bool] = True
+
+    scripts: dict = {}
+    plugin_name: str = "BrowserInteractionPlugin"
+    latency_ms: float = 0.0
+    calls: int = 0
+
+    def __init__(self, scripts: dict, latency_ms: float = 0.0, plugin_name: str = "BrowserInteractionPlugin"):
+        """
+        Initialize the service.
+
+        Args:
+            scripts: Mapping of user query to {"rounds": [[(function, arguments), ...], ...], "answer": str}
+            latency_ms: Simulated model latency added to every round trip
+            plugin_name: Plugin the scripted functions belong to
+        """
+        super().__init__(ai_model_id="scripted", service_id="scripted")
+        self.scripts = scripts
+        self.latency_ms = latency_ms
+        self.plugin_name = plugin_name
+
+    async def _inner_get_chat_message_contents(self, chat_history, settings) -> list[ChatMessageContent]:
+        self.calls += 1
+        if self.latency_ms:
+            await asyncio.sleep(self.latency_ms / 1000)
+
+        messages = chat_history.messages
+        last_user = max((i for i, m in enumerate(messages) if m.role == AuthorRole.USER), default=-1)
+        query = messages[last_user].content.strip() if last_user >= 0 else ""
+        round_index = sum(1 for m in messages[last_user + 1:]
+                          if m.role == AuthorRole.ASSISTANT and any(isinstance(i, FunctionCallContent) for i in m.items))
+        script = self.scripts.get(query)
+        if script is None:
+            reply = ChatMessageContent(role=AuthorRole.ASSISTANT, content=f"No script for: {query}")
+        elif round_index < len(script["rounds"]):
+            reply = ChatMessageContent(role=AuthorRole.ASSISTANT, items=[
+                FunctionCallContent(id=f"call_{round_index}_{n}", plugin_name=self.plugin_name, function_name=function,
+                                    arguments=json.dumps(arguments))
+                for n, (function, arguments) in enumerate(script["rounds"][round_index])
+            ])
+        else:
+            reply = ChatMessageContent(role=AuthorRole.ASSISTANT, content=script["answer"])
+
+        prompt_chars = sum(len(str(m.content or "")) + sum(len(str(i)) for i in m.items) for m in messages)
+        reply_chars = len(reply.content or "") + sum(len(str(i.arguments)) for i in reply.items
+                                                     if isinstance(i, FunctionCallContent))
+        reply.metadata["usage"] = CompletionUsage(prompt_tokens=prompt_chars // 4, completion_tokens=reply_chars // 4 + 1)
+        return [reply]
@@ -0,0 +1,101 @@
+import argparse
+import json
+import os
+import subprocess
+import sys
+
+from metrics import latency_summary
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# Runs in a fresh interpreter, so every phase pays its real cold-start cost
+_PROBE = """
+import asyncio, json, sys, time
+phases = {}
+started = time.perf_counter()
+mark = started
+
+def lap(name):
+    global mark
+    now = time.perf_counter()
+    phases[name] = (now - mark) * 1000
+    mark = now
+
+from BrowserAgentHandler import BrowserAgentHandler
+lap("import")
+agent = BrowserAgentHandler(headless=True)
+lap("construct")
+# A scripted model stands in for Azure, so no keys or network are needed; its import is part of initialize
+from benchmarks.scripted_chat import ScriptedChatCompletion
+agent.chat_completion_service = ScriptedChatCompletion({})
+agent.initialize()
+lap("initialize")
+if sys.argv[1] == "1":
+    async def launch():
+        try:
+            return await agent.browser_automation.start()
+        finally:
+            await agent.close()
+    phases["browser_ok"] = asyncio.run(launch())
+    lap("browser")
+phases["total"] = (time.perf_counter() - started) * 1000
+print(json.dumps(phases))
+"""
+
+PHASES = ["import", "construct", "initialize", "browser", "total"]
+
+
+def probe(browser: bool) -> dict:
+    """Time the startup phases once in a new interpreter."""
+    output = subprocess.run([sys.executable, "-c", _PROBE, "1" if browser else "0"], cwd=ROOT,
+                            capture_output=True, text=True, check=True).stdout
+    return json.loads(output.strip().splitlines()[-1])
+
+
+def slowest_imports(module: str = "BrowserAgentHandler", top: int = 10) -> list[dict]:
+    """The modules with the largest self import time when importing a module, from python -X importtime."""
+    stderr = subprocess.run([sys.executable, "-X", "importtime", "-c", f"import {module}"], cwd=ROOT,
+                            capture_output=True, text=True, check=True).stderr
+    rows = []
+    for line in stderr.splitlines():
+        if not line.startswith("import time:") or "self [us]" in line:
+            continue
+        self_us, cumulative_us, name = (part.strip() for part in line[len("import time:"):].split("|"))
+        rows.append({"module": name, "self_ms": int(self_us) / 1000, "cumulative_ms": int(cumulative_us) / 1000})
+    return sorted(rows, key=lambda row: -row["self_ms"])[:top]
+
+
+def run_startup(runs: int = 5, browser: bool = False) -> dict:
+    """
+    Measure cold startup over several fresh interpreters.
+
+    Returns:
+        Latency summaries per phase (import, construct, initialize, browser, total)
+        and the slowest imports of the agent module
+    """
+    samples = [probe(browser) for _ in range(runs)]
+    report = {phase: latency_summary([sample[phase] for sample in samples if phase in sample])
+              for phase in PHASES if any(phase in sample for sample in samples)}
+    if browser:
+        report["browser_launched"] = all(sample.get("browser_ok") for sample in samples)
+    report["slowest_imports"] = slowest_imports()
+    return report
+
+
+def main(argv: list[str] = None) -> int:
+    parser = argparse.ArgumentParser(description="Measure WebMancer's import and startup time in fresh interpreters.")
+    parser.add_argument("--runs", type=int, default=5)
+    parser.add_argument("--browser", action="store_true", help="Also launch and close the browser")
+    parser.add_argument("--output", help="Write the report to this JSON file")
+    args = parser.parse_args(argv)
+
+    report = run_startup(args.runs, browser=args.browser)
+    print(json.dumps(report, indent=2))
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump(report, f, indent=2)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
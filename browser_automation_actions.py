@@ -1,7 +1,81 @@
+import asyncio
+import re
+import time
+from urllib.parse import urlsplit
+
+from action_log import ActionKind, ActionLog
+from action_trace import ActionTrace, traced
+from browser_session import BrowserSession
+from dom_snapshot import DomSnapshotter
+from element_resolver import CLICK_STRATEGIES, FILL_STRATEGIES, ElementResolver
+from input_policy import InputMode, InputPolicy
+from network_router import NetworkRouter
+from selector_cache import SelectorCache
+from settle import SettleEngine, SettlePolicy
+from storage_state import StorageStateStore
+from strategy_stats import StrategyStats
+from tracing import tracer
+from url_utils import origin_of
+
+_FOCUSED_EDITABLE_JS = """() => {
+    const el = document.activeElement;
+    return !!el && (el.isContentEditable || el.tagName === "TEXTAREA"
+        || (el.tagName === "INPUT" && !el.readOnly && !el.disabled));
+}"""
+
+# Text of the elements matching a selector, or of the whole page when no selector is given.
+_EXTRACT_JS = """({ selector, maxChars, maxMatches }) => {
+    const norm = s => (s || "").replace(/\\s+/g, " ").trim();
+    const textOf = el => norm(el.innerText || el.textContent).slice(0, maxChars);
+    if (selector) {
+        return { title: document.title, matches: Array.from(document.querySelectorAll(selector)).slice(0, maxMatches).map(textOf) };
+    }
+    return { title: document.title, text: document.body ? textOf(document.body) : "" };
+}"""
+
+# Whether the page asks for a password, i.e. is a login form rather than an authenticated page.
+_PASSWORD_PROMPT_JS = """() => Array.from(document.querySelectorAll("input[type=password]")).some(
+    el => el.offsetWidth > 0 || el.offsetHeight > 0 || el.getClientRects().length > 0)"""
+
+# Write saved localStorage items into the current origin.
+_SET_LOCAL_STORAGE_JS = "items => { for (const [k, v] of Object.entries(items)) localStorage.setItem(k, v); }"
+
+# Path of the blank document served locally on an origin to read or write its localStorage
+_STORAGE_DOCUMENT_PATH = "/__webmancer_storage__"
+
+# URL paths of typical login pages; landing on one after restoring a session means it was rejected.
+_LOGIN_PATH = re.compile(r"/(log[-_]?in|sign[-_]?in|session|auth)(\b|/|$)", re.IGNORECASE)
+
+
+async def evaluate_on_origin(page, origin: str, script: str, arg=None):
+    """
+    Load a blank document of an origin into a page, served locally without contacting the site, and evaluate a script in it.
+
+    Used to read, write or clear the origin's storage.
+    """
+    url = origin + _STORAGE_DOCUMENT_PATH
+
+    async def serve(route):
+        await route.fulfill(status=200, content_type="text/html", body="<!DOCTYPE html><title></title>")
+
+    await page.route(url, serve)
+    try:
+        await page.goto(url)
+        return await page.evaluate(script, arg)
+    finally:
+        await page.unroute(url, serve)
+
 
 class BrowserAutomationActions:
+
+    # How long a cached selector may take to become actionable before it is treated as stale
+    CACHED_SELECTOR_TIMEOUT = 1000
     
-    def __init__(self, headless: bool = False, browser_type: str = "chromium", log_level: str = "INFO"):
+    def __init__(self, headless: bool = False, browser_type: str = "chromium", log_level: str = "INFO",
+                 session: BrowserSession = None, context=None, page=None, selector_cache: SelectorCache = None,
+                 input_policy: InputPolicy = None, settle_policy: SettlePolicy = None,
+                 network_router: NetworkRouter = None, strategy_stats: StrategyStats = None,
+                 max_pages: int = 5, storage_states: StorageStateStore = None, action_log: ActionLog = None):
         """
         Initialize the browser automation agent.
         
@@ -9,15 +83,47 @@ class BrowserAutomationActions:
             headless: Whether to run the browser in headless mode
             browser_type: Type of browser to use (chromium, firefox, or webkit)
             log_level: Logging level (DEBUG, INFO, WARNING, ERROR, CRITICAL)
+            session: Shared browser session; a private one is created when omitted
+            context: Existing browser context to act on (owned by the caller, e.g. a context pool)
+            page: Existing page within ``context`` to act on
+            selector_cache: Cache of resolved selectors; an in-memory one is created when omitted
+            input_policy: Typing and key-press speed policy; batched input without delays by default
+            settle_policy: Navigation wait condition and post-action settle timings
+            network_router: Request blocking and caching layer installed on contexts this instance creates
+            strategy_stats: Per-strategy win rates used to order the resolver; an in-memory one is created when omitted
+            max_pages: Maximum number of pages (named tabs plus pages opened by visit_pages) open at once in the context
+            storage_states: Store of saved logins (cookies and localStorage) per origin and identity
+            action_log: Bounded log of recent actions and errors; one keeping the last 256 actions is created when omitted
         """
         self.headless = headless
         self.browser_type = browser_type
+        self.owns_session = session is None
+        self.session = session or BrowserSession(headless=headless, browser_type=browser_type)
+        self.owns_context = context is None
         self.playwright = None
         self.browser = None
-        self.context = None
-        self.page = None
-        self.command_history = []
+        self.context = context
+        self.page = page
+        self.action_log = action_log if action_log is not None else ActionLog()
         self.last_error = None
+        self.last_strategy = None
+        self.last_selector = None
+        self.last_target = None
+        self.trace = ActionTrace()
+        self.resolver = ElementResolver()
+        self.snapshotter = DomSnapshotter()
+        self.selector_cache = selector_cache if selector_cache is not None else SelectorCache()
+        self.input_policy = input_policy or InputPolicy()
+        self.settle = SettleEngine(settle_policy)
+        self.network_router = network_router
+        self.strategy_stats = strategy_stats if strategy_stats is not None else StrategyStats()
+        self.max_pages = max_pages
+        # A page handed in (e.g. by the context pool) is the first tab, as start() would have made it
+        self.tabs = {"main": page} if page is not None else {}
+        self.active_tab = "main" if page is not None else None
+        self.storage_states = storage_states
+        self.last_navigation_stats = None
+        self._start_lock = asyncio.Lock()
         
         # Initialize logger
         import logging
@@ -34,40 +140,70 @@ class BrowserAutomationActions:
             self.logger.addHandler(console_handler)
     
     async def start(self) -> bool:
-        """Start the browser and create a new page."""
-        print("Starting browser...")
-        try:
-            from playwright.async_api import async_playwright
-            
-            self.playwright = await async_playwright().start()
-            browser_options = {
-                "chromium": self.playwright.chromium,
-                "firefox": self.playwright.firefox,
-                "webkit": self.playwright.webkit
-            }
-            
-            if self.browser_type not in browser_options:
-                self.logger.error(f"Unsupported browser type: {self.browser_type}")
-                return False
-                
-            self.browser = await browser_options[self.browser_type].launch(headless=self.headless)
-            self.context = await self.browser.new_context()
-            self.page = await self.context.new_page()
-            self.logger.info(f"Started {self.browser_type} browser {'in headless mode' if self.headless else 'in visible mode'}")
+        """
+        Ensure the browser is running and a page is open.
+
+        The Playwright driver and browser are launched only once per session;
+        later calls reuse the existing context and page. Concurrent calls
+        (e.g. a prewarm and the first action) wait for the same start.
+        """
+        started = time.perf_counter()
+        if self.page is not None and not self.page.is_closed():
+            self.session.record_reuse(time.perf_counter() - started)
             return True
-        except Exception as e:
-            self.last_error = str(e)
-            # self.logger.error(f"Failed to start browser: {e}")
-            return False
+        async with self._start_lock:
+            if self.page is not None and not self.page.is_closed():
+                self.session.record_reuse(time.perf_counter() - started)
+                return True
+            if self.context is not None and self._open_tabs():
+                # Only the active tab was closed: as in close_tab(), the most recently opened open tab takes over
+                self.active_tab = next(reversed(self.tabs))
+                self.page = self.tabs[self.active_tab]
+                self.session.record_reuse(time.perf_counter() - started)
+                return True
+            print("Starting browser...")
+            try:
+                if self.context is None:
+                    self.context = await self.session.new_context()
+                    if self.network_router is not None:
+                        await self.network_router.install(self.context)
+                self.page = await self.context.new_page()
+                self.settle.attach(self.page)
+                self.tabs = {"main": self.page}
+                self.active_tab = "main"
+                self.playwright = self.session.playwright
+                self.browser = self.session.browser
+                self.logger.info(f"Opened page on {self.browser_type} browser")
+                return True
+            except Exception as e:
+                self.last_error = str(e)
+                self.logger.error(f"Failed to start browser: {e}")
+                return False
         
-    async def navigate(self, url: str, timeout: int = 30000, wait_until: str = "load") -> bool:
+    @property
+    def command_history(self) -> list[str]:
+        """Successful navigations and typed text still in the action log, formatted as before (typed text redacted)."""
+        return [record.describe() for record in self.action_log.snapshot()
+                if record.ok and record.kind in (ActionKind.NAVIGATE, ActionKind.TYPE)]
+
+    def begin_trace(self) -> ActionTrace:
+        """Start recording actions into a fresh trace and return it."""
+        self.trace = ActionTrace()
+        return self.trace
+
+    @traced("navigate", ["url"])
+    async def navigate(self, url: str, timeout: int = None, wait_until: str = None) -> bool:
         """
         Navigate to a specified URL.
+
+        By default navigation returns at DOMContentLoaded and the settle engine
+        then waits only as long as requests and DOM mutations are still going on.
         
         Args:
             url: The URL to navigate to
-            timeout: Maximum navigation time in milliseconds
-            wait_until: Navigation wait condition ('load', 'domcontentloaded', 'networkidle', 'commit')
+            timeout: Maximum navigation time in milliseconds; defaults to the settle policy
+            wait_until: Navigation wait condition ('load', 'domcontentloaded', 'networkidle', 'commit');
+                defaults to the settle policy
             
         Returns:
             True if navigation successful, False otherwise
@@ -79,19 +215,27 @@ class BrowserAutomationActions:
                 self.logger.info(f"Added https prefix to URL: {url}")
                 
             self.logger.info(f"Navigating to {url}")
+            policy = self.settle.policy
+            if self.network_router is not None:
+                self.network_router.begin_navigation()
             # Wait for the page navigation to complete with specified wait condition
-            response = await self.page.goto(
-                url, 
-                timeout=timeout,
-                wait_until=wait_until
-            )
+            with tracer.span("playwright.goto", url=url):
+                response = await self.page.goto(
+                    url, 
+                    timeout=policy.navigation_timeout_ms if timeout is None else timeout,
+                    wait_until=wait_until or policy.navigation_wait_until
+                )
+            with tracer.span("settle", action="navigate"):
+                await self.settle.settle(self.page, "navigate")
+            if self.network_router is not None:
+                self.last_navigation_stats = dict(self.network_router.navigation_stats)
+                self.logger.info(f"Network savings for {url}: {self.last_navigation_stats}")
             
             # Check if navigation was successful
             if response:
                 status = response.status
                 if 200 <= status < 400:
                     self.logger.info(f"Successfully navigated to {url} (status {status})")
-                    self.command_history.append(f"navigate('{url}')")
                     return True
                 else:
                     self.last_error = f"Navigation returned status code {status}"
@@ -108,22 +252,120 @@ class BrowserAutomationActions:
             return False
     
     async def stop(self) -> bool:
-        """Close the browser and stop the playwright instance."""
+        """Close the context and, if this instance owns the session, the browser and playwright."""
         try:
-            if self.browser:
-                await self.browser.close()
-            if self.playwright:
-                await self.playwright.stop()
+            if self.context and self.owns_context:
+                await self.context.close()
+            if self.owns_session:
+                await self.session.close()
+            self.selector_cache.save()
+            self.strategy_stats.save()
             self.logger.info("Browser session stopped")
             return True
         except Exception as e:
             self.last_error = str(e)
             self.logger.error(f"Failed to stop browser: {e}")
             return False
+        finally:
+            self.context = None
+            self.page = None
+            self.tabs = {}
+            self.active_tab = None
+            self.browser = None
+            self.playwright = None
+
+    async def _act_on_cached(self, url: str, action: str, target: str, perform) -> bool:
+        """
+        Try the selector that resolved this target last time.
+
+        The element the selector points at now must have the fingerprint
+        recorded when the target was resolved; otherwise the page has changed
+        underneath a positional path (e.g. a list was re-sorted) and the entry
+        is counted as a miss. Playwright's actionability checks then make sure
+        the element is still attached, visible and (for fills) editable. On
+        any failure the entry is dropped and the caller falls back to
+        resolving the target afresh.
+
+        Args:
+            url: URL of the page the action is performed on
+            action: Action name used in the cache key ('click' or 'fill')
+            target: Description of the element
+            perform: Callable taking (locator, timeout) and returning the action's awaitable
+
+        Returns:
+            True if the cached selector was used successfully, False otherwise
+        """
+        entry = self.selector_cache.get(url, action, target)
+        if entry is None:
+            return False
+        try:
+            current = await self.resolver.fingerprint(self.page, entry["selector"])
+        except Exception as e:
+            self.logger.info(f"Could not check cached selector for '{target}': {e}")
+            current = None
+        if current is None or current != entry.get("fingerprint"):
+            self.logger.info(f"Cached selector for '{target}' no longer matches the element it was resolved to")
+            self.selector_cache.mismatch(url, action, target)
+            return False
+        if await self.act_on_selector(entry["selector"], perform):
+            self.last_strategy = entry["strategy"]
+            return True
+        self.logger.info(f"Cached selector for '{target}' is stale")
+        self.selector_cache.invalidate(url, action, target)
+        return False
+
+    async def act_on_selector(self, selector: str, perform) -> bool:
+        """
+        Perform an action on a previously resolved selector, giving up after CACHED_SELECTOR_TIMEOUT.
+
+        Args:
+            selector: CSS selector of the element
+            perform: Callable taking (locator, timeout) and returning the action's awaitable
+
+        Returns:
+            True if the action succeeded, False otherwise
+        """
+        try:
+            await perform(self.page.locator(selector), self.CACHED_SELECTOR_TIMEOUT)
+            self.last_selector = selector
+            return True
+        except Exception as e:
+            self.logger.info(f"Action on selector '{selector}' failed: {e}")
+            return False
+
+    async def _resolve_target(self, action: str, target: str):
+        """
+        Resolve a click or fill target with the strategy order learned for the current origin.
+
+        If the learned order differs from the default and misses, the target
+        is resolved once more with the full default order, so learning can
+        only cost time, never a match.
+
+        Args:
+            action: 'click' or 'fill'
+            target: Description of the element or field
 
+        Returns:
+            The Resolution, or None if no strategy matched
+        """
+        resolve = self.resolver.resolve_click if action == "click" else self.resolver.resolve_fill
+        default = CLICK_STRATEGIES if action == "click" else FILL_STRATEGIES
+        url = self.page.url
+        order = self.strategy_stats.order(action, url, default)
+        started = time.perf_counter()
+        match = await resolve(self.page, target, order)
+        if match is None and order != default:
+            self.logger.info(f"Learned strategy order missed '{target}', retrying with the full order")
+            order = default
+            match = await resolve(self.page, target, order)
+        self.strategy_stats.record(action, url, order, match.strategy if match else None,
+                                   (time.perf_counter() - started) * 1000)
+        return match
+
+    @traced("click", ["target"])
     async def _smart_click(self, target: str) -> bool:
         """
-        Intelligently find and click a target element using multiple strategies.
+        Intelligently find and click a target element, then wait for the page to settle.
         
         Args:
             target: Description of the element to click
@@ -131,8 +373,77 @@ class BrowserAutomationActions:
         Returns:
             True if click was successful, False otherwise
         """
-        # Sanitize the target string for XPath safety
         print("Smart click", target)
+        mark = self.settle.mark(self.page)
+        clicked = await self._resolve_and_click(target)
+        if clicked:
+            with tracer.span("settle", action="click"):
+                await self.settle.settle(self.page, "click", mark)
+        return clicked
+
+    async def _resolve_and_click(self, target: str) -> bool:
+        """
+        Find and click a target element using multiple strategies.
+
+        All strategies are evaluated page-side in a single round trip by the
+        element resolver; the sequential cascade is only used if the resolver
+        script itself cannot run.
+        
+        Args:
+            target: Description of the element to click
+            
+        Returns:
+            True if click was successful, False otherwise
+        """
+        self.last_strategy = None
+        url = self.page.url
+        with tracer.span("strategy.cached_selector", action="click") as span:
+            cached = await self._act_on_cached(url, "click", target, lambda locator, timeout: locator.click(timeout=timeout))
+            span.set(ok=cached)
+        if cached:
+            self.logger.info(f"Clicked on cached selector for: {target}")
+            return True
+
+        try:
+            with tracer.span("strategy.resolver", action="click") as span:
+                match = await self._resolve_target("click", target)
+                span.set(ok=match is not None, strategy=match.strategy if match else None)
+        except Exception as e:
+            self.logger.info(f"Page-side resolver failed, falling back to strategy cascade: {e}")
+            with tracer.span("strategy.cascade", action="click") as span:
+                done = await self._smart_click_cascade(target)
+                span.set(ok=done, strategy=self.last_strategy)
+            return done
+
+        if match is None:
+            self.last_error = f"Could not find element to click: {target}"
+            self.logger.error(self.last_error)
+            return False
+
+        try:
+            with tracer.span("playwright.click", strategy=match.strategy):
+                await self.page.locator(match.selector).click()
+            self.last_strategy = match.strategy
+            self.last_selector = match.stable_selector
+            self.selector_cache.put(url, "click", target, match.stable_selector, match.strategy, match.fingerprint)
+            self.logger.info(f"Clicked on element matched by {match.strategy}: {target}")
+            return True
+        except Exception as e:
+            self.last_error = str(e)
+            self.logger.error(f"Error while trying to click '{target}': {str(e)}")
+            return False
+
+    async def _smart_click_cascade(self, target: str) -> bool:
+        """
+        Find and click a target element by trying each strategy with its own Playwright calls.
+
+        Args:
+            target: Description of the element to click
+            
+        Returns:
+            True if click was successful, False otherwise
+        """
+        # Sanitize the target string for XPath safety
         safe_target = target.replace("'", "\\'")
         
         # Try to find the element using different strategies
@@ -225,9 +536,64 @@ class BrowserAutomationActions:
             self.logger.error(f"Error while trying to click '{target}': {str(e)}")
             return False
     
+    @traced("fill", ["field", "text"])
     async def _smart_fill(self, field: str, text: str) -> bool:
         """
         Intelligently find and fill a form field.
+
+        Inputs, textareas, contenteditables and their labels are gathered and
+        ranked page-side in a single round trip by the element resolver; the
+        sequential cascade is only used if the resolver script itself cannot run.
+        
+        Args:
+            field: Description of the field to fill
+            text: Text to enter into the field
+                
+        Returns:
+            True if fill was successful, False otherwise
+        """
+        print("Smart fill in field", field)
+        self.last_strategy = None
+        url = self.page.url
+        with tracer.span("strategy.cached_selector", action="fill") as span:
+            cached = await self._act_on_cached(url, "fill", field, lambda locator, timeout: locator.fill(text, timeout=timeout))
+            span.set(ok=cached)
+        if cached:
+            self.logger.info(f"Filled cached selector for field '{field}'")
+            return True
+
+        try:
+            with tracer.span("strategy.resolver", action="fill") as span:
+                match = await self._resolve_target("fill", field)
+                span.set(ok=match is not None, strategy=match.strategy if match else None)
+        except Exception as e:
+            self.logger.info(f"Page-side resolver failed, falling back to strategy cascade: {e}")
+            with tracer.span("strategy.cascade", action="fill") as span:
+                done = await self._smart_fill_cascade(field, text)
+                span.set(ok=done, strategy=self.last_strategy)
+            return done
+
+        if match is None:
+            self.last_error = f"Could not find field to fill: {field}"
+            self.logger.error(self.last_error)
+            return False
+
+        try:
+            with tracer.span("playwright.fill", strategy=match.strategy):
+                await self.page.locator(match.selector).fill(text)
+            self.last_strategy = match.strategy
+            self.last_selector = match.stable_selector
+            self.selector_cache.put(url, "fill", field, match.stable_selector, match.strategy, match.fingerprint)
+            self.logger.info(f"Filled field '{field}' matched by {match.strategy}")
+            return True
+        except Exception as e:
+            self.last_error = str(e)
+            self.logger.error(f"Error while trying to fill field '{field}': {str(e)}")
+            return False
+
+    async def _smart_fill_cascade(self, field: str, text: str) -> bool:
+        """
+        Find and fill a form field by trying each strategy with its own Playwright calls.
         
         Args:
             field: Description of the field to fill
@@ -238,7 +604,6 @@ class BrowserAutomationActions:
         """
         # Sanitize the field string for selector safety
         safe_field = field.replace("'", "\\'")
-        print("Smart fill in field", field)
         
         try:
             # Strategy 1: Use modern Playwright locators first
@@ -387,33 +752,438 @@ class BrowserAutomationActions:
             self.logger.error(f"Error while trying to fill field '{field}': {str(e)}")
             return False
     
-    async def type_text(self, text: str, delay: int = 100) -> bool:
+    async def execute_steps(self, steps: list[dict]) -> list[dict]:
+        """
+        Run a sequence of actions back to back, stopping at the first failure.
+
+        Args:
+            steps: Dicts with an ``action`` ('navigate', 'click', 'fill', 'type' or 'press'),
+                a ``target`` (URL, element text, field description or key) and, for fill
+                and type, the ``text`` to enter
+
+        Returns:
+            One dict per attempted step with index, action, ok, elapsed_ms and error
+        """
+        runners = {
+            "navigate": lambda step: self.start_and_navigate(step["target"]),
+            "click": lambda step: self._smart_click(step["target"]),
+            "fill": lambda step: self._smart_fill(step["target"], step.get("text", "")),
+            "type": lambda step: self.type_text(step.get("text") or step["target"]),
+            "press": lambda step: self.press_key(step["target"]),
+        }
+        results = []
+        for index, step in enumerate(steps):
+            started = time.perf_counter()
+            self.last_error = None
+            runner = runners.get(step.get("action"))
+            if runner is None:
+                ok, error = False, f"Unknown action: {step.get('action')}"
+            else:
+                try:
+                    ok = await runner(step)
+                    error = None if ok else (self.last_error or "Action failed")
+                except Exception as e:
+                    ok, error = False, str(e)
+            results.append({"index": index, "action": step.get("action"), "ok": bool(ok),
+                            "elapsed_ms": round((time.perf_counter() - started) * 1000, 1), "error": error})
+            if not ok:
+                break
+        return results
+
+    async def start_and_navigate(self, url: str) -> bool:
+        """Make sure a page is open, then navigate it to a URL."""
+        return await self.start() and await self.navigate(url)
+
+    async def snapshot(self, incremental: bool = False) -> dict:
+        """
+        List the interactive elements of the current page with stable short ids.
+
+        Args:
+            incremental: Only list elements that are new or changed since the last snapshot
+
+        Returns:
+            The snapshot dict produced by DomSnapshotter, or None on failure
         """
-        Type text character by character using the keyboard.
+        try:
+            return await self.snapshotter.snapshot(self.page, incremental=incremental)
+        except Exception as e:
+            self.last_error = str(e)
+            self.logger.error(f"Failed to snapshot page: {e}")
+            return None
+
+    async def _describe_snapshot_element(self, element_id: str) -> str:
+        """
+        Record what a snapshot id stands for, so the trace can replay the action once the id is gone.
+
+        Sets last_target to the element's name and last_selector to its
+        structural path, and returns the selector addressing it by id.
+        """
+        self.last_strategy = "snapshot_id"
+        selector = self.snapshotter.selector_for(element_id)
+        description = await self.snapshotter.describe(self.page, element_id, timeout=self.CACHED_SELECTOR_TIMEOUT)
+        self.last_target = description["name"] or None
+        self.last_selector = description["path"]
+        return selector
+
+    @traced("click", ["element_id"])
+    async def click_by_id(self, element_id: str) -> bool:
+        """
+        Click an element by the id it was given in a snapshot.
+
+        Args:
+            element_id: Id from snapshot(), e.g. 'e12'
+
+        Returns:
+            True if click was successful, False otherwise
+        """
+        try:
+            selector = await self._describe_snapshot_element(element_id)
+            mark = self.settle.mark(self.page)
+            await self.page.locator(selector).click(timeout=self.CACHED_SELECTOR_TIMEOUT)
+            self.logger.info(f"Clicked on element {element_id}")
+            await self.settle.settle(self.page, "click", mark)
+            return True
+        except Exception as e:
+            self.last_error = str(e)
+            self.logger.error(f"Failed to click element {element_id}: {e}")
+            return False
+
+    @traced("fill", ["element_id", "text"])
+    async def fill_by_id(self, element_id: str, text: str) -> bool:
+        """
+        Fill an element by the id it was given in a snapshot.
+
+        Args:
+            element_id: Id from snapshot(), e.g. 'e7'
+            text: Text to enter into the field
+
+        Returns:
+            True if fill was successful, False otherwise
+        """
+        try:
+            selector = await self._describe_snapshot_element(element_id)
+            await self.page.locator(selector).fill(text, timeout=self.CACHED_SELECTOR_TIMEOUT)
+            self.logger.info(f"Filled element {element_id}")
+            return True
+        except Exception as e:
+            self.last_error = str(e)
+            self.logger.error(f"Failed to fill element {element_id}: {e}")
+            return False
+
+    @traced("type", ["text"])
+    async def type_text(self, text: str, delay: int = None, mode: str = None) -> bool:
+        """
+        Type text into the page according to the input policy.
+
+        In instant mode the text is inserted in one step when an editable
+        element has focus, otherwise it falls back to batched key events.
         
         Args:
             text: The text to type
-            delay: Delay between keystrokes in milliseconds
+            delay: Delay between keystrokes in milliseconds; overrides the policy's delay
+            mode: Input mode ('instant', 'batched' or 'human'); defaults to the policy's choice
             
         Returns:
             True if typing was successful, False otherwise
         """
         try:
-            for char in text:
-                await self.page.keyboard.type(char, delay=delay)
-            self.logger.info(f"Typed text: '{text}'")
-            self.command_history.append(f"type_text('{text}')")
+            mode = self.input_policy.mode_for(self.page.url, mode)
+            if mode == InputMode.INSTANT and await self.page.evaluate(_FOCUSED_EDITABLE_JS):
+                await self.page.keyboard.insert_text(text)
+            else:
+                if mode == InputMode.INSTANT:
+                    mode = InputMode.BATCHED
+                await self.page.keyboard.type(text, delay=self.input_policy.keystroke_delay(mode) if delay is None else delay)
+            self.logger.info(f"Typed {len(text)} characters ({mode.value})")
             return True
         except Exception as e:
             self.last_error = str(e)
-            self.logger.error(f"Failed to type text '{text}': {e}")
+            self.logger.error(f"Failed to type {len(text)} characters: {e}")
             return False
        
-    async def press_key(self, key: str) -> bool:
+    @traced("press", ["key"])
+    async def press_key(self, key: str, mode: str = None) -> bool:
+        """
+        Press a key, holding it down only in human mode.
+
+        Args:
+            key: Key name understood by Playwright, e.g. 'Enter' or 'Control+A'
+            mode: Input mode ('instant', 'batched' or 'human'); defaults to the policy's choice
+
+        Returns:
+            True if the key press was successful, False otherwise
+        """
         try:
-            await self.page.keyboard.press(key, delay=500)
+            mode = self.input_policy.mode_for(self.page.url, mode)
+            mark = self.settle.mark(self.page)
+            await self.page.keyboard.press(key, delay=self.input_policy.key_press_delay(mode))
+            await self.settle.settle(self.page, "press", mark)
             return True
         except Exception as e:
             self.last_error = str(e)
             self.logger.error(f"Failed to press key '{key}': {e}")
-            return False
\ No newline at end of file
+            return False
+
+    def _open_tabs(self) -> dict:
+        """Named tabs that are still open; tabs closed by the page itself are forgotten."""
+        self.tabs = {name: page for name, page in self.tabs.items() if not page.is_closed()}
+        return self.tabs
+
+    async def open_tab(self, name: str, url: str = None) -> bool:
+        """
+        Open a new named tab in the current context and make it the active page.
+
+        Args:
+            name: Name used to switch to and close the tab
+            url: Optional URL to navigate the new tab to
+
+        Returns:
+            True if the tab was opened (and navigated), False otherwise
+        """
+        if not await self.start():
+            return False
+        tabs = self._open_tabs()
+        if name in tabs:
+            self.last_error = f"A tab named '{name}' is already open"
+            return False
+        if len(tabs) >= self.max_pages:
+            self.last_error = f"At most {self.max_pages} pages can be open at once; close a tab first"
+            return False
+        try:
+            page = await self.context.new_page()
+        except Exception as e:
+            self.last_error = str(e)
+            self.logger.error(f"Failed to open tab '{name}': {e}")
+            return False
+        self.settle.attach(page)
+        tabs[name] = page
+        self.page = page
+        self.active_tab = name
+        self.logger.info(f"Opened tab '{name}'")
+        return await self.navigate(url) if url else True
+
+    async def switch_tab(self, name: str) -> bool:
+        """
+        Make a named tab the active page, which all other actions act on.
+
+        Args:
+            name: Name of an open tab
+
+        Returns:
+            True if the tab exists, False otherwise
+        """
+        page = self._open_tabs().get(name)
+        if page is None:
+            self.last_error = f"No open tab named '{name}'"
+            return False
+        self.page = page
+        self.active_tab = name
+        try:
+            await page.bring_to_front()
+        except Exception as e:
+            self.logger.info(f"Could not bring tab '{name}' to front: {e}")
+        return True
+
+    async def close_tab(self, name: str) -> bool:
+        """
+        Close a named tab; if it was active, the most recently opened remaining tab becomes active.
+
+        Args:
+            name: Name of an open tab
+
+        Returns:
+            True if the tab was closed, False otherwise
+        """
+        page = self._open_tabs().pop(name, None)
+        if page is None:
+            self.last_error = f"No open tab named '{name}'"
+            return False
+        try:
+            await page.close()
+        except Exception as e:
+            self.logger.info(f"Closing tab '{name}' failed: {e}")
+        if self.active_tab == name:
+            self.active_tab = next(reversed(self.tabs), None)
+            self.page = self.tabs.get(self.active_tab)
+        return True
+
+    def list_tabs(self) -> list[dict]:
+        """Name, URL and active flag of every open tab."""
+        return [{"name": name, "url": page.url, "active": name == self.active_tab}
+                for name, page in self._open_tabs().items()]
+
+    async def _visit(self, url: str, selector: str, max_chars: int, slots: asyncio.Semaphore) -> dict:
+        if not url.startswith(('http://', 'https://')):
+            url = 'https://' + url
+        result = {"url": url, "ok": False}
+        started = time.perf_counter()
+        async with slots:
+            page = None
+            try:
+                page = await self.context.new_page()
+                policy = self.settle.policy
+                response = await page.goto(url, timeout=policy.navigation_timeout_ms,
+                                           wait_until=policy.navigation_wait_until)
+                await self.settle.settle(page, "navigate")
+                if response is not None and response.status >= 400:
+                    result["error"] = f"Navigation returned status code {response.status}"
+                else:
+                    result.update(await page.evaluate(_EXTRACT_JS, {"selector": selector or None,
+                                                                    "maxChars": max_chars, "maxMatches": 20}))
+                    result["ok"] = True
+            except Exception as e:
+                result["error"] = str(e)
+                self.logger.error(f"Failed to visit {url}: {e}")
+            finally:
+                if page is not None:
+                    await page.close()
+        result["elapsed_ms"] = round((time.perf_counter() - started) * 1000, 1)
+        return result
+
+    async def visit_pages(self, urls: list[str], selector: str = None, max_chars: int = 1000) -> list[dict]:
+        """
+        Navigate to several URLs concurrently, each on its own temporary page, and extract text from each.
+
+        Pages are opened in the current context, at most as many at a time as
+        max_pages leaves room for next to the named tabs, and closed as soon
+        as their text is extracted. When the tabs already use up max_pages,
+        no page is visited. The active page is not touched.
+
+        Args:
+            urls: URLs to visit
+            selector: CSS selector whose matches' text is extracted; the page's text when omitted
+            max_chars: Maximum characters extracted per match (or per page)
+
+        Returns:
+            One result per URL, in order, with url, ok, title, matches or text, error and elapsed_ms
+        """
+        if not await self.start():
+            return [{"url": url, "ok": False, "error": self.last_error} for url in urls]
+        free = self.max_pages - len(self._open_tabs())
+        if free <= 0:
+            self.last_error = f"At most {self.max_pages} pages can be open at once; close a tab first"
+            return [{"url": url, "ok": False, "error": self.last_error} for url in urls]
+        slots = asyncio.Semaphore(free)
+        return list(await asyncio.gather(*(self._visit(url, selector, max_chars, slots) for url in urls)))
+
+    async def restore_session(self, url: str, identity: str) -> bool:
+        """
+        Load the saved login of an identity on a site into the current context.
+
+        Cookies are added to the context directly; localStorage is written
+        from a blank document of the origin that is served locally, so the
+        site itself is not loaded. Nothing stays installed in the context, so
+        a rejected session can be cleared again (see start_authenticated).
+
+        Args:
+            url: Any URL of the site
+            identity: Name of the account the state was saved for
+
+        Returns:
+            True if a saved state was found and applied, False otherwise
+        """
+        if self.storage_states is None or not await self.start():
+            return False
+        origin = origin_of(url)
+        state = self.storage_states.load(origin, identity)
+        if state is None:
+            return False
+        try:
+            if state["cookies"]:
+                await self.context.add_cookies(state["cookies"])
+            for entry in state["origins"]:
+                items = {item["name"]: item["value"] for item in entry.get("localStorage", [])}
+                if items:
+                    await self._on_origin(entry["origin"], _SET_LOCAL_STORAGE_JS, items)
+        except Exception as e:
+            self.last_error = str(e)
+            self.logger.error(f"Failed to restore session for {origin}: {e}")
+            return False
+        self.logger.info(f"Restored saved session of '{identity}' for {origin}")
+        return True
+
+    async def _on_origin(self, origin: str, script: str, arg=None):
+        """Evaluate a script in a blank document of an origin, on a temporary page, without contacting the site."""
+        page = await self.context.new_page()
+        try:
+            return await evaluate_on_origin(page, origin, script, arg)
+        finally:
+            await page.close()
+
+    async def save_session(self, identity: str, url: str = None) -> bool:
+        """
+        Save the cookies and localStorage of a site for an identity, encrypted.
+
+        Args:
+            identity: Name of the account that is logged in
+            url: Any URL of the site; the active page's URL when omitted
+
+        Returns:
+            True if the state was saved, False otherwise
+        """
+        if self.storage_states is None or self.context is None:
+            return False
+        origin = origin_of(url or self.page.url)
+        try:
+            state = await self.context.storage_state()
+        except Exception as e:
+            self.last_error = str(e)
+            self.logger.error(f"Failed to read storage state for {origin}: {e}")
+            return False
+        saved = self.storage_states.save(origin, identity, state)
+        if saved:
+            self.logger.info(f"Saved session of '{identity}' for {origin}")
+        return saved
+
+    async def session_valid(self) -> bool:
+        """
+        Whether the active page looks authenticated: not on a login URL and not asking for a password.
+        """
+        if self.page is None or _LOGIN_PATH.search(self.page.url or ""):
+            return False
+        try:
+            return not await self.page.evaluate(_PASSWORD_PROMPT_JS)
+        except Exception as e:
+            self.logger.info(f"Session check failed: {e}")
+            return False
+
+    async def start_authenticated(self, url: str, identity: str, login) -> bool:
+        """
+        Open a site logged in as an identity, logging in only when no saved session is accepted.
+
+        A saved session is restored and checked by loading ``url``; if the
+        site rejects it, the snapshot is dropped and the site's cookies and
+        localStorage are cleared. ``login`` then runs (for
+        example the agent performing the login flow), ``url`` is loaded again
+        to check the outcome and the resulting session is saved for the next
+        run.
+
+        Args:
+            url: A page of the site that requires being logged in
+            identity: Name of the account
+            login: Async callable performing the login; returns whether it succeeded
+
+        Returns:
+            True if the page ends up authenticated, False otherwise
+        """
+        origin = origin_of(url)
+        if await self.restore_session(url, identity):
+            if await self.navigate(url) and await self.session_valid():
+                return True
+            self.logger.info(f"Saved session of '{identity}' for {origin} was rejected, logging in again")
+            self.storage_states.invalidate(origin, identity)
+            host = re.escape(urlsplit(url).hostname or "")
+            await self.context.clear_cookies(domain=re.compile(rf"(^|\.){host}$"))
+            try:
+                await self._on_origin(origin, "() => localStorage.clear()")
+            except Exception as e:
+                self.logger.info(f"Could not clear localStorage of {origin}: {e}")
+
+        if not await login():
+            return False
+        # The login flow may end anywhere on the site; check the session on the page that requires it
+        if not await self.navigate(url) or not await self.session_valid():
+            self.last_error = f"Still not logged in to {origin} after the login flow"
+            return False
+        await self.save_session(identity, url)
+        return True
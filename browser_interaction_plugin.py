@@ -1,54 +1,190 @@
+import time
+from enum import Enum
 from typing import Annotated
 from semantic_kernel.functions import kernel_function
+from semantic_kernel.kernel_pydantic import KernelBaseModel
+from action_result import ActionResult, PageElements, PageVisit, PageVisits, TabInfo, TabList
 from browser_automation_actions import BrowserAutomationActions
 
+
+class StepAction(str, Enum):
+    NAVIGATE = "navigate"
+    CLICK = "click"
+    FILL = "fill"
+    TYPE = "type"
+    PRESS = "press"
+
+
+class BrowserStep(KernelBaseModel):
+    action: Annotated[StepAction, "The action to perform."]
+    target: Annotated[str, "The URL, the text of the element to click, the name or placeholder of the field to fill, or the key to press."]
+    text: Annotated[str, "The text to fill or type; empty for other actions."] = ""
+
+
 class BrowserInteractionPlugin:
 
     @property
     def description(self) -> str:
         return "Provides actions to perform on a browser."
     
-    def __init__(self,headless: bool = False):
+    def __init__(self,headless: bool = False, browser_automation: BrowserAutomationActions = None):
         self.headless = headless
         print("Initializing BrowserInteractionPlugin")
-        self.browser_automation = BrowserAutomationActions(headless=self.headless)
+        self.browser_automation = browser_automation or BrowserAutomationActions(headless=self.headless)
+
+    async def close(self) -> bool:
+        """Shut down the browser owned by this plugin."""
+        return await self.browser_automation.stop()
+
+    async def _perform(self, action, reports_strategy: bool = False) -> ActionResult:
+        """
+        Await a BrowserAutomationActions call and describe its outcome.
+
+        Args:
+            action: The awaitable returned by the actions layer (resolving to a bool)
+            reports_strategy: Whether the action sets last_strategy (smart click and fill)
+        """
+        automation = self.browser_automation
+        automation.last_error = None
+        started = time.perf_counter()
+        try:
+            success = bool(await action)
+        except Exception as e:
+            success = False
+            automation.last_error = str(e)
+        return ActionResult(
+            success=success,
+            strategy=automation.last_strategy if success and reports_strategy else None,
+            elapsed_ms=round((time.perf_counter() - started) * 1000, 1),
+            error=None if success else (automation.last_error or "Action failed"),
+        )
     
     @kernel_function(description="Navigate to a URL")
     async def navigate_to_url(
         self, url: Annotated[str, "The URL to navigate to."]
-    ) -> Annotated[bool, "Whether the action was successfully performed."]:
+    ) -> Annotated[ActionResult, "Whether the action succeeded, how long it took and the error if it failed."]:
         print("Function called: navigate_to_url with key:", url)
-        result = await self.browser_automation.start()
-        if result:
-            result = await self.browser_automation.navigate(url)
-        return result
+        # start() is a no-op when the page from a previous navigation is still open
+        return await self._perform(self.browser_automation.start_and_navigate(url))
   
     @kernel_function(description="Press a specific key from the keyboard.")
     async def press_key(
-        self, key: Annotated[str, "The destination to check availability for."]
-    ) -> Annotated[bool, "Whether the action was successfully performed."]:
+        self, key: Annotated[str, "The destination to check availability for."],
+        mode: Annotated[str, "Input speed: 'instant', 'batched' or 'human'. Leave empty for the default."] = ""
+    ) -> Annotated[ActionResult, "Whether the action succeeded, how long it took and the error if it failed."]:
         print("Function called: press_key with key:", key)
-        return await self.browser_automation.press_key(key)
+        return await self._perform(self.browser_automation.press_key(key, mode=mode or None))
     
     @kernel_function(description="Type a string into the browser.")
     async def type_string(
-        self, string: Annotated[str, "The string to type."]
-    ) -> Annotated[bool, "Whether the action was successfully performed."]:
-        print("Function called: type_string with key:", string)
-        return await self.browser_automation.type_text(string)
+        self, string: Annotated[str, "The string to type."],
+        mode: Annotated[str, "Input speed: 'instant', 'batched' or 'human' (only for sites that reject fast typing). Leave empty for the default."] = ""
+    ) -> Annotated[ActionResult, "Whether the action succeeded, how long it took and the error if it failed."]:
+        print(f"Function called: type_string with {len(string)} characters")
+        return await self._perform(self.browser_automation.type_text(string, mode=mode or None))
 
     @kernel_function(description="Find a clickable element on the page with given text and click it.")
     async def find_and_click(
         self, text: Annotated[str, "The text that the clickable element contains."]
-    ) -> Annotated[bool, "Whether the action was successfully performed."]:
+    ) -> Annotated[ActionResult, "Whether the action succeeded, the strategy that found the element, how long it took and the error if it failed."]:
         print("Function called: find_and_click with key:", text)
-        return await self.browser_automation._smart_click(text)
+        return await self._perform(self.browser_automation._smart_click(text), reports_strategy=True)
 
     @kernel_function(description="Find an input field on the page with given name or placeholder text and fill it with the given text.")
-    def find_and_fill(
+    async def find_and_fill(
         self, 
         field: Annotated[str, "The name or placeholder text of the field where the text needs to be filled"],
         text: Annotated[str, "The text that needs to be filled"]
-    ) -> Annotated[bool, "Whether the action was successfully performed."]:
+    ) -> Annotated[ActionResult, "Whether the action succeeded, the strategy that found the field, how long it took and the error if it failed."]:
         print(f"Function called: find_and_fill with field: {field}")
-        return self.browser_automation._smart_fill(field, text)
\ No newline at end of file
+        return await self._perform(self.browser_automation._smart_fill(field, text), reports_strategy=True)
+
+    @kernel_function(description="List the interactive elements (links, buttons, inputs) of the current page. Each element is [id, role, name, placeholder?]; pass the id to click_by_id or fill_by_id.")
+    async def get_page_elements(
+        self,
+        only_changes: Annotated[bool, "List only elements that are new or changed since the previous listing of this page."] = False
+    ) -> Annotated[PageElements, "The page url, title, elements and ids of removed elements, or the error if listing failed."]:
+        print("Function called: get_page_elements")
+        started = time.perf_counter()
+        snapshot = await self.browser_automation.snapshot(incremental=only_changes)
+        elapsed_ms = round((time.perf_counter() - started) * 1000, 1)
+        if snapshot is None:
+            return PageElements(success=False, elapsed_ms=elapsed_ms,
+                                error=self.browser_automation.last_error or "Action failed")
+        return PageElements(success=True, elapsed_ms=elapsed_ms, **snapshot)
+
+    @kernel_function(description="Click the element with the given id from get_page_elements.")
+    async def click_by_id(
+        self, element_id: Annotated[str, "The element id, e.g. e12."]
+    ) -> Annotated[ActionResult, "Whether the action succeeded, how long it took and the error if it failed."]:
+        print("Function called: click_by_id with id:", element_id)
+        return await self._perform(self.browser_automation.click_by_id(element_id))
+
+    @kernel_function(description="Fill the input field with the given id from get_page_elements with the given text.")
+    async def fill_by_id(
+        self,
+        element_id: Annotated[str, "The element id, e.g. e7."],
+        text: Annotated[str, "The text that needs to be filled"]
+    ) -> Annotated[ActionResult, "Whether the action succeeded, how long it took and the error if it failed."]:
+        print("Function called: fill_by_id with id:", element_id)
+        return await self._perform(self.browser_automation.fill_by_id(element_id, text))
+
+    @kernel_function(description="Execute several browser steps in order in one call. Stops at the first failed step. Each step has an action (navigate, click, fill, type or press), a target (the URL, the element text, the field name or placeholder, or the key) and, for fill and type, the text.")
+    async def execute_steps(
+        self, steps: Annotated[list[BrowserStep], "The steps to execute, in order."]
+    ) -> Annotated[ActionResult, "Whether all steps succeeded, the total time, the error of the failed step and the status and timing of each attempted step."]:
+        print(f"Function called: execute_steps with {len(steps)} steps")
+        started = time.perf_counter()
+        results = await self.browser_automation.execute_steps([step.model_dump(mode="json") for step in steps])
+        success = len(results) == len(steps) and all(result["ok"] for result in results)
+        return ActionResult(
+            success=success,
+            elapsed_ms=round((time.perf_counter() - started) * 1000, 1),
+            error=None if success else next((result["error"] for result in results if not result["ok"]), None),
+            steps=results,
+        )
+
+    @kernel_function(description="Open a new browser tab with a name, optionally at a URL. The new tab becomes the active tab that all other actions act on.")
+    async def open_tab(
+        self,
+        name: Annotated[str, "A short name for the tab, e.g. 'docs'."],
+        url: Annotated[str, "The URL to open in the tab; empty for a blank tab."] = ""
+    ) -> Annotated[ActionResult, "Whether the action succeeded, how long it took and the error if it failed."]:
+        print(f"Function called: open_tab with name: {name}")
+        return await self._perform(self.browser_automation.open_tab(name, url or None))
+
+    @kernel_function(description="Make the tab with the given name the active tab.")
+    async def switch_tab(
+        self, name: Annotated[str, "The name of an open tab; the first tab is called 'main'."]
+    ) -> Annotated[ActionResult, "Whether the action succeeded, how long it took and the error if it failed."]:
+        print(f"Function called: switch_tab with name: {name}")
+        return await self._perform(self.browser_automation.switch_tab(name))
+
+    @kernel_function(description="Close the tab with the given name.")
+    async def close_tab(
+        self, name: Annotated[str, "The name of an open tab."]
+    ) -> Annotated[ActionResult, "Whether the action succeeded, how long it took and the error if it failed."]:
+        print(f"Function called: close_tab with name: {name}")
+        return await self._perform(self.browser_automation.close_tab(name))
+
+    @kernel_function(description="List the open tabs with their names, URLs and which one is active.")
+    async def list_tabs(self) -> Annotated[TabList, "The open tabs with their names, URLs and which one is active."]:
+        print("Function called: list_tabs")
+        return TabList(success=True, tabs=[TabInfo(**tab) for tab in self.browser_automation.list_tabs()])
+
+    @kernel_function(description="Visit several URLs in parallel and read text from each, without changing the active tab. Use it to collect the same information from many independent pages at once.")
+    async def visit_pages(
+        self,
+        urls: Annotated[list[str], "The URLs to visit."],
+        selector: Annotated[str, "CSS selector of the elements whose text to read on every page; empty to read the page text."] = ""
+    ) -> Annotated[PageVisits, "Per URL, whether it loaded, the page title, the text of the matching elements (or the page text) and the error if it failed."]:
+        print(f"Function called: visit_pages with {len(urls)} urls")
+        started = time.perf_counter()
+        pages = [PageVisit(**page) for page in await self.browser_automation.visit_pages(urls, selector=selector or None)]
+        success = all(page.ok for page in pages)
+        return PageVisits(
+            success=success,
+            elapsed_ms=round((time.perf_counter() - started) * 1000, 1),
+            error=None if success else next(page.error for page in pages if not page.ok),
+            pages=pages,
+        )
@@ -0,0 +1,118 @@
+import asyncio
+import logging
+import time
+
+
+class BrowserSession:
+    """
+    Owns a single Playwright driver and browser for the lifetime of an agent.
+
+    Launching Playwright and a browser is by far the most expensive step of a
+    navigation, so the session launches them once and hands out contexts from
+    the same browser until close() is called.
+    """
+
+    def __init__(self, headless: bool = False, browser_type: str = "chromium", launch_options: dict = None):
+        """
+        Initialize the browser session.
+
+        Args:
+            headless: Whether to run the browser in headless mode
+            browser_type: Type of browser to use (chromium, firefox, or webkit)
+            launch_options: Extra keyword arguments passed to the browser launcher
+        """
+        self.headless = headless
+        self.browser_type = browser_type
+        self.launch_options = launch_options or {}
+        self.playwright = None
+        self.browser = None
+        self.logger = logging.getLogger(__name__)
+        self._lock = asyncio.Lock()
+        self.metrics = {
+            "launches": 0,
+            "launch_ms_total": 0.0,
+            "reuses": 0,
+            "reuse_ms_total": 0.0,
+            "contexts_created": 0,
+        }
+
+    @property
+    def is_running(self) -> bool:
+        """Whether the browser is launched and still connected."""
+        return self.browser is not None and self.browser.is_connected()
+
+    async def ensure_browser(self):
+        """
+        Return the running browser, launching Playwright and the browser on first use.
+
+        Returns:
+            The Playwright Browser instance
+
+        Raises:
+            ValueError: If the configured browser type is not supported
+        """
+        # Every action goes through here; skip the lock once the browser is up
+        if self.is_running:
+            return self.browser
+        async with self._lock:
+            if self.is_running:
+                return self.browser
+
+            started = time.perf_counter()
+            if self.playwright is None:
+                from playwright.async_api import async_playwright
+                self.playwright = await async_playwright().start()
+
+            browser_options = {
+                "chromium": self.playwright.chromium,
+                "firefox": self.playwright.firefox,
+                "webkit": self.playwright.webkit
+            }
+            if self.browser_type not in browser_options:
+                raise ValueError(f"Unsupported browser type: {self.browser_type}")
+
+            self.browser = await browser_options[self.browser_type].launch(
+                headless=self.headless, **self.launch_options
+            )
+            self.metrics["launches"] += 1
+            self.metrics["launch_ms_total"] += (time.perf_counter() - started) * 1000
+            self.logger.info(f"Launched {self.browser_type} browser {'in headless mode' if self.headless else 'in visible mode'}")
+            return self.browser
+
+    async def new_context(self, **context_options):
+        """Create a new isolated browser context on the shared browser."""
+        browser = await self.ensure_browser()
+        context = await browser.new_context(**context_options)
+        self.metrics["contexts_created"] += 1
+        return context
+
+    def record_reuse(self, elapsed_seconds: float):
+        """Record a start request that was served by an already running page."""
+        self.metrics["reuses"] += 1
+        self.metrics["reuse_ms_total"] += elapsed_seconds * 1000
+
+    def stats(self) -> dict:
+        """Return the raw counters along with average launch and reuse cost in milliseconds."""
+        launches = self.metrics["launches"]
+        reuses = self.metrics["reuses"]
+        return {
+            **self.metrics,
+            "avg_launch_ms": self.metrics["launch_ms_total"] / launches if launches else 0.0,
+            "avg_reuse_ms": self.metrics["reuse_ms_total"] / reuses if reuses else 0.0,
+        }
+
+    async def close(self) -> bool:
+        """Close the browser and stop the Playwright driver."""
+        async with self._lock:
+            try:
+                if self.browser:
+                    await self.browser.close()
+                if self.playwright:
+                    await self.playwright.stop()
+                return True
+            except Exception as e:
+                self.logger.error(f"Failed to close browser session: {e}")
+                return False
+            finally:
+                self.browser = None
+                self.playwright = None
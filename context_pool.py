@@ -0,0 +1,276 @@
+import asyncio
+import logging
+import time
+from contextlib import asynccontextmanager
+
+from browser_automation_actions import BrowserAutomationActions, evaluate_on_origin
+from browser_session import BrowserSession
+from url_utils import origin_of
+
+# Clears everything a site can keep in the browser for its origin, other than cookies.
+_CLEAR_ORIGIN_STORAGE_JS = """async () => {
+    localStorage.clear();
+    sessionStorage.clear();
+    if (indexedDB.databases) {
+        for (const db of await indexedDB.databases()) {
+            await new Promise(resolve => {
+                const request = indexedDB.deleteDatabase(db.name);
+                request.onsuccess = request.onerror = request.onblocked = resolve;
+            });
+        }
+    }
+    if (window.caches) {
+        for (const key of await caches.keys()) await caches.delete(key);
+    }
+}"""
+
+
+class PooledContext:
+    """
+    A pre-warmed browser context with one open page, leased out by BrowserContextPool.
+
+    The origins any page or frame of the context navigated to are collected,
+    so their storage can be cleared between tasks.
+    """
+
+    def __init__(self, session: BrowserSession, context, page):
+        self.session = session
+        self.context = context
+        self.page = page
+        self.tasks_run = 0
+        self.created_at = time.monotonic()
+        self.origins = set()
+        context.on("page", self._watch)
+        self._watch(page)
+
+    def _watch(self, page):
+        page.on("framenavigated", self._record_origin)
+
+    def _record_origin(self, frame):
+        origin = origin_of(frame.url)
+        if origin.startswith(("http://", "https://")):
+            self.origins.add(origin)
+
+    def actions_view(self, log_level: str = "INFO") -> BrowserAutomationActions:
+        """Return a BrowserAutomationActions bound to this context without taking ownership of it."""
+        return BrowserAutomationActions(
+            headless=self.session.headless,
+            browser_type=self.session.browser_type,
+            log_level=log_level,
+            session=self.session,
+            context=self.context,
+            page=self.page,
+        )
+
+
+class BrowserContextPool:
+    """
+    Pool of isolated, pre-warmed browser contexts spread across one or more browsers.
+
+    Contexts are checked out for the duration of a task and checked back in
+    afterwards. A context is replaced when it fails its health check, when the
+    task using it raised, or once it has served ``recycle_after`` tasks.
+    """
+
+    def __init__(self, browsers: int = 1, contexts_per_browser: int = 4, recycle_after: int = 20,
+                 headless: bool = True, browser_type: str = "chromium", context_options: dict = None,
+                 health_check_timeout: float = 5.0, network_router=None):
+        """
+        Initialize the pool.
+
+        Args:
+            browsers: Number of browser processes (M)
+            contexts_per_browser: Number of isolated contexts kept per browser (N)
+            recycle_after: Replace a context after it has served this many tasks (K)
+            headless: Whether to run the browsers in headless mode
+            browser_type: Type of browser to use (chromium, firefox, or webkit)
+            context_options: Keyword arguments passed to ``browser.new_context``
+            health_check_timeout: Seconds to wait for a context to answer the health check
+            network_router: Optional NetworkRouter installed on every context
+        """
+        self.browsers = browsers
+        self.contexts_per_browser = contexts_per_browser
+        self.recycle_after = recycle_after
+        self.headless = headless
+        self.browser_type = browser_type
+        self.context_options = context_options or {}
+        self.health_check_timeout = health_check_timeout
+        self.network_router = network_router
+        self.sessions = []
+        self.logger = logging.getLogger(__name__)
+        self._idle = asyncio.Queue()
+        self._started = False
+        self.metrics = {"checkouts": 0, "recycled": 0, "unhealthy": 0, "checkout_wait_ms_total": 0.0}
+
+    @property
+    def size(self) -> int:
+        """Total number of contexts managed by the pool."""
+        return self.browsers * self.contexts_per_browser
+
+    async def start(self):
+        """Launch the browsers and pre-warm every context with an open page."""
+        if self._started:
+            return
+        self.sessions = [BrowserSession(headless=self.headless, browser_type=self.browser_type)
+                         for _ in range(self.browsers)]
+        warmed = await asyncio.gather(*(
+            self._create(session) for session in self.sessions for _ in range(self.contexts_per_browser)
+        ))
+        for pooled in warmed:
+            self._idle.put_nowait(pooled)
+        self._started = True
+        self.logger.info(f"Context pool ready: {self.browsers} browser(s) x {self.contexts_per_browser} context(s)")
+
+    async def _create(self, session: BrowserSession) -> PooledContext:
+        context = await session.new_context(**self.context_options)
+        if self.network_router is not None:
+            await self.network_router.install(context)
+        page = await context.new_page()
+        return PooledContext(session, context, page)
+
+    async def is_healthy(self, pooled: PooledContext) -> bool:
+        """Check that the browser is connected and the page still executes script."""
+        if not pooled.session.is_running or pooled.page.is_closed():
+            return False
+        try:
+            return await asyncio.wait_for(pooled.page.evaluate("1 + 1"), self.health_check_timeout) == 2
+        except Exception:
+            return False
+
+    async def _recycle(self, pooled: PooledContext) -> PooledContext:
+        try:
+            await pooled.context.close()
+        except Exception as e:
+            self.logger.info(f"Closing recycled context failed: {e}")
+        self.metrics["recycled"] += 1
+        return await self._create(pooled.session)
+
+    async def checkout(self) -> PooledContext:
+        """Take an idle, healthy context from the pool, waiting if all are in use."""
+        await self.start()
+        started = time.perf_counter()
+        pooled = await self._idle.get()
+        self.metrics["checkout_wait_ms_total"] += (time.perf_counter() - started) * 1000
+        try:
+            if not await self.is_healthy(pooled):
+                self.metrics["unhealthy"] += 1
+                pooled = await self._recycle(pooled)
+        except Exception:
+            self._idle.put_nowait(pooled)
+            raise
+        self.metrics["checkouts"] += 1
+        return pooled
+
+    async def checkin(self, pooled: PooledContext, failed: bool = False):
+        """
+        Return a context to the pool.
+
+        Args:
+            pooled: The context obtained from checkout()
+            failed: Whether the task using the context raised; failed contexts are always recycled
+        """
+        pooled.tasks_run += 1
+        try:
+            if failed or pooled.tasks_run >= self.recycle_after or pooled.page.is_closed():
+                pooled = await self._recycle(pooled)
+            else:
+                await self._reset(pooled)
+        except Exception as e:
+            self.logger.warning(f"Resetting pooled context failed, replacing it: {e}")
+            try:
+                pooled = await self._recycle(pooled)
+            except Exception as e:
+                # Keep the slot anyway: checkout() finds it unhealthy and replaces it then
+                self.logger.warning(f"Replacing pooled context failed: {e}")
+        finally:
+            # The slot always goes back, or the pool would shrink and checkout() eventually block forever
+            self._idle.put_nowait(pooled)
+
+    async def _reset(self, pooled: PooledContext):
+        """
+        Keep tasks isolated from each other without paying for a new context.
+
+        Closes every page but the pooled one (e.g. tabs the task opened),
+        clears the cookies and, for every origin the context visited, its
+        localStorage, sessionStorage, IndexedDB and Cache Storage.
+        """
+        for page in pooled.context.pages:
+            if page is not pooled.page:
+                await page.close()
+        await pooled.context.clear_cookies()
+        origins, pooled.origins = pooled.origins, set()
+        for origin in origins:
+            # On the pooled page itself, so that its sessionStorage is cleared too
+            await evaluate_on_origin(pooled.page, origin, _CLEAR_ORIGIN_STORAGE_JS)
+        await pooled.page.goto("about:blank")
+        pooled.origins.clear()
+
+    @asynccontextmanager
+    async def lease(self):
+        """Context manager pairing checkout() with checkin()."""
+        pooled = await self.checkout()
+        failed = False
+        try:
+            yield pooled
+        except BaseException:
+            failed = True
+            raise
+        finally:
+            await self.checkin(pooled, failed=failed)
+
+    def stats(self) -> dict:
+        """Pool counters together with the launch statistics of each browser."""
+        return {
+            **self.metrics,
+            "idle": self._idle.qsize(),
+            "size": self.size,
+            "browsers": [session.stats() for session in self.sessions],
+        }
+
+    async def close(self):
+        """Close every context and browser owned by the pool."""
+        while not self._idle.empty():
+            pooled = self._idle.get_nowait()
+            try:
+                await pooled.context.close()
+            except Exception:
+                pass
+        await asyncio.gather(*(session.close() for session in self.sessions))
+        self.sessions = []
+        self._started = False
+
+
+async def run_pooled_tasks(tasks: list[str], pool: BrowserContextPool, concurrency: int = None) -> list:
+    """
+    Run independent instructions concurrently, each on its own pooled context.
+
+    Every task gets a fresh BrowserAgentHandler, and therefore its own ChatHistory,
+    bound to a BrowserAutomationActions view of the leased context.
+
+    Args:
+        tasks: Independent instructions to run
+        pool: The context pool to lease browser contexts from
+        concurrency: Maximum number of tasks in flight; defaults to the pool size
+
+    Returns:
+        One entry per task, in input order: the task's ChatHistory or the exception it raised
+    """
+    from BrowserAgentHandler import BrowserAgentHandler
+
+    await pool.start()
+    semaphore = asyncio.Semaphore(concurrency or pool.size)
+
+    async def run_one(index: int, instruction: str):
+        async with semaphore:
+            async with pool.lease() as pooled:
+                agent = BrowserAgentHandler(headless=pool.headless, browser_automation=pooled.actions_view())
+                try:
+                    print("INSTRUCTION ", index, ": ", instruction)
+                    history = await agent.interact(instruction)
+                    print("EXECUTED INSTRUCTION ", index)
+                    return history
+                finally:
+                    # Leaves the leased context alone; the view does not own it
+                    await agent.close()
+
+    return await asyncio.gather(*(run_one(i, task) for i, task in enumerate(tasks)), return_exceptions=True)
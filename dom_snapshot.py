@@ -0,0 +1,161 @@
+from element_resolver import PAGE_HELPERS_JS
+
+# Attribute holding the short id the snapshot assigns to an element. Ids are
+# stable for as long as the element stays in the document.
+SNAPSHOT_ATTRIBUTE = "data-wm-id"
+
+_SNAPSHOT_JS = """
+({ attribute, incremental, maxElements, maxNameChars, maxChars }) => {
+""" + PAGE_HELPERS_JS + """
+    const reset = !window.__webmancerSnapshot;
+    const state = window.__webmancerSnapshot || (window.__webmancerSnapshot = { next: 1, previous: {} });
+    const selector = [
+        "a[href]", "button", "input:not([type=hidden])", "textarea", "select", "summary",
+        "[role=button]", "[role=link]", "[role=checkbox]", "[role=tab]", "[role=menuitem]",
+        "[role=option]", "[role=textbox]", "[role=searchbox]", "[role=combobox]",
+        "[contenteditable='']", "[contenteditable=true]", "[onclick]", "[tabindex]:not([tabindex='-1'])",
+    ].join(",");
+    const implicitRole = el => {
+        const tag = el.tagName;
+        if (tag === "TEXTAREA") return "textbox";
+        if (tag === "SELECT") return "combobox";
+        if (tag === "INPUT") {
+            const type = (el.type || "text").toLowerCase();
+            if (["checkbox", "radio"].includes(type)) return type;
+            if (type === "search") return "searchbox";
+            return roleOf(el) || "textbox";
+        }
+        if (el.isContentEditable) return "textbox";
+        return roleOf(el) || "generic";
+    };
+    const fieldName = el => {
+        const labels = Array.from(el.labels || []).map(label => label.textContent).join(" ");
+        return norm(el.getAttribute("aria-label") || labels || el.getAttribute("name") || el.title);
+    };
+
+    // `sent` becomes the new baseline: only what the caller has actually
+    // received, so elements cut by the budget are listed next time.
+    const present = {};
+    const sent = {};
+    const elements = [];
+    let used = 0;
+    let truncated = false;
+    let total = 0;
+    for (const el of document.querySelectorAll(selector)) {
+        if (total >= maxElements) {
+            truncated = true;
+            break;
+        }
+        if (!isVisible(el) || el.disabled) continue;
+        let id = el.getAttribute(attribute);
+        if (!id) {
+            id = "e" + (state.next++);
+            el.setAttribute(attribute, id);
+        }
+        const role = implicitRole(el);
+        const editable = role === "textbox" || role === "searchbox" || role === "combobox";
+        const entry = [id, role, (editable ? fieldName(el) : accessibleName(el)).slice(0, maxNameChars)];
+        const placeholder = el.getAttribute("placeholder");
+        if (placeholder) entry.push(placeholder.slice(0, maxNameChars));
+        const key = JSON.stringify(entry);
+        total++;
+        present[id] = true;
+        if (incremental && state.previous[id] === key) {
+            sent[id] = key;
+            continue;
+        }
+        if (used + key.length + 1 > maxChars) {
+            truncated = true;
+            if (id in state.previous) sent[id] = state.previous[id];
+            continue;
+        }
+        used += key.length + 1;
+        elements.push(entry);
+        sent[id] = key;
+    }
+    const removed = incremental ? Object.keys(state.previous).filter(id => !present[id]) : [];
+    state.previous = sent;
+    return { url: location.href, title: document.title, reset, elements, removed, total, truncated };
+}
+"""
+
+# What an element found by snapshot id is called and where it sits, so an
+# id-based action can be recorded in terms that still mean something once the
+# ids are gone (a trace replayed on a freshly loaded page).
+_DESCRIBE_JS = """
+el => {
+""" + PAGE_HELPERS_JS + """
+    const editable = ["INPUT", "TEXTAREA", "SELECT"].includes(el.tagName) || el.isContentEditable;
+    const labels = Array.from(el.labels || []).map(label => label.textContent).join(" ");
+    const name = editable
+        ? norm(el.getAttribute("aria-label") || labels || el.getAttribute("placeholder") || el.getAttribute("name") || el.title)
+            || (el.type === "password" ? "password" : "")
+        : accessibleName(el);
+    return { name, path: cssPath(el) };
+}
+"""
+
+
+class DomSnapshotter:
+    """
+    Produces compact, token-budgeted listings of the interactive elements on a page.
+
+    Each element is listed as ``[id, role, name]`` with the placeholder
+    appended when present. Ids are stamped on the elements themselves, so they
+    stay valid across snapshots and can be acted on directly with a single
+    selector. In incremental mode only elements that are new or changed since
+    the previous snapshot of the same document are listed, plus the ids that
+    disappeared.
+    """
+
+    def __init__(self, max_chars: int = 6000, max_elements: int = 400, max_name_chars: int = 60):
+        """
+        Initialize the snapshotter.
+
+        Args:
+            max_chars: Budget for the serialized snapshot (about four characters per token)
+            max_elements: Maximum number of elements collected page-side
+            max_name_chars: Names and placeholders are cut to this length
+        """
+        self.max_chars = max_chars
+        self.max_elements = max_elements
+        self.max_name_chars = max_name_chars
+
+    async def snapshot(self, page, incremental: bool = False) -> dict:
+        """
+        Take a snapshot of a page in one round trip.
+
+        Args:
+            page: The Playwright page
+            incremental: Only list elements that changed since the previous snapshot
+
+        Returns:
+            Dict with url, title, elements, removed ids, total, truncated and reset
+            (True when the document is new and earlier ids no longer apply)
+        """
+        return await page.evaluate(_SNAPSHOT_JS, {
+            "attribute": SNAPSHOT_ATTRIBUTE,
+            "incremental": incremental,
+            "maxElements": self.max_elements,
+            "maxNameChars": self.max_name_chars,
+            "maxChars": self.max_chars,
+        })
+
+    async def describe(self, page, element_id: str, timeout: float = None) -> dict:
+        """
+        Name and structural CSS path of the element with a snapshot id.
+
+        Args:
+            page: The Playwright page
+            element_id: Id from a snapshot, e.g. 'e12'
+            timeout: Milliseconds to wait for the element; Playwright's default when None
+
+        Returns:
+            Dict with the element's name (accessible name, or label for fields) and path
+        """
+        return await page.locator(self.selector_for(element_id)).evaluate(_DESCRIBE_JS, timeout=timeout)
+
+    @staticmethod
+    def selector_for(element_id: str) -> str:
+        """CSS selector addressing the element with a snapshot id."""
+        return f'[{SNAPSHOT_ATTRIBUTE}="{element_id}"]'
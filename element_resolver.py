@@ -0,0 +1,294 @@
+import itertools
+from dataclasses import dataclass
+
+# Attribute the page-side resolver stamps on the winning element so that the
+# follow-up action can address it with a plain CSS selector.
+RESOLVER_ATTRIBUTE = "data-webmancer-ref"
+
+# Strategy names in the priority order of the original _smart_click cascade.
+CLICK_STRATEGIES = [
+    "role_button_exact",
+    "role_link_exact",
+    "role_button_partial",
+    "role_link_partial",
+    "xpath_exact_text",
+    "xpath_contains_text",
+    "button_has_text",
+    "link_has_text",
+    "input_placeholder_value",
+    "attribute_exact",
+    "attribute_case_insensitive",
+]
+
+# Strategy names in the priority order of the original _smart_fill cascade.
+FILL_STRATEGIES = [
+    "label_for",
+    "placeholder",
+    "label",
+    "input_placeholder",
+    "input_name_id",
+    "label_has_text",
+    "textarea",
+    "input_aria_title",
+    "contenteditable_has_text",
+    "login_field_type",
+    "partial_keyword",
+]
+
+# Page-side helpers shared by the resolver scripts and the DOM snapshot.
+PAGE_HELPERS_JS = """
+const norm = s => (s || "").replace(/\\s+/g, " ").trim();
+const isVisible = el => {
+    const rect = el.getBoundingClientRect();
+    if (rect.width === 0 && rect.height === 0) return false;
+    const style = getComputedStyle(el);
+    return style.visibility !== "hidden" && style.display !== "none";
+};
+const roleOf = el => {
+    const explicit = el.getAttribute("role");
+    if (explicit) return explicit.split(/\\s+/)[0];
+    const tag = el.tagName;
+    if (tag === "BUTTON" || tag === "SUMMARY") return "button";
+    if (tag === "INPUT" && ["button", "submit", "reset", "image"].includes((el.type || "").toLowerCase())) return "button";
+    if ((tag === "A" || tag === "AREA") && el.hasAttribute("href")) return "link";
+    return null;
+};
+const accessibleName = el => {
+    const label = el.getAttribute("aria-label");
+    if (label) return norm(label);
+    const labelledBy = el.getAttribute("aria-labelledby");
+    if (labelledBy) {
+        return norm(labelledBy.split(/\\s+/).map(id => (document.getElementById(id) || {}).textContent || "").join(" "));
+    }
+    if (el.tagName === "INPUT") return norm(el.value || el.getAttribute("alt") || el.title);
+    const text = norm(el.innerText !== undefined ? el.innerText : el.textContent);
+    if (text) return text;
+    const img = el.querySelector("img[alt]");
+    return norm(img ? img.alt : el.title);
+};
+const ownText = el => Array.from(el.childNodes).filter(n => n.nodeType === Node.TEXT_NODE).map(n => n.nodeValue);
+const cssPath = el => {
+    const parts = [];
+    for (let node = el; node && node.nodeType === Node.ELEMENT_NODE && node !== document.documentElement; node = node.parentElement) {
+        if (node.id && document.querySelectorAll(`#${CSS.escape(node.id)}`).length === 1) {
+            parts.unshift(`#${CSS.escape(node.id)}`);
+            break;
+        }
+        let part = node.tagName.toLowerCase();
+        const siblings = node.parentElement ? Array.from(node.parentElement.children).filter(s => s.tagName === node.tagName) : [];
+        if (siblings.length > 1) part += `:nth-of-type(${siblings.indexOf(node) + 1})`;
+        parts.unshift(part);
+    }
+    return parts.join(" > ");
+};
+// What the element looks like to a user, independent of its current value, so
+// a cached structural path can be checked to still point at the same thing.
+const fingerprint = el => {
+    const text = ["INPUT", "TEXTAREA", "SELECT"].includes(el.tagName) || el.isContentEditable ? "" : norm(el.textContent).slice(0, 80);
+    const labels = Array.from(el.labels || []).map(label => norm(label.textContent)).join(" ");
+    const attrs = ["aria-label", "placeholder", "name", "title", "type"].map(name => el.getAttribute(name) || "");
+    return [el.tagName.toLowerCase(), text, labels, ...attrs].join("|");
+};
+const stamp = (el, attribute, token) => {
+    document.querySelectorAll(`[${attribute}]`).forEach(old => old.removeAttribute(attribute));
+    el.setAttribute(attribute, token);
+};
+"""
+
+_CLICK_RESOLVER_JS = """
+({ target, order, attribute, token }) => {
+""" + PAGE_HELPERS_JS + """
+    const exact = norm(target);
+    const lowered = exact.toLowerCase();
+    const attrLower = (el, name) => (el.getAttribute(name) || "").toLowerCase();
+    const tests = {
+        role_button_exact: el => roleOf(el) === "button" && isVisible(el) && accessibleName(el) === exact,
+        role_link_exact: el => roleOf(el) === "link" && isVisible(el) && accessibleName(el) === exact,
+        role_button_partial: el => roleOf(el) === "button" && isVisible(el) && accessibleName(el).toLowerCase().includes(lowered),
+        role_link_partial: el => roleOf(el) === "link" && isVisible(el) && accessibleName(el).toLowerCase().includes(lowered),
+        xpath_exact_text: el => ownText(el).some(text => text === target),
+        xpath_contains_text: el => { const texts = ownText(el); return texts.length > 0 && texts[0].includes(target); },
+        button_has_text: el => el.tagName === "BUTTON" && norm(el.textContent).toLowerCase().includes(lowered),
+        link_has_text: el => el.tagName === "A" && norm(el.textContent).toLowerCase().includes(lowered),
+        input_placeholder_value: el => el.tagName === "INPUT" && (el.getAttribute("placeholder") === target || el.getAttribute("value") === target),
+        attribute_exact: el => ["title", "aria-label", "name", "id"].some(name => el.getAttribute(name) === target),
+        attribute_case_insensitive: el => ["title", "aria-label", "placeholder"].some(name => el.hasAttribute(name) && attrLower(el, name) === target.toLowerCase()),
+    };
+    const strategies = order.filter(name => name in tests);
+
+    // One pass in document order: an element only needs testing against
+    // strategies that rank above the best match found so far.
+    let best = strategies.length;
+    let winner = null;
+    for (const el of document.querySelectorAll("body *")) {
+        for (let i = 0; i < best; i++) {
+            if (tests[strategies[i]](el)) {
+                best = i;
+                winner = el;
+                break;
+            }
+        }
+        if (best === 0) break;
+    }
+    if (!winner) return null;
+    stamp(winner, attribute, token);
+    return { strategy: strategies[best], path: cssPath(winner), fingerprint: fingerprint(winner) };
+}
+"""
+
+_FILL_RESOLVER_JS = """
+({ field, order, attribute, token }) => {
+""" + PAGE_HELPERS_JS + """
+    const needle = norm(field).toLowerCase();
+    const contains = (value, part) => (value || "").toLowerCase().includes(part);
+    const attrContains = (el, names, part) => names.some(name => contains(el.getAttribute(name), part));
+    const NON_TEXT = ["hidden", "submit", "button", "reset", "image", "checkbox", "radio", "file", "range", "color"];
+    const editable = el => {
+        if (el.disabled || el.readOnly) return false;
+        if (el.tagName === "INPUT") return !NON_TEXT.includes((el.type || "").toLowerCase());
+        return true;
+    };
+
+    // Single DOM pass over everything that can take text, plus the labels pointing at it
+    const fields = Array.from(document.querySelectorAll('input, textarea, [contenteditable=""], [contenteditable="true"]'))
+        .filter(el => editable(el) && isVisible(el));
+    const labels = Array.from(document.querySelectorAll("label"));
+    const inputs = fields.filter(el => el.tagName === "INPUT");
+    const labelText = el => {
+        const parts = Array.from(el.labels || []).map(label => label.textContent);
+        parts.push(el.getAttribute("aria-label") || "");
+        const labelledBy = el.getAttribute("aria-labelledby");
+        if (labelledBy) labelledBy.split(/\\s+/).forEach(id => parts.push((document.getElementById(id) || {}).textContent || ""));
+        return norm(parts.join(" "));
+    };
+    const labelledField = predicate => {
+        for (const label of labels) {
+            if (predicate(label) && contains(norm(label.textContent), needle) && fields.includes(label.control)) return label.control;
+        }
+        return null;
+    };
+    const words = needle.split(" ").length > 1 ? needle.split(" ").filter(word => word.length > 3) : [];
+    // An empty type stands for inputs without a type attribute
+    const loginTypes = { username: ["text", "email", ""], email: ["text", "email", ""], password: ["password"] };
+
+    const tests = {
+        label_for: () => labelledField(label => label.htmlFor),
+        placeholder: () => fields.find(el => contains(el.getAttribute("placeholder"), needle)),
+        label: () => fields.find(el => contains(labelText(el), needle)),
+        input_placeholder: () => inputs.find(el => contains(el.getAttribute("placeholder"), needle)),
+        input_name_id: () => inputs.find(el => attrContains(el, ["name", "id"], needle)),
+        label_has_text: () => labelledField(() => true),
+        textarea: () => fields.find(el => el.tagName === "TEXTAREA" && attrContains(el, ["placeholder", "name"], needle)),
+        input_aria_title: () => inputs.find(el => attrContains(el, ["aria-label", "title"], needle)),
+        contenteditable_has_text: () => fields.find(el => el.isContentEditable && contains(norm(el.textContent), needle)),
+        login_field_type: () => {
+            for (const type of loginTypes[needle] || []) {
+                const match = inputs.find(el => (el.getAttribute("type") || "").toLowerCase() === type);
+                if (match) return match;
+            }
+            return null;
+        },
+        partial_keyword: () => {
+            for (const word of words) {
+                const match = inputs.find(el => attrContains(el, ["placeholder", "name", "id", "aria-label"], word));
+                if (match) return match;
+            }
+            return null;
+        },
+    };
+
+    for (const name of order) {
+        const winner = name in tests ? tests[name]() : null;
+        if (winner) {
+            stamp(winner, attribute, token);
+            return { strategy: name, path: cssPath(winner), fingerprint: fingerprint(winner) };
+        }
+    }
+    return null;
+}
+"""
+
+_FINGERPRINT_JS = """
+(selector) => {
+""" + PAGE_HELPERS_JS + """
+    const el = document.querySelector(selector);
+    return el ? fingerprint(el) : null;
+}
+"""
+
+
+@dataclass
+class Resolution:
+    """
+    The element a resolver picked.
+
+    ``selector`` addresses the stamped element for the immediate action, while
+    ``stable_selector`` is a structural CSS path that survives a page reload
+    and is what gets cached, together with the element's ``fingerprint``.
+    """
+    strategy: str
+    selector: str
+    stable_selector: str
+    fingerprint: str = None
+
+
+class ElementResolver:
+    """
+    Resolves natural-language targets to page elements in a single ``page.evaluate``.
+
+    Every strategy of the click and fill cascades is scored page-side in one
+    DOM pass, so a lookup costs one round trip whether it hits on the first
+    strategy or misses entirely.
+    """
+
+    def __init__(self):
+        self._tokens = itertools.count(1)
+
+    async def _resolve(self, page, script: str, args: dict) -> Resolution:
+        token = str(next(self._tokens))
+        match = await page.evaluate(script, {**args, "attribute": RESOLVER_ATTRIBUTE, "token": token})
+        if not match:
+            return None
+        return Resolution(strategy=match["strategy"], selector=f'[{RESOLVER_ATTRIBUTE}="{token}"]',
+                          stable_selector=match["path"], fingerprint=match.get("fingerprint"))
+
+    async def fingerprint(self, page, selector: str) -> str:
+        """
+        Fingerprint of the element a CSS selector currently points at.
+
+        Args:
+            page: The Playwright page to look in
+            selector: CSS selector of the element
+
+        Returns:
+            The fingerprint (tag, text, labels and identifying attributes), or None if nothing matches
+        """
+        return await page.evaluate(_FINGERPRINT_JS, selector)
+
+    async def resolve_click(self, page, target: str, order: list[str] = None) -> Resolution:
+        """
+        Find the element to click for a target description.
+
+        Args:
+            page: The Playwright page to search
+            target: Description of the element to click
+            order: Strategy names in priority order; defaults to CLICK_STRATEGIES
+
+        Returns:
+            The Resolution of the best match, or None if no strategy matched
+        """
+        return await self._resolve(page, _CLICK_RESOLVER_JS, {"target": target, "order": order or CLICK_STRATEGIES})
+
+    async def resolve_fill(self, page, field: str, order: list[str] = None) -> Resolution:
+        """
+        Find the input, textarea or contenteditable to fill for a field description.
+
+        Args:
+            page: The Playwright page to search
+            field: Name, label or placeholder text of the field
+            order: Strategy names in priority order; defaults to FILL_STRATEGIES
+
+        Returns:
+            The Resolution of the best match, or None if no strategy matched
+        """
+        return await self._resolve(page, _FILL_RESOLVER_JS, {"field": field, "order": order or FILL_STRATEGIES})
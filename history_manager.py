@@ -0,0 +1,161 @@
+import json
+
+from semantic_kernel.contents import AuthorRole, ChatHistory, ChatMessageContent, FunctionCallContent, FunctionResultContent
+
+from action_result import succeeded
+
+# First line of the assistant message that holds the summaries of compacted turns
+SUMMARY_HEADER = "Earlier steps:\n"
+
+# How tool calls are described once they are folded into a summary
+_STEP_TEMPLATES = {
+    "navigate_to_url": "opened {url}",
+    "find_and_click": "clicked '{text}'",
+    "find_and_fill": "filled '{field}'",
+    "type_string": "typed text",
+    "press_key": "pressed {key}",
+    "get_page_elements": "listed page elements",
+    "click_by_id": "clicked element {element_id}",
+    "fill_by_id": "filled element {element_id}",
+    "execute_steps": "ran a batch of steps",
+    "open_tab": "opened tab {name}",
+    "switch_tab": "switched to tab {name}",
+    "close_tab": "closed tab {name}",
+    "list_tabs": "listed tabs",
+    "visit_pages": "visited pages in parallel",
+}
+
+
+def _call_arguments(call: FunctionCallContent) -> dict:
+    arguments = call.arguments
+    if isinstance(arguments, str):
+        try:
+            arguments = json.loads(arguments or "{}")
+        except ValueError:
+            return {}
+    return dict(arguments or {})
+
+
+def describe_step(call: FunctionCallContent, result: FunctionResultContent = None) -> str:
+    """Compact description of one tool call and its outcome, e.g. "clicked 'Sign in' → ok"."""
+    template = _STEP_TEMPLATES.get(call.function_name, f"called {call.function_name}")
+    try:
+        step = template.format(**_call_arguments(call))
+    except (KeyError, IndexError):
+        step = f"called {call.function_name}"
+    if result is None:
+        return f"{step} → no result"
+    value = result.result
+    failed = not succeeded(value) or str(value).strip().lower() == "false"
+    return f"{step} → {'failed' if failed else 'ok'}"
+
+
+def _shorten(text: str, limit: int) -> str:
+    text = " ".join(str(text).split())
+    return text if len(text) <= limit else text[:limit - 1] + "…"
+
+
+class HistoryManager:
+    """
+    Keeps a ChatHistory within a token budget.
+
+    System messages and the most recent turns are kept verbatim. Older turns,
+    including the function-call and function-result messages produced by
+    auto function invocation, are folded into a single assistant message of
+    step summaries; if that is still over budget, the oldest summaries go.
+    Token counts are estimated from message length, which is accurate enough
+    for budgeting and needs no tokenizer.
+    """
+
+    def __init__(self, token_budget: int = 6000, keep_recent_turns: int = 2, chars_per_token: int = 4,
+                 summary_chars: int = 160):
+        """
+        Initialize the manager.
+
+        Args:
+            token_budget: Target upper bound for the tokens sent with each prompt
+            keep_recent_turns: Number of most recent user turns kept verbatim
+            chars_per_token: Characters per token used for the estimate
+            summary_chars: Maximum length of the query and answer quoted in a turn summary
+        """
+        self.token_budget = token_budget
+        self.keep_recent_turns = keep_recent_turns
+        self.chars_per_token = chars_per_token
+        self.summary_chars = summary_chars
+        self.turn_tokens = []
+
+    def count_tokens(self, message: ChatMessageContent) -> int:
+        """Estimated tokens of a message, including its function calls and results."""
+        chars = len(message.content or "")
+        for item in message.items:
+            if isinstance(item, FunctionCallContent):
+                chars += len(item.function_name or "") + len(str(item.arguments or ""))
+            elif isinstance(item, FunctionResultContent):
+                chars += len(str(item.result))
+        return chars // self.chars_per_token + 4
+
+    def history_tokens(self, history: ChatHistory) -> int:
+        return sum(self.count_tokens(message) for message in history.messages)
+
+    def _split_turns(self, messages: list) -> tuple[list, list, list]:
+        """Split messages into system messages, lines of earlier summaries, and user turns."""
+        system, summaries, turns = [], [], []
+        for message in messages:
+            if message.role == AuthorRole.SYSTEM:
+                system.append(message)
+                continue
+            if message.role == AuthorRole.ASSISTANT and (message.content or "").startswith(SUMMARY_HEADER):
+                summaries.extend(line for line in message.content[len(SUMMARY_HEADER):].splitlines() if line)
+                continue
+            if message.role == AuthorRole.USER or not turns:
+                turns.append([])
+            turns[-1].append(message)
+        return system, summaries, turns
+
+    def summarize_turn(self, turn: list) -> str:
+        """One-line summary of a turn: the request, the steps taken and the final answer."""
+        query = next((m.content for m in turn if m.role == AuthorRole.USER), "")
+        results = {item.id: item for m in turn for item in m.items if isinstance(item, FunctionResultContent)}
+        steps = [describe_step(item, results.get(item.id))
+                 for m in turn for item in m.items if isinstance(item, FunctionCallContent)]
+        answer = next((m.content for m in reversed(turn)
+                       if m.role == AuthorRole.ASSISTANT and m.content), "")
+        summary = f"User: {_shorten(query, self.summary_chars)}"
+        if steps:
+            summary += f" | Steps: {'; '.join(steps)}"
+        if answer:
+            summary += f" | Result: {_shorten(answer, self.summary_chars)}"
+        return summary
+
+    def compact(self, history: ChatHistory) -> ChatHistory:
+        """
+        Compact the history in place so that it fits the token budget.
+
+        Returns:
+            The same ChatHistory, for convenience
+        """
+        before = self.history_tokens(history)
+        if before > self.token_budget:
+            system, summaries, turns = self._split_turns(history.messages)
+            recent = turns[-self.keep_recent_turns:] if self.keep_recent_turns else []
+            older = turns[:len(turns) - len(recent)]
+            summaries += [self.summarize_turn(turn) for turn in older]
+            kept = [message for turn in recent for message in turn]
+            budget = self.token_budget - sum(self.count_tokens(m) for m in system + kept)
+            while summaries and (len("\n".join(summaries)) // self.chars_per_token + 4) > budget:
+                summaries.pop(0)
+
+            messages = list(system)
+            if summaries:
+                messages.append(ChatMessageContent(role=AuthorRole.ASSISTANT,
+                                                   content=SUMMARY_HEADER + "\n".join(summaries)))
+            history.messages[:] = messages + kept
+        self.turn_tokens.append({"before": before, "after": self.history_tokens(history)})
+        return history
+
+    def stats(self) -> dict:
+        """Per-turn token counts and the total saved by compaction."""
+        return {
+            "turns": self.turn_tokens,
+            "saved_tokens": sum(turn["before"] - turn["after"] for turn in self.turn_tokens),
+        }
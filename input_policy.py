@@ -0,0 +1,44 @@
+from dataclasses import dataclass, field
+from enum import Enum
+
+from url_utils import origin_of
+
+
+class InputMode(str, Enum):
+    """How text and keys are sent to the page."""
+    INSTANT = "instant"   # insert the text in one step into the focused editable element
+    BATCHED = "batched"   # real key events for the whole string in a single call, no delay
+    HUMAN = "human"       # real key events with a per-keystroke delay, for sites that need it
+
+
+@dataclass
+class InputPolicy:
+    """
+    Chooses the input mode and delays for typing and key presses.
+
+    The mode for an action is, in order of precedence: the mode requested by
+    the caller, the override for the page's origin, and the default mode.
+    """
+    mode: InputMode = InputMode.BATCHED
+    keystroke_delay_ms: int = 100
+    key_press_delay_ms: int = 500
+    origin_overrides: dict = field(default_factory=dict)
+
+    def set_origin_mode(self, origin: str, mode):
+        """Use a mode for every page on an origin (e.g. 'https://example.com')."""
+        self.origin_overrides[origin_of(origin) or origin] = InputMode(mode)
+
+    def mode_for(self, url: str, requested=None) -> InputMode:
+        """The mode for an action on a URL; an unknown requested mode (e.g. from the model) is ignored."""
+        if requested:
+            try:
+                return InputMode(requested)
+            except ValueError:
+                pass
+        return self.origin_overrides.get(origin_of(url), self.mode)
+
+    def keystroke_delay(self, mode: InputMode) -> int:
+        return self.keystroke_delay_ms if mode == InputMode.HUMAN else 0
+
+    def key_press_delay(self, mode: InputMode) -> int:
+        return self.key_press_delay_ms if mode == InputMode.HUMAN else 0
@@ -0,0 +1,322 @@
+import asyncio
+import contextlib
+import contextvars
+import heapq
+import itertools
+import logging
+import os
+import random
+import threading
+import time
+from collections import deque
+
+from metrics import latency_summary
+
+# Agent and priority of the model calls made from the current task; set by BrowserAgentHandler.interact
+current_agent = contextvars.ContextVar("webmancer_llm_agent", default=None)
+current_priority = contextvars.ContextVar("webmancer_llm_priority", default=0)
+
+# Environment variables configuring the shared scheduler
+RPM_ENV = "WEBMANCER_LLM_RPM"
+TPM_ENV = "WEBMANCER_LLM_TPM"
+CONCURRENCY_ENV = "WEBMANCER_LLM_CONCURRENCY"
+
+# Responses worth retrying: throttling, timeouts and transient server errors
+RETRYABLE_STATUS = frozenset({408, 429, 500, 502, 503, 504})
+
+
+@contextlib.contextmanager
+def calls_from(agent: str, priority: int = 0):
+    """Attribute the model calls made inside the block to an agent, at a priority (lower runs first)."""
+    agent_token = current_agent.set(agent)
+    priority_token = current_priority.set(priority)
+    try:
+        yield
+    finally:
+        current_priority.reset(priority_token)
+        current_agent.reset(agent_token)
+
+
+def status_of(error: Exception) -> int:
+    """HTTP status of a failed call (azure-core's HttpResponseError and similar), or None."""
+    status = getattr(error, "status_code", None)
+    if status is None:
+        status = getattr(getattr(error, "response", None), "status_code", None)
+    return status
+
+
+def retry_after_of(error: Exception) -> float:
+    """Seconds the server asked to wait before retrying, from retry-after-ms or retry-after, or None."""
+    headers = getattr(getattr(error, "response", None), "headers", None) or {}
+    for name, scale in (("retry-after-ms", 0.001), ("retry-after", 1.0)):
+        value = headers.get(name)
+        if value is not None:
+            try:
+                return float(value) * scale
+            except ValueError:
+                pass  # an HTTP date; fall back to our own backoff
+    return None
+
+
+class TokenBucket:
+    """
+    A budget refilled continuously at ``per_minute`` units per minute, holding at most ``capacity``.
+
+    The default capacity is one second's worth, so calls are paced evenly
+    instead of bursting a minute's budget into a service that enforces its
+    limit over shorter windows.
+    """
+
+    def __init__(self, per_minute: float, capacity: float = None):
+        self.rate = per_minute / 60.0
+        self.capacity = capacity or max(self.rate, 1.0)
+        self.available = float(self.capacity)
+        self._updated = time.monotonic()
+
+    def _refill(self):
+        now = time.monotonic()
+        self.available = min(self.capacity, self.available + (now - self._updated) * self.rate)
+        self._updated = now
+
+    def wait_time(self, amount: float) -> float:
+        """Seconds until ``amount`` units are available (amounts above the capacity wait for a full bucket)."""
+        self._refill()
+        missing = min(amount, self.capacity) - self.available
+        return missing / self.rate if missing > 0 else 0.0
+
+    def take(self, amount: float):
+        """Use ``amount`` units; the balance may go negative, which later callers wait out."""
+        self._refill()
+        self.available -= amount
+
+    def give_back(self, amount: float):
+        """Return units that were reserved but not used (a negative amount books extra use)."""
+        self._refill()
+        self.available = min(self.capacity, self.available + amount)
+
+
+class _Request:
+    __slots__ = ("call", "tokens", "agent", "future", "key", "submitted", "attempts")
+
+    def __init__(self, call, tokens: int, agent: str, future: asyncio.Future, key: tuple):
+        self.call = call
+        self.tokens = tokens
+        self.agent = agent
+        self.future = future
+        self.key = key
+        self.submitted = time.perf_counter()
+        self.attempts = 0
+
+
+class ModelScheduler:
+    """
+    Queues model calls from any number of agents and sends them within shared limits.
+
+    Calls wait in a priority queue and are dispatched while fewer than
+    ``max_concurrency`` are in flight and the requests-per-minute and
+    tokens-per-minute buckets allow. Within a priority, agents are served in
+    turn (start-time fair queuing), so one agent with a long backlog cannot
+    starve the others. Throttled and transiently failing calls are retried
+    with jittered exponential backoff; a 429 also holds back every other
+    call until the server's Retry-After has passed, instead of letting all
+    of them run into the same limit.
+
+    Token use is reserved from an estimate and corrected with the usage the
+    response reports. A scheduler serves one event loop at a time.
+    """
+
+    def __init__(self, requests_per_minute: float = None, tokens_per_minute: float = None, max_concurrency: int = 8,
+                 max_retries: int = 5, backoff_base: float = 0.5, backoff_max: float = 30.0, window: int = 1000):
+        """
+        Initialize the scheduler.
+
+        Args:
+            requests_per_minute: Request budget; unlimited when None
+            tokens_per_minute: Token budget (prompt plus completion); unlimited when None
+            max_concurrency: Maximum number of calls in flight
+            max_retries: Retries of a call that failed with a retryable status
+            backoff_base: Upper bound of the first retry delay in seconds; doubles per retry
+            backoff_max: Upper bound of any retry delay in seconds
+            window: Number of recent calls the latency metrics are computed over
+        """
+        self.max_concurrency = max_concurrency
+        self.max_retries = max_retries
+        self.backoff_base = backoff_base
+        self.backoff_max = backoff_max
+        self.logger = logging.getLogger(__name__)
+        self._requests = TokenBucket(requests_per_minute) if requests_per_minute else None
+        self._tokens = TokenBucket(tokens_per_minute) if tokens_per_minute else None
+        self._queue = []
+        self._seq = itertools.count()
+        self._agent_tags = {}
+        self._virtual_time = 0
+        self._active = 0
+        self._paused_until = 0.0
+        self._changed = None
+        self._dispatcher = None
+        self._running = set()
+        self._queue_wait_ms = deque(maxlen=window)
+        self._model_ms = deque(maxlen=window)
+        self._agents = {}
+        self.counters = {"submitted": 0, "completed": 0, "failed": 0, "retries": 0, "throttled": 0}
+
+    @classmethod
+    def from_env(cls) -> "ModelScheduler":
+        """A scheduler limited by WEBMANCER_LLM_RPM, WEBMANCER_LLM_TPM and WEBMANCER_LLM_CONCURRENCY, when set."""
+        def number(name):
+            value = os.environ.get(name)
+            return float(value) if value else None
+        return cls(requests_per_minute=number(RPM_ENV), tokens_per_minute=number(TPM_ENV),
+                   max_concurrency=int(number(CONCURRENCY_ENV) or 8))
+
+    async def submit(self, call, tokens: int = 0, priority: int = None, agent: str = None):
+        """
+        Queue a model call and return its result once it has run.
+
+        Args:
+            call: Zero-argument callable returning the awaitable that performs the call
+            tokens: Estimated tokens the call will use (prompt plus requested completion)
+            priority: Lower runs first; the current_priority context variable when None
+            agent: Agent the call is made for; the current_agent context variable when None
+
+        Raises:
+            Whatever the call raised on its last attempt
+        """
+        loop = asyncio.get_running_loop()
+        self._ensure_dispatcher(loop)
+        agent = current_agent.get() if agent is None else agent
+        priority = current_priority.get() if priority is None else priority
+        tag = max(self._agent_tags.get(agent, 0), self._virtual_time) + 1
+        self._agent_tags[agent] = tag
+        request = _Request(call, tokens, agent, loop.create_future(), (priority, tag, next(self._seq)))
+        self.counters["submitted"] += 1
+        self._push(request)
+        return await request.future
+
+    def _ensure_dispatcher(self, loop: asyncio.AbstractEventLoop):
+        if self._dispatcher is None or self._dispatcher.done() or self._dispatcher.get_loop() is not loop:
+            self._changed = asyncio.Event()
+            self._queue = [entry for entry in self._queue if not entry[-1].future.done()]
+            self._active = 0
+            self._dispatcher = loop.create_task(self._dispatch())
+
+    def _push(self, request: _Request):
+        heapq.heappush(self._queue, (*request.key, request))
+        self._changed.set()
+
+    async def _wait_for_change(self, timeout: float = None):
+        try:
+            await asyncio.wait_for(self._changed.wait(), timeout)
+        except asyncio.TimeoutError:
+            pass
+        self._changed.clear()
+
+    def _bucket_wait(self, request: _Request) -> float:
+        wait = self._paused_until - time.monotonic()
+        if self._requests is not None:
+            wait = max(wait, self._requests.wait_time(1))
+        if self._tokens is not None and request.tokens:
+            wait = max(wait, self._tokens.wait_time(request.tokens))
+        return wait
+
+    async def _dispatch(self):
+        while True:
+            # Callers that gave up (e.g. timed out) no longer need their call
+            while self._queue and self._queue[0][-1].future.done():
+                heapq.heappop(self._queue)
+            if not self._queue or self._active >= self.max_concurrency:
+                await self._wait_for_change()
+                continue
+            request = self._queue[0][-1]
+            delay = self._bucket_wait(request)
+            if delay > 0:
+                # Re-check sooner if a more urgent call arrives or a slot frees up
+                await self._wait_for_change(delay)
+                continue
+
+            heapq.heappop(self._queue)
+            if self._requests is not None:
+                self._requests.take(1)
+            if self._tokens is not None and request.tokens:
+                self._tokens.take(request.tokens)
+            self._virtual_time = request.key[1]
+            self._active += 1
+            task = asyncio.create_task(self._execute(request))
+            self._running.add(task)
+            task.add_done_callback(self._running.discard)
+
+    def _backoff(self, attempt: int, retry_after: float) -> float:
+        delay = random.uniform(0, min(self.backoff_max, self.backoff_base * 2 ** (attempt - 1)))
+        return max(delay, retry_after or 0.0)
+
+    async def _execute(self, request: _Request):
+        request.attempts += 1
+        now = time.perf_counter()
+        if request.attempts == 1:
+            wait_ms = (now - request.submitted) * 1000
+            self._queue_wait_ms.append(wait_ms)
+            agent = self._agents.setdefault(request.agent, {"calls": 0, "queue_wait_ms_total": 0.0})
+            agent["calls"] += 1
+            agent["queue_wait_ms_total"] += wait_ms
+        try:
+            result = await request.call()
+        except Exception as e:
+            self._active -= 1
+            self._changed.set()
+            if self._tokens is not None and request.tokens:
+                self._tokens.give_back(request.tokens)
+            status = status_of(e)
+            if status not in RETRYABLE_STATUS or request.attempts > self.max_retries or request.future.done():
+                self.counters["failed"] += 1
+                if not request.future.done():
+                    request.future.set_exception(e)
+                return
+            retry_after = retry_after_of(e)
+            delay = self._backoff(request.attempts, retry_after)
+            self.counters["retries"] += 1
+            if status == 429:
+                self.counters["throttled"] += 1
+                # Everyone is over the same limit: hold back the whole queue, not just this call
+                self._paused_until = max(self._paused_until, time.monotonic() + (retry_after or delay))
+            self.logger.info(f"Model call returned {status}; retry {request.attempts} in {delay:.2f}s")
+            await asyncio.sleep(delay)
+            self._push(request)
+            return
+
+        self._model_ms.append((time.perf_counter() - now) * 1000)
+        self._active -= 1
+        self._changed.set()
+        usage = getattr(result, "usage", None)
+        total = getattr(usage, "total_tokens", None)
+        if self._tokens is not None and total is not None:
+            self._tokens.give_back(request.tokens - total)
+        self.counters["completed"] += 1
+        if not request.future.done():
+            request.future.set_result(result)
+
+    def stats(self) -> dict:
+        """Call counts, queue wait vs. model latency, and calls and mean queue wait per agent."""
+        return {
+            **self.counters,
+            "queued": len(self._queue),
+            "in_flight": self._active,
+            "queue_wait": latency_summary(list(self._queue_wait_ms)),
+            "model_latency": latency_summary(list(self._model_ms)),
+            "agents": {
+                str(agent): {"calls": entry["calls"], "mean_queue_wait_ms": entry["queue_wait_ms_total"] / entry["calls"]}
+                for agent, entry in self._agents.items()
+            },
+        }
+
+
+_shared = None
+_shared_lock = threading.Lock()
+
+
+def shared_scheduler() -> ModelScheduler:
+    """The process-wide scheduler every agent's model calls go through, configured from the environment."""
+    global _shared
+    with _shared_lock:
+        if _shared is None:
+            _shared = ModelScheduler.from_env()
+        return _shared
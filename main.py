@@ -1,23 +1,107 @@
 import asyncio
+import math
 from BrowserAgentHandler import BrowserAgentHandler
+from context_pool import BrowserContextPool, run_pooled_tasks
+from llm_scheduler import shared_scheduler
+from task_io import TaskLineError, iter_tasks
+from tracing import tracer
+from worker_farm import WorkerFarm
 
 TASKS = [
     "Go to github.com. Click on Sign In. Fill in username and Password in their respective input fields after extracting them. Click on Sign in. ",
     "Click search. Type 'playwright' in the input field. Once filled, Press Enter key on keyboard. Then Click on playwright-python"
 ]
 
+# The first sample task only logs in; run(login=LOGIN) performs it through a saved session when one is accepted
+LOGIN = {"url": "https://github.com/settings/profile", "identity": "github", "instruction": TASKS[0]}
 
-async def run(headless: bool = False, tasks: list[str] = TASKS) -> bool:
+
+async def run(headless: bool = False, tasks: list[str] = TASKS, concurrency: int = 1,
+              workers: int = 0, task_file: str = None, trace_file: str = None, login: dict = None) -> bool:
+
+    if workers or task_file:
+        # Process-pool mode: every worker process owns its own agent and browser, and traces into trace_file itself
+        return await asyncio.to_thread(run_farm, headless, tasks, workers, task_file, trace_file=trace_file)
+
+    if trace_file:
+        # Spans of every layer are appended to trace_file and aggregated in memory
+        tracer.configure(jsonl_path=trace_file)
+
+    if concurrency > 1:
+        # Tasks must be independent of each other: each one runs on its own browser context
+        try:
+            return await run_concurrent(headless, tasks, concurrency)
+        finally:
+            await BrowserAgentHandler.close_shared_services()
+            tracer.close()
 
     agent = BrowserAgentHandler(headless=headless)
+    # Load the model stack and launch the browser while the first task is being set up
+    agent.start_prewarm()
+
+    try:
+        if login:
+            # Restores the saved session or runs the login instruction, then skips it in the task list
+            if not await agent.ensure_login(**login):
+                print("LOGIN FAILED")
+                return False
+            tasks = [task for task in tasks if task != login["instruction"]]
+
+        for i,instruction in enumerate(tasks):
+            print("INSTRUCTION ", i, ": ", instruction)
+            await agent.interact(instruction)
+            print("EXECUTED INSTRUCTION ", i)
+
+        print("HISTORY: ", agent.history)
+        print("BROWSER: ", agent.browser_stats())
+        print("ACTIONS: ", agent.action_stats())
+        print("MODEL: ", agent.model_call_stats())
+        if tracer.enabled:
+            print("TRACE: ", agent.trace_stats())
+    finally:
+        await agent.close()
+        await BrowserAgentHandler.close_shared_services()
+        tracer.close()
+
+
+async def run_concurrent(headless: bool, tasks: list[str], concurrency: int, browsers: int = 1):
+    pool = BrowserContextPool(browsers=browsers, contexts_per_browser=math.ceil(concurrency / browsers), headless=headless)
+    try:
+        results = await run_pooled_tasks(tasks, pool, concurrency=concurrency)
+        for i, result in enumerate(results):
+            if isinstance(result, BaseException):
+                print("FAILED INSTRUCTION ", i, ": ", result)
+        print("POOL: ", pool.stats())
+        print("MODEL: ", shared_scheduler().stats())
+        if tracer.enabled:
+            print("TRACE: ", tracer.report())
+        return results
+    finally:
+        await pool.close()
+
+
+def run_farm(headless: bool, tasks: list[str], workers: int = 0, task_file: str = None, prewarm: bool = False,
+             trace_file: str = None) -> dict:
+    farm = WorkerFarm(workers=workers or None, headless=headless, prewarm=prewarm, trace_file=trace_file)
+    if prewarm:
+        # Wait until every worker has its model stack loaded and its browser running
+        farm.start()
+    source = iter_tasks(task_file) if task_file else ((str(i), task) for i, task in enumerate(tasks))
 
-    for i,instruction in enumerate(tasks):
-        print("INSTRUCTION ", i, ": ", instruction)
-        history = await agent.interact(instruction)
-        print("EXECUTED INSTRUCTION ", i)
+    def valid_tasks():
+        for task_id, instruction in source:
+            if isinstance(instruction, TaskLineError):
+                print("FAILED INSTRUCTION ", task_id, ": ", instruction)
+                continue
+            yield task_id, instruction
 
-    print("HISTORY: ", history)
+    for result in farm.run(valid_tasks()):
+        status = "EXECUTED" if result["ok"] else "FAILED"
+        print(status, "INSTRUCTION ", result["task_id"], ": ", result["output"] or result["error"])
+    report = farm.report()
+    print("FARM: ", report)
+    return report
 
 
 if __name__ == "__main__":
-    asyncio.run(run())
\ No newline at end of file
+    asyncio.run(run())
\ No newline at end of file
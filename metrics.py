@@ -0,0 +1,30 @@
+def percentile(values: list[float], q: float) -> float:
+    """
+    Return the q-th percentile of values using linear interpolation.
+
+    Args:
+        values: Sample values, in any order
+        q: Percentile between 0 and 100
+
+    Returns:
+        The percentile, or 0.0 for an empty sample
+    """
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    rank = (len(ordered) - 1) * q / 100
+    lower = int(rank)
+    upper = min(lower + 1, len(ordered) - 1)
+    return ordered[lower] + (ordered[upper] - ordered[lower]) * (rank - lower)
+
+
+def latency_summary(latencies_ms: list[float]) -> dict:
+    """Count, mean, p50, p95 and max of a list of latencies in milliseconds."""
+    count = len(latencies_ms)
+    return {
+        "count": count,
+        "mean_ms": sum(latencies_ms) / count if count else 0.0,
+        "p50_ms": percentile(latencies_ms, 50),
+        "p95_ms": percentile(latencies_ms, 95),
+        "max_ms": max(latencies_ms) if count else 0.0,
+    }
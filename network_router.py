@@ -0,0 +1,250 @@
+import asyncio
+import hashlib
+import json
+import logging
+import os
+import re
+import tempfile
+import time
+from dataclasses import dataclass
+from urllib.parse import urlsplit
+
+from url_utils import origin_of
+
+# Hosts of common analytics and advertising services. Requests to these hosts
+# (or their subdomains) never affect what the agent interacts with.
+DEFAULT_TRACKER_HOSTS = (
+    "google-analytics.com",
+    "googletagmanager.com",
+    "googlesyndication.com",
+    "googleadservices.com",
+    "doubleclick.net",
+    "adservice.google.com",
+    "connect.facebook.net",
+    "hotjar.com",
+    "segment.com",
+    "segment.io",
+    "mixpanel.com",
+    "amplitude.com",
+    "scorecardresearch.com",
+    "newrelic.com",
+    "nr-data.net",
+)
+
+CACHEABLE_RESOURCE_TYPES = ("stylesheet", "script", "font", "image")
+
+# Headers describing the body as it came over the wire; cached bodies are
+# stored already decoded, so these would no longer be true of them.
+TRANSFER_HEADERS = ("content-encoding", "content-length", "transfer-encoding")
+
+
+@dataclass
+class RoutingRules:
+    """
+    What the router does with the requests of a page.
+
+    Attributes:
+        block_resource_types: Resource types aborted outright
+        block_trackers: Whether requests to tracker_hosts are aborted
+        tracker_hosts: Hosts treated as trackers, matched including subdomains
+        stub_script_hosts: Third-party hosts whose scripts are answered with an empty script
+        cache_static: Whether cacheable static assets are served from the on-disk cache
+    """
+    block_resource_types: tuple = ("image", "font", "media")
+    block_trackers: bool = True
+    tracker_hosts: tuple = DEFAULT_TRACKER_HOSTS
+    stub_script_hosts: tuple = ()
+    cache_static: bool = True
+
+
+def without_transfer_headers(headers: dict) -> dict:
+    return {name: value for name, value in headers.items() if name.lower() not in TRANSFER_HEADERS}
+
+
+def _host_matches(host: str, hosts: tuple) -> bool:
+    return any(host == candidate or host.endswith("." + candidate) for candidate in hosts)
+
+
+def decide(rules: RoutingRules, url: str, resource_type: str) -> str:
+    """
+    Decide how to handle a request.
+
+    Returns:
+        'block', 'stub', 'cache' or 'continue'
+    """
+    host = (urlsplit(url).hostname or "").lower()
+    if rules.block_trackers and _host_matches(host, rules.tracker_hosts):
+        return "block"
+    if resource_type in rules.block_resource_types:
+        return "block"
+    if resource_type == "script" and _host_matches(host, rules.stub_script_hosts):
+        return "stub"
+    if rules.cache_static and resource_type in CACHEABLE_RESOURCE_TYPES and url.startswith(("http://", "https://")):
+        return "cache"
+    return "continue"
+
+
+class AssetCache:
+    """
+    On-disk cache of static responses shared by every context and run using the same directory.
+
+    Each entry is a body file plus a JSON metadata file holding the status,
+    headers, expiry and how long the original fetch took. Bodies are stored
+    decoded, without the headers that described their encoding. The methods
+    do blocking file I/O; the router calls them off the event loop.
+    """
+
+    def __init__(self, directory: str, default_ttl: int = 3600, max_entry_bytes: int = 5 * 1024 * 1024):
+        self.directory = directory
+        self.default_ttl = default_ttl
+        self.max_entry_bytes = max_entry_bytes
+        os.makedirs(directory, exist_ok=True)
+
+    def _paths(self, url: str) -> tuple[str, str]:
+        key = hashlib.sha256(url.encode("utf-8")).hexdigest()
+        return os.path.join(self.directory, key + ".json"), os.path.join(self.directory, key + ".body")
+
+    def ttl_for(self, status: int, headers: dict) -> int:
+        """Seconds a response may be cached for, or 0 if it must not be cached."""
+        if status != 200:
+            return 0
+        cache_control = headers.get("cache-control", "").lower()
+        if any(directive in cache_control for directive in ("no-store", "no-cache", "private")):
+            return 0
+        match = re.search(r"max-age=(\d+)", cache_control)
+        return int(match.group(1)) if match else self.default_ttl
+
+    def get(self, url: str):
+        """Return (metadata, body) for a fresh entry, or None."""
+        meta_path, body_path = self._paths(url)
+        try:
+            with open(meta_path, encoding="utf-8") as f:
+                meta = json.load(f)
+            if meta["expires_at"] < time.time():
+                return None
+            with open(body_path, "rb") as f:
+                return meta, f.read()
+        except (OSError, ValueError, KeyError):
+            return None
+
+    def _write(self, path: str, data: bytes):
+        # Other contexts and processes read the directory concurrently: write under a
+        # private name and swap the file in whole, so no reader sees a partial file
+        fd, tmp_path = tempfile.mkstemp(dir=self.directory, suffix=".tmp")
+        try:
+            with os.fdopen(fd, "wb") as f:
+                f.write(data)
+            os.replace(tmp_path, path)
+        except BaseException:
+            os.unlink(tmp_path)
+            raise
+
+    def put(self, url: str, status: int, headers: dict, body: bytes, fetch_ms: float) -> bool:
+        """Store a response if its headers allow it; returns whether it was stored."""
+        ttl = self.ttl_for(status, headers)
+        if not ttl or len(body) > self.max_entry_bytes:
+            return False
+        meta_path, body_path = self._paths(url)
+        self._write(body_path, body)
+        meta = {"url": url, "status": status, "headers": without_transfer_headers(headers), "fetch_ms": fetch_ms,
+                "expires_at": time.time() + ttl}
+        # The metadata goes last: get() only finds an entry once its body is complete
+        self._write(meta_path, json.dumps(meta).encode("utf-8"))
+        return True
+
+
+def _new_stats() -> dict:
+    return {"requests": 0, "blocked": 0, "stubbed": 0, "cache_hits": 0, "cache_misses": 0,
+            "bytes_saved": 0, "time_saved_ms": 0.0}
+
+
+class NetworkRouter:
+    """
+    Routes every request of a browser context through blocking, stubbing and caching rules.
+
+    Rules can be set per origin of the page making the request; pages on
+    other origins use the default rules. Savings are counted per navigation
+    (see begin_navigation) and in total.
+    """
+
+    def __init__(self, rules: RoutingRules = None, origin_rules: dict = None, cache_dir: str = None):
+        """
+        Initialize the router.
+
+        Args:
+            rules: Default rules
+            origin_rules: Mapping of page origin (e.g. 'https://github.com') to RoutingRules
+            cache_dir: Directory of the shared asset cache; static caching is off without it
+        """
+        self.rules = rules or RoutingRules()
+        self.origin_rules = {origin_of(origin) or origin: value for origin, value in (origin_rules or {}).items()}
+        self.cache = AssetCache(cache_dir) if cache_dir else None
+        self.logger = logging.getLogger(__name__)
+        self.navigation_stats = _new_stats()
+        self.total_stats = _new_stats()
+
+    def rules_for(self, page_url: str) -> RoutingRules:
+        return self.origin_rules.get(origin_of(page_url), self.rules)
+
+    async def install(self, context):
+        """Route all requests of a browser context through this router."""
+        await context.route("**/*", self._handle)
+
+    def begin_navigation(self):
+        """Start counting savings for a new navigation."""
+        self.navigation_stats = _new_stats()
+
+    def _count(self, key: str, amount=1):
+        self.navigation_stats[key] += amount
+        self.total_stats[key] += amount
+
+    @staticmethod
+    def _page_url(request) -> str:
+        if request.is_navigation_request():
+            return request.url
+        try:
+            return request.frame.page.url
+        except Exception:
+            return request.url
+
+    async def _handle(self, route, request):
+        self._count("requests")
+        action = decide(self.rules_for(self._page_url(request)), request.url, request.resource_type)
+        try:
+            if action == "block":
+                self._count("blocked")
+                await route.abort("blockedbyclient")
+            elif action == "stub":
+                self._count("stubbed")
+                await route.fulfill(status=200, content_type="application/javascript", body="")
+            elif action == "cache" and self.cache is not None and request.method == "GET":
+                await self._serve_cached(route, request)
+            else:
+                await route.continue_()
+        except Exception as e:
+            self.logger.info(f"Routing {request.url} failed, letting it through: {e}")
+            try:
+                await route.continue_()
+            except Exception:
+                pass
+
+    async def _serve_cached(self, route, request):
+        cached = await asyncio.to_thread(self.cache.get, request.url)
+        if cached is not None:
+            meta, body = cached
+            self._count("cache_hits")
+            self._count("bytes_saved", len(body))
+            self._count("time_saved_ms", meta["fetch_ms"])
+            await route.fulfill(status=meta["status"], headers=meta["headers"], body=body)
+            return
+
+        self._count("cache_misses")
+        started = time.perf_counter()
+        response = await route.fetch()
+        body = await response.body()
+        fetch_ms = (time.perf_counter() - started) * 1000
+        await asyncio.to_thread(self.cache.put, request.url, response.status, response.headers, body, fetch_ms)
+        await route.fulfill(response=response, headers=without_transfer_headers(response.headers), body=body)
+
+    def stats(self) -> dict:
+        return {"last_navigation": dict(self.navigation_stats), "total": dict(self.total_stats)}
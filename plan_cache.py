@@ -0,0 +1,83 @@
+import re
+import time
+from collections import OrderedDict
+from dataclasses import dataclass, field
+
+
+def normalize_instruction(instruction: str) -> str:
+    """Case-, whitespace- and trailing-punctuation-insensitive form of an instruction."""
+    return re.sub(r"\s+", " ", instruction).strip().rstrip(".!").lower()
+
+
+@dataclass
+class CachedPlan:
+    """
+    The function calls the model made for an instruction on its last successful run.
+
+    Each call is a dict with ``plugin``, ``function`` and ``arguments``. An
+    argument value of the form ``{"$result_of": i}`` stands for the result of
+    call ``i``, so credentials are looked up again on replay rather than stored.
+    """
+    calls: list[dict]
+    response: str
+    tokens: int = 0
+    latency_ms: float = 0.0
+    created_at: float = field(default_factory=time.time)
+
+
+class PlanCache:
+    """
+    LRU cache of model-produced plans keyed on (normalized instruction, starting origin).
+
+    Entries expire after ``ttl_seconds`` and are invalidated when a replayed
+    step fails. Replays are credited with the tokens and latency the original
+    model run cost.
+    """
+
+    def __init__(self, max_entries: int = 256, ttl_seconds: float = 24 * 3600):
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self._plans = OrderedDict()
+        self.metrics = {"hits": 0, "misses": 0, "expired": 0, "invalidated": 0,
+                        "saved_tokens": 0, "saved_latency_ms": 0.0}
+
+    @staticmethod
+    def make_key(instruction: str, origin: str) -> tuple:
+        return normalize_instruction(instruction), origin
+
+    def get(self, instruction: str, origin: str) -> CachedPlan:
+        """Return the live plan for an instruction started on origin, or None."""
+        key = self.make_key(instruction, origin)
+        plan = self._plans.get(key)
+        if plan is not None and time.time() - plan.created_at > self.ttl_seconds:
+            del self._plans[key]
+            self.metrics["expired"] += 1
+            plan = None
+        if plan is None:
+            self.metrics["misses"] += 1
+            return None
+        self._plans.move_to_end(key)
+        self.metrics["hits"] += 1
+        return plan
+
+    def put(self, instruction: str, origin: str, plan: CachedPlan):
+        key = self.make_key(instruction, origin)
+        self._plans[key] = plan
+        self._plans.move_to_end(key)
+        while len(self._plans) > self.max_entries:
+            self._plans.popitem(last=False)
+
+    def invalidate(self, instruction: str, origin: str):
+        if self._plans.pop(self.make_key(instruction, origin), None) is not None:
+            self.metrics["invalidated"] += 1
+
+    def record_replay(self, plan: CachedPlan, elapsed_ms: float):
+        """Credit a successful replay with the model cost it avoided."""
+        self.metrics["saved_tokens"] += plan.tokens
+        self.metrics["saved_latency_ms"] += max(plan.latency_ms - elapsed_ms, 0.0)
+
+    def __len__(self) -> int:
+        return len(self._plans)
+
+    def stats(self) -> dict:
+        return {**self.metrics, "entries": len(self._plans)}
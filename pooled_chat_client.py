@@ -0,0 +1,104 @@
+import asyncio
+import functools
+import json
+import threading
+
+from azure.ai.inference.aio import ChatCompletionsClient
+from azure.core.credentials import AzureKeyCredential
+from semantic_kernel.connectors.ai.azure_ai_inference import AzureAIInferenceChatCompletion
+
+from llm_scheduler import ModelScheduler, shared_scheduler
+
+
+def estimate_tokens(messages: list, tools: list = None, max_tokens: int = None, chars_per_token: int = 4) -> int:
+    """Rough token cost of a request: its messages and tool definitions, plus the completion it may produce."""
+    chars = sum(len(str(getattr(message, "content", None) or "")) for message in messages or [])
+    if tools:
+        chars += len(str(tools))
+    return chars // chars_per_token + (max_tokens or 0)
+
+
+class ScheduledChatCompletionsClient(ChatCompletionsClient):
+    """
+    ChatCompletionsClient whose calls wait their turn in a ModelScheduler.
+
+    One instance is meant to be shared by every agent of a process, so that
+    they reuse its HTTP connections. azure-core's own retries are turned off:
+    the scheduler retries throttled calls for all agents at once instead of
+    each client retrying on its own.
+
+    An aio client's HTTP session belongs to the event loop it was opened on,
+    so the calls are sent by one plain ChatCompletionsClient per event loop
+    (e.g. per asyncio.run()), created on the loop's first call. close()
+    closes the one of the running loop.
+    """
+
+    def __init__(self, endpoint: str, credential, scheduler: ModelScheduler = None, **kwargs):
+        kwargs.setdefault("retry_total", 0)
+        super().__init__(endpoint, credential, **kwargs)
+        self.scheduler = scheduler or shared_scheduler()
+        self._client_args = (endpoint, credential, kwargs)
+        self._loop_clients = {}
+        self._loop_clients_lock = threading.Lock()
+
+    def _loop_client(self) -> ChatCompletionsClient:
+        loop = asyncio.get_running_loop()
+        with self._loop_clients_lock:
+            # The session of a finished loop cannot be closed any more; it is only dropped
+            for finished in [other for other in self._loop_clients if other.is_closed()]:
+                del self._loop_clients[finished]
+            client = self._loop_clients.get(loop)
+            if client is None:
+                endpoint, credential, kwargs = self._client_args
+                client = self._loop_clients[loop] = ChatCompletionsClient(endpoint, credential, **kwargs)
+            return client
+
+    async def complete(self, **kwargs):
+        max_tokens = kwargs.get("max_tokens") if kwargs.get("max_tokens") is not None else self._max_tokens
+        tokens = estimate_tokens(kwargs.get("messages"), kwargs.get("tools"), max_tokens)
+        return await self.scheduler.submit(functools.partial(self._loop_client().complete, **kwargs), tokens)
+
+    async def close(self):
+        with self._loop_clients_lock:
+            client = self._loop_clients.pop(asyncio.get_running_loop(), None)
+        if client is not None:
+            await client.close()
+        await super().close()
+
+
+_services = {}
+_services_lock = threading.Lock()
+
+
+def shared_chat_service(model_name: str, endpoint: str, key: str, scheduler: ModelScheduler = None,
+                        **client_options) -> AzureAIInferenceChatCompletion:
+    """
+    The chat completion service for an endpoint and model, shared by every agent of the process.
+
+    Callers asking for the same endpoint and model with a different key,
+    scheduler or client options get a service of their own.
+
+    Args:
+        model_name: Model (deployment) name
+        endpoint: Azure AI Inference endpoint
+        key: API key
+        scheduler: Scheduler the calls go through; the process-wide one when omitted
+        client_options: Defaults for every call, e.g. max_tokens and temperature
+    """
+    scheduler = scheduler or shared_scheduler()
+    cache_key = (endpoint, model_name, key, scheduler, json.dumps(client_options, sort_keys=True, default=repr))
+    with _services_lock:
+        service = _services.get(cache_key)
+        if service is None:
+            client = ScheduledChatCompletionsClient(endpoint=endpoint, credential=AzureKeyCredential(key),
+                                                    scheduler=scheduler, **client_options)
+            service = _services[cache_key] = AzureAIInferenceChatCompletion(ai_model_id=model_name, client=client)
+        return service
+
+
+async def close_shared_chat_services():
+    """Close the connections the shared chat services opened on the running event loop; call it before the loop ends."""
+    with _services_lock:
+        services = list(_services.values())
+    for service in services:
+        await service.client.close()
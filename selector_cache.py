@@ -0,0 +1,115 @@
+import json
+import logging
+import os
+import re
+from collections import OrderedDict
+from urllib.parse import urlsplit
+
+# Path segments that identify a record rather than a page type: numbers,
+# hex/uuid-like ids and long tokens mixing letters and digits.
+_VARIABLE_SEGMENT = re.compile(r"^(\d+|[0-9a-f]{8,}|[0-9a-f-]{32,36}|(?=.*\d)(?=.*[a-z])[a-z0-9_-]{16,})$", re.IGNORECASE)
+
+
+def normalize_path(path: str) -> str:
+    """Collapse record-specific path segments so /repo/123/issues and /repo/456/issues share entries."""
+    segments = [":id" if _VARIABLE_SEGMENT.match(segment) else segment
+                for segment in path.strip("/").split("/") if segment]
+    return "/" + "/".join(segments)
+
+
+def normalize_target(target: str) -> str:
+    """Case- and whitespace-insensitive form of a target description."""
+    return " ".join(target.split()).lower()
+
+
+class SelectorCache:
+    """
+    LRU cache of the selectors that resolved a click or fill target on a page.
+
+    Entries are keyed by (origin, normalized path pattern, action, normalized
+    target) and store the resolved CSS selector along with the strategy that
+    found it and a fingerprint of the element, which is re-checked before a
+    cached selector is used. The cache can optionally be persisted to a JSON file so repeated
+    runs against the same site start warm.
+    """
+
+    def __init__(self, max_entries: int = 1000, path: str = None):
+        """
+        Initialize the cache.
+
+        Args:
+            max_entries: Maximum number of entries before the least recently used is evicted
+            path: Optional JSON file to load entries from and save them to
+        """
+        self.max_entries = max_entries
+        self.path = path
+        self.logger = logging.getLogger(__name__)
+        self._entries = OrderedDict()
+        self.metrics = {"hits": 0, "misses": 0, "stale": 0, "mismatches": 0, "evictions": 0}
+        if path and os.path.exists(path):
+            self.load()
+
+    @staticmethod
+    def make_key(url: str, action: str, target: str) -> str:
+        parts = urlsplit(url)
+        return "|".join([f"{parts.scheme}://{parts.netloc}", normalize_path(parts.path), action, normalize_target(target)])
+
+    def get(self, url: str, action: str, target: str) -> dict:
+        """Return the cached entry ({'selector', 'strategy', 'fingerprint'}) for a target, or None."""
+        key = self.make_key(url, action, target)
+        entry = self._entries.get(key)
+        if entry is None:
+            self.metrics["misses"] += 1
+            return None
+        self._entries.move_to_end(key)
+        self.metrics["hits"] += 1
+        return entry
+
+    def put(self, url: str, action: str, target: str, selector: str, strategy: str, fingerprint: str = None):
+        """Remember the selector that resolved a target and the fingerprint of the element it found."""
+        key = self.make_key(url, action, target)
+        self._entries[key] = {"selector": selector, "strategy": strategy, "fingerprint": fingerprint}
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+            self.metrics["evictions"] += 1
+
+    def invalidate(self, url: str, action: str, target: str):
+        """Drop an entry whose selector no longer points at a usable element."""
+        if self._entries.pop(self.make_key(url, action, target), None) is not None:
+            self.metrics["stale"] += 1
+
+    def mismatch(self, url: str, action: str, target: str):
+        """Drop an entry whose selector now points at a different element, counting the lookup as a miss."""
+        if self._entries.pop(self.make_key(url, action, target), None) is not None:
+            self.metrics["hits"] -= 1
+            self.metrics["misses"] += 1
+            self.metrics["mismatches"] += 1
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def stats(self) -> dict:
+        lookups = self.metrics["hits"] + self.metrics["misses"]
+        return {**self.metrics, "entries": len(self._entries),
+                "hit_rate": self.metrics["hits"] / lookups if lookups else 0.0}
+
+    def load(self):
+        """Load entries from the configured file, keeping at most max_entries of them."""
+        try:
+            with open(self.path, encoding="utf-8") as f:
+                entries = json.load(f)
+        except (OSError, ValueError) as e:
+            self.logger.warning(f"Could not load selector cache from {self.path}: {e}")
+            return
+        for key, entry in list(entries.items())[-self.max_entries:]:
+            self._entries[key] = entry
+
+    def save(self):
+        """Write the entries to the configured file, if any."""
+        if not self.path:
+            return
+        tmp_path = f"{self.path}.tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump(self._entries, f)
+        os.replace(tmp_path, self.path)
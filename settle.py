@@ -0,0 +1,176 @@
+import asyncio
+import logging
+import time
+import weakref
+from collections import deque
+from dataclasses import dataclass
+
+from metrics import latency_summary
+
+# Resolves once the DOM has seen no mutations for quietMs, or after timeoutMs at the latest.
+_DOM_LULL_JS = """
+({ quietMs, timeoutMs }) => new Promise(resolve => {
+    const started = performance.now();
+    let timer = null;
+    const done = mutated => {
+        observer.disconnect();
+        clearTimeout(timer);
+        clearTimeout(deadline);
+        resolve({ mutated, waitedMs: performance.now() - started });
+    };
+    let mutated = false;
+    const observer = new MutationObserver(() => {
+        mutated = true;
+        clearTimeout(timer);
+        timer = setTimeout(() => done(true), quietMs);
+    });
+    observer.observe(document, { subtree: true, childList: true, attributes: true, characterData: true });
+    timer = setTimeout(() => done(mutated), quietMs);
+    const deadline = setTimeout(() => done(mutated), timeoutMs);
+})
+"""
+
+
+@dataclass
+class SettlePolicy:
+    """
+    How long to wait for a page to settle after navigations and actions.
+
+    Attributes:
+        navigation_wait_until: Load state navigate() waits for ('commit', 'domcontentloaded', 'load', 'networkidle')
+        navigation_timeout_ms: Maximum navigation time
+        settle_actions: Actions that are followed by a settle wait
+        dom_quiet_ms: Length of the DOM-mutation lull that counts as settled
+        network_quiet_ms: Time without tracked requests in flight that counts as network quiescence
+        max_settle_ms: Upper bound on any single settle wait
+        tracked_resource_types: Request types that keep the network from being quiet
+    """
+    navigation_wait_until: str = "domcontentloaded"
+    navigation_timeout_ms: int = 30000
+    settle_actions: tuple = ("navigate", "click", "press")
+    dom_quiet_ms: int = 100
+    network_quiet_ms: int = 200
+    max_settle_ms: int = 3000
+    tracked_resource_types: tuple = ("document", "xhr", "fetch")
+
+
+class _NetworkMonitor:
+    """Counts in-flight requests of the tracked resource types on a page."""
+
+    def __init__(self, page, resource_types: tuple):
+        self.resource_types = resource_types
+        self.in_flight = set()
+        self.last_activity = time.monotonic()
+        self.navigations = 0
+        page.on("request", self._on_request)
+        page.on("requestfinished", self._on_done)
+        page.on("requestfailed", self._on_done)
+        page.on("framenavigated", self._on_navigated)
+
+    def _on_request(self, request):
+        if request.resource_type in self.resource_types:
+            self.in_flight.add(request)
+            self.last_activity = time.monotonic()
+
+    def _on_done(self, request):
+        if request in self.in_flight:
+            self.in_flight.discard(request)
+            self.last_activity = time.monotonic()
+
+    def _on_navigated(self, frame):
+        # Holding on to page.main_frame would keep the page, the key of this monitor, alive
+        if frame.parent_frame is None:
+            self.navigations += 1
+
+
+class SettleEngine:
+    """
+    Waits after an action only for the signals that actually occur.
+
+    A navigation triggered by the action is awaited up to DOMContentLoaded;
+    then the engine waits for tracked requests to drain and for a short
+    DOM-mutation lull, all bounded by the policy's max_settle_ms. Per-action
+    timings are kept for the last ``history`` actions.
+    """
+
+    def __init__(self, policy: SettlePolicy = None, history: int = 500):
+        self.policy = policy or SettlePolicy()
+        self.logger = logging.getLogger(__name__)
+        self.timings = deque(maxlen=history)
+        self._monitors = weakref.WeakKeyDictionary()
+
+    def attach(self, page):
+        """Start tracking network activity on a page; safe to call repeatedly."""
+        if page not in self._monitors:
+            self._monitors[page] = _NetworkMonitor(page, self.policy.tracked_resource_types)
+            page.on("close", self._detach)
+
+    def _detach(self, page):
+        # Requests still in flight on a closed page never finish; drop them with the monitor
+        self._monitors.pop(page, None)
+
+    def mark(self, page) -> int:
+        """Navigation counter to pass to settle() so it can tell whether the action navigated."""
+        self.attach(page)
+        return self._monitors[page].navigations
+
+    async def settle(self, page, action: str, mark: int = None) -> dict:
+        """
+        Wait for the page to settle after an action.
+
+        Args:
+            page: The page the action was performed on
+            action: Action name, matched against the policy's settle_actions
+            mark: Value of mark() taken before the action
+
+        Returns:
+            Timing record with the navigation, network and DOM wait durations in milliseconds
+        """
+        if action not in self.policy.settle_actions:
+            return {}
+        self.attach(page)
+        monitor = self._monitors[page]
+        started = time.monotonic()
+        deadline = started + self.policy.max_settle_ms / 1000
+        record = {"action": action, "navigated": mark is not None and monitor.navigations != mark,
+                  "navigation_ms": 0.0, "network_ms": 0.0, "dom_ms": 0.0}
+
+        if record["navigated"]:
+            step = time.monotonic()
+            try:
+                await page.wait_for_load_state("domcontentloaded", timeout=self._remaining_ms(deadline))
+            except Exception as e:
+                self.logger.info(f"Navigation after {action} did not reach DOMContentLoaded: {e}")
+            record["navigation_ms"] = (time.monotonic() - step) * 1000
+
+        step = time.monotonic()
+        quiet = self.policy.network_quiet_ms / 1000
+        while time.monotonic() < deadline:
+            if not monitor.in_flight and time.monotonic() - monitor.last_activity >= quiet:
+                break
+            await asyncio.sleep(0.025)
+        record["network_ms"] = (time.monotonic() - step) * 1000
+
+        step = time.monotonic()
+        try:
+            await page.evaluate(_DOM_LULL_JS, {"quietMs": self.policy.dom_quiet_ms,
+                                               "timeoutMs": self._remaining_ms(deadline)})
+        except Exception as e:
+            # A late navigation replaces the execution context; the new document is all we wait for
+            self.logger.info(f"DOM lull wait interrupted: {e}")
+        record["dom_ms"] = (time.monotonic() - step) * 1000
+
+        record["total_ms"] = (time.monotonic() - started) * 1000
+        self.timings.append(record)
+        return record
+
+    @staticmethod
+    def _remaining_ms(deadline: float) -> int:
+        return max(int((deadline - time.monotonic()) * 1000), 1)
+
+    def stats(self) -> dict:
+        """Settle latency summaries per action type."""
+        by_action = {}
+        for record in self.timings:
+            by_action.setdefault(record["action"], []).append(record["total_ms"])
+        return {action: latency_summary(values) for action, values in by_action.items()}
@@ -0,0 +1,141 @@
+import hashlib
+import json
+import logging
+import os
+import time
+from urllib.parse import urlsplit
+
+from url_utils import origin_of
+
+# Environment variable holding the Fernet key the snapshots are encrypted with
+STATE_KEY_ENV = "WEBMANCER_STATE_KEY"
+
+
+def _host_matches(host: str, cookie_domain: str) -> bool:
+    domain = cookie_domain.lstrip(".").lower()
+    return host == domain or host.endswith("." + domain)
+
+
+def filter_state(state: dict, origin: str) -> dict:
+    """The part of a Playwright storage state that belongs to one origin: its site's cookies and its localStorage."""
+    host = (urlsplit(origin).hostname or "").lower()
+    return {
+        "cookies": [cookie for cookie in state.get("cookies", []) if _host_matches(host, cookie.get("domain", ""))],
+        "origins": [entry for entry in state.get("origins", []) if entry.get("origin") == origin],
+    }
+
+
+def has_live_cookies(state: dict, now: float = None) -> bool:
+    """Whether any cookie of a state is still unexpired (session cookies, with expires -1, count as live)."""
+    now = time.time() if now is None else now
+    return any(cookie.get("expires", -1) < 0 or cookie["expires"] > now for cookie in state.get("cookies", []))
+
+
+class StorageStateStore:
+    """
+    Encrypted on-disk snapshots of Playwright storage state, per (origin, identity).
+
+    Each snapshot holds the cookies and localStorage of one origin for one
+    identity (e.g. a user name) and is encrypted with Fernet using the key in
+    the WEBMANCER_STATE_KEY environment variable. Without the optional
+    ``cryptography`` package or a key nothing is written to disk, unless
+    plaintext storage is explicitly allowed.
+    """
+
+    def __init__(self, directory: str = ".webmancer_state", key: str = None, max_age_seconds: int = 7 * 24 * 3600,
+                 allow_plaintext: bool = False):
+        """
+        Initialize the store.
+
+        Args:
+            directory: Directory the snapshots are written to
+            key: Fernet key; read from WEBMANCER_STATE_KEY when omitted
+            max_age_seconds: Snapshots older than this are treated as missing
+            allow_plaintext: Store snapshots unencrypted when no key or cryptography is available
+        """
+        self.directory = directory
+        self.max_age_seconds = max_age_seconds
+        self.allow_plaintext = allow_plaintext
+        self.logger = logging.getLogger(__name__)
+        self._fernet = self._make_fernet(key or os.environ.get(STATE_KEY_ENV))
+
+    def _make_fernet(self, key: str):
+        if not key:
+            return None
+        try:
+            from cryptography.fernet import Fernet
+        except ImportError:
+            self.logger.warning("cryptography is not installed; storage state snapshots cannot be encrypted")
+            return None
+        return Fernet(key.encode("ascii") if isinstance(key, str) else key)
+
+    @staticmethod
+    def generate_key() -> str:
+        """A new key for WEBMANCER_STATE_KEY."""
+        from cryptography.fernet import Fernet
+        return Fernet.generate_key().decode("ascii")
+
+    @property
+    def writable(self) -> bool:
+        return self._fernet is not None or self.allow_plaintext
+
+    def path_for(self, origin: str, identity: str) -> str:
+        name = hashlib.sha256(f"{origin_of(origin) or origin}|{identity}".encode("utf-8")).hexdigest()
+        return os.path.join(self.directory, name + ".state")
+
+    def save(self, origin: str, identity: str, state: dict) -> bool:
+        """
+        Store the part of a storage state that belongs to an origin.
+
+        Returns:
+            True if the snapshot was written, False if there was nothing to store or it could not be encrypted
+        """
+        if not self.writable:
+            self.logger.warning(f"Not saving storage state for {origin}: set {STATE_KEY_ENV} to encrypt it")
+            return False
+        origin = origin_of(origin) or origin
+        state = filter_state(state, origin)
+        if not state["cookies"] and not state["origins"]:
+            return False
+        payload = json.dumps({"origin": origin, "identity": identity, "saved_at": time.time(),
+                              "state": state}).encode("utf-8")
+        if self._fernet is not None:
+            payload = self._fernet.encrypt(payload)
+        os.makedirs(self.directory, exist_ok=True)
+        path = self.path_for(origin, identity)
+        tmp_path = f"{path}.tmp"
+        with open(os.open(tmp_path, os.O_WRONLY | os.O_CREAT | os.O_TRUNC, 0o600), "wb") as f:
+            f.write(payload)
+        os.replace(tmp_path, path)
+        return True
+
+    def load(self, origin: str, identity: str) -> dict:
+        """
+        The stored state for an origin and identity, or None if it is missing, too old, unreadable or fully expired.
+        """
+        path = self.path_for(origin, identity)
+        try:
+            with open(path, "rb") as f:
+                payload = f.read()
+        except OSError:
+            return None
+        try:
+            if self._fernet is not None:
+                payload = self._fernet.decrypt(payload)
+            snapshot = json.loads(payload)
+        except Exception as e:
+            # Wrong key, tampered file, or an encrypted file read without a key
+            self.logger.warning(f"Could not read storage state for {origin}: {type(e).__name__} {e}")
+            return None
+        state = snapshot["state"]
+        if time.time() - snapshot["saved_at"] > self.max_age_seconds or (state["cookies"] and not has_live_cookies(state)):
+            self.invalidate(origin, identity)
+            return None
+        return state
+
+    def invalidate(self, origin: str, identity: str):
+        """Delete the snapshot of an origin and identity, e.g. after the site rejected it."""
+        try:
+            os.remove(self.path_for(origin, identity))
+        except FileNotFoundError:
+            pass
@@ -0,0 +1,189 @@
+import json
+import logging
+import os
+from collections import OrderedDict
+
+from url_utils import origin_of
+
+# Scope holding the statistics of every origin together
+GLOBAL_SCOPE = "*"
+
+
+def _new_bucket() -> dict:
+    return {"resolutions": 0, "misses": 0, "total_ms": 0.0, "strategies": {}}
+
+
+class StrategyStats:
+    """
+    Win rate and cost of each click and fill strategy, globally and per origin.
+
+    A resolution tries the strategies of its order up to the one that wins
+    (all of them on a miss); each of those counts as an attempt, the winner
+    also as a win, and the resolution's duration is booked on the winner.
+    Once a scope has enough resolutions, order() drops the strategies that
+    keep missing. It never reorders the rest: the resolver picks the first
+    strategy in the order that matches, so moving a strategy forward could
+    change which element wins.
+    Origins are kept in LRU order and the whole table can be persisted to a
+    JSON file.
+    """
+
+    def __init__(self, path: str = None, max_origins: int = 500, min_samples: int = 20,
+                 skip_after: int = 50, skip_below: float = 0.005):
+        """
+        Initialize the statistics.
+
+        Args:
+            path: Optional JSON file to load the statistics from and save them to
+            max_origins: Maximum number of origins tracked before the least recently used is dropped
+            min_samples: Resolutions a scope needs before its statistics change the order
+            skip_after: Attempts after which a strategy that (almost) never wins is skipped
+            skip_below: Win rate below which such a strategy is skipped
+        """
+        self.path = path
+        self.max_origins = max_origins
+        self.min_samples = min_samples
+        self.skip_after = skip_after
+        self.skip_below = skip_below
+        self.logger = logging.getLogger(__name__)
+        self._buckets = OrderedDict()
+        if path and os.path.exists(path):
+            self.load()
+
+    @staticmethod
+    def _key(action: str, scope: str) -> str:
+        return f"{action}|{scope}"
+
+    def _bucket(self, action: str, scope: str, create: bool = False) -> dict:
+        key = self._key(action, scope)
+        bucket = self._buckets.get(key)
+        if bucket is None and create:
+            bucket = self._buckets[key] = _new_bucket()
+        if bucket is not None and scope != GLOBAL_SCOPE:
+            self._buckets.move_to_end(key)
+        return bucket
+
+    def _evict(self):
+        if len(self._buckets) <= self.max_origins:
+            return
+        origins = [key for key in self._buckets if not key.endswith("|" + GLOBAL_SCOPE)]
+        for key in origins[:max(len(origins) - self.max_origins, 0)]:
+            del self._buckets[key]
+
+    def record(self, action: str, url: str, order: list[str], winner: str, elapsed_ms: float):
+        """
+        Record one resolution.
+
+        Args:
+            action: 'click' or 'fill'
+            url: URL of the page the target was resolved on
+            order: Strategy order the resolver was given
+            winner: Strategy that matched, or None on a miss
+            elapsed_ms: Duration of the resolution
+        """
+        tried = order[:order.index(winner) + 1] if winner in order else order
+        for scope in (GLOBAL_SCOPE, origin_of(url)):
+            if not scope:
+                continue
+            bucket = self._bucket(action, scope, create=True)
+            bucket["resolutions"] += 1
+            bucket["total_ms"] += elapsed_ms
+            if winner is None:
+                bucket["misses"] += 1
+            for name in tried:
+                entry = bucket["strategies"].setdefault(name, {"attempts": 0, "wins": 0, "won_ms": 0.0})
+                entry["attempts"] += 1
+                if name == winner:
+                    entry["wins"] += 1
+                    entry["won_ms"] += elapsed_ms
+        self._evict()
+
+    def order(self, action: str, url: str, default: list[str]) -> list[str]:
+        """
+        Strategy order to try for a page, learned from the recorded resolutions.
+
+        This is the default order without the strategies that have been tried
+        skip_after times and (almost) never matched; the remaining strategies
+        keep their default precedence. The origin's statistics are used once
+        it has min_samples resolutions, the global ones otherwise, and the
+        default order until either has. Callers retry with the default order
+        when the learned one misses.
+        """
+        bucket = self._bucket(action, origin_of(url))
+        if bucket is None or bucket["resolutions"] < self.min_samples:
+            bucket = self._bucket(action, GLOBAL_SCOPE)
+        if bucket is None or bucket["resolutions"] < self.min_samples:
+            return list(default)
+
+        strategies = bucket["strategies"]
+        kept = []
+        for name in default:
+            entry = strategies.get(name)
+            if entry and entry["attempts"] >= self.skip_after and entry["wins"] / entry["attempts"] < self.skip_below:
+                continue
+            kept.append(name)
+        return kept
+
+    def report(self, action: str = None, origin: str = None) -> list[dict]:
+        """
+        Per-strategy attempts, wins, win rate and mean cost of the resolutions it won.
+
+        Args:
+            action: Only report this action ('click' or 'fill')
+            origin: Report this origin instead of the global statistics
+
+        Returns:
+            One row per (action, strategy), most wins first
+        """
+        scope = origin_of(origin) if origin else GLOBAL_SCOPE
+        rows = []
+        for key, bucket in self._buckets.items():
+            bucket_action, bucket_scope = key.split("|", 1)
+            if bucket_scope != scope or (action and bucket_action != action):
+                continue
+            for name, entry in bucket["strategies"].items():
+                rows.append({
+                    "action": bucket_action,
+                    "strategy": name,
+                    "attempts": entry["attempts"],
+                    "wins": entry["wins"],
+                    "win_rate": entry["wins"] / entry["attempts"] if entry["attempts"] else 0.0,
+                    "share_of_resolutions": entry["wins"] / bucket["resolutions"] if bucket["resolutions"] else 0.0,
+                    "mean_ms_when_won": entry["won_ms"] / entry["wins"] if entry["wins"] else None,
+                })
+        return sorted(rows, key=lambda row: (row["action"], -row["wins"], -row["attempts"]))
+
+    def stats(self) -> dict:
+        """Resolution counts, miss rate and mean cost per action, over all origins."""
+        summary = {}
+        for key, bucket in self._buckets.items():
+            action, scope = key.split("|", 1)
+            if scope == GLOBAL_SCOPE:
+                resolutions = bucket["resolutions"]
+                summary[action] = {
+                    "resolutions": resolutions,
+                    "miss_rate": bucket["misses"] / resolutions if resolutions else 0.0,
+                    "mean_ms": bucket["total_ms"] / resolutions if resolutions else 0.0,
+                }
+        summary["origins"] = len({key.split("|", 1)[1] for key in self._buckets} - {GLOBAL_SCOPE})
+        return summary
+
+    def load(self):
+        """Load the statistics from the configured file."""
+        try:
+            with open(self.path, encoding="utf-8") as f:
+                buckets = json.load(f)
+        except (OSError, ValueError) as e:
+            self.logger.warning(f"Could not load strategy statistics from {self.path}: {e}")
+            return
+        self._buckets = OrderedDict(buckets)
+        self._evict()
+
+    def save(self):
+        """Write the statistics to the configured file, if any."""
+        if not self.path:
+            return
+        tmp_path = f"{self.path}.tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump(self._buckets, f)
+        os.replace(tmp_path, self.path)
@@ -20,13 +20,17 @@ Find and click: Locate and click an element based on the provided text or identi
 Find and fill: Locate an input field (by name, placeholder, or other attributes) and fill it with the specified text.
 Press a key: Simulate pressing a specific keyboard key.
 Type a string: Simulate typing a string into the browser.
+List page elements: Get the interactive elements of the current page with their ids. Use it when a find and click or find and fill step fails, then click or fill the right element by its id instead of guessing other wordings.
+Tabs: Open, switch to, close or list named tabs. Actions always act on the active tab.
+Visit pages: Read the same information from several independent URLs in parallel (for example the star count of five repositories) in one call instead of navigating to each page in turn.
 
 2. Execute Steps:
 Call the corresponding function for each step.
 Function behavior:
-Action functions return a boolean (True for success, False for failure).
+Action functions return a result with "success" (true or false), how long the action took and, on failure, an "error" explaining what went wrong.
 Execute a step only after the previous step has been successfully completed and you have received the required output.
-If a step fails, subsequent steps must not be executed.
+When several consecutive steps are fully known upfront (for example navigate, click, fill, fill, click), send them together in one execute_steps call instead of one call per step. Steps that need a value you do not have yet, such as a credential, must wait for that value.
+If a step fails, subsequent steps must not be executed. execute_steps stops at the first failed step and reports which one failed.
 
 3. Report Results:
 Generate a structured summary of all actions taken.
@@ -0,0 +1,50 @@
+import json
+from dataclasses import dataclass
+from typing import Iterator, Union
+
+
+@dataclass
+class TaskLineError:
+    """A line of a task file that holds no usable task; yielded in place of its instruction."""
+    line_number: int
+    message: str
+
+    def __str__(self) -> str:
+        return f"Invalid task on line {self.line_number}: {self.message}"
+
+
+def iter_tasks(path: str) -> Iterator[tuple[str, Union[str, TaskLineError]]]:
+    """
+    Lazily read instructions from a task file.
+
+    Each non-empty line is either a JSON object with an ``instruction`` field
+    (and optionally an ``id``) or a plain-text instruction. Lines without an id
+    are identified by their line number. A malformed line does not end the
+    file: it is yielded with a TaskLineError instead of an instruction, so
+    callers can record it as a failed task and carry on.
+
+    Args:
+        path: Path to the task file
+
+    Yields:
+        (task_id, instruction or TaskLineError) tuples in file order
+    """
+    with open(path, encoding="utf-8") as f:
+        for line_number, line in enumerate(f, start=1):
+            line = line.strip()
+            if not line or line.startswith("#"):
+                continue
+            if not line.startswith("{"):
+                yield str(line_number), line
+                continue
+            try:
+                record = json.loads(line)
+            except ValueError as e:
+                yield str(line_number), TaskLineError(line_number, f"not valid JSON ({e})")
+                continue
+            task_id = str(record.get("id", line_number)) if isinstance(record, dict) else str(line_number)
+            instruction = record.get("instruction") if isinstance(record, dict) else None
+            if not isinstance(instruction, str) or not instruction.strip():
+                yield task_id, TaskLineError(line_number, "no 'instruction' text")
+                continue
+            yield task_id, instruction
@@ -0,0 +1,21 @@
+import asyncio
+
+import pytest
+
+
+async def _can_launch_chromium() -> bool:
+    try:
+        from playwright.async_api import async_playwright
+        async with async_playwright() as playwright:
+            browser = await playwright.chromium.launch(headless=True)
+            await browser.close()
+        return True
+    except Exception:
+        return False
+
+
+@pytest.fixture(scope="session")
+def chromium():
+    """Skip the test when Playwright's Chromium is not installed (run `playwright install chromium`)."""
+    if not asyncio.run(_can_launch_chromium()):
+        pytest.skip("Playwright Chromium is not available")
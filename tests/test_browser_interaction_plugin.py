@@ -0,0 +1,88 @@
+import asyncio
+
+import pytest
+
+from action_result import ActionResult, PageElements, PageVisits, TabList, succeeded
+from benchmarks.fixture_site import FixtureSite
+from browser_automation_actions import BrowserAutomationActions
+from browser_interaction_plugin import BrowserInteractionPlugin, BrowserStep
+
+
+@pytest.fixture
+def site():
+    with FixtureSite(large_links=50, api_delay_ms=10) as site:
+        yield site
+
+
+def test_succeeded():
+    assert succeeded(ActionResult(success=True))
+    assert not succeeded(ActionResult(success=False, error="Not found"))
+    assert not succeeded(str(PageVisits(success=False, error="Not found")))
+    assert succeeded(str(TabList(success=True)))
+    # Plain text results and text that merely starts like an ActionResult
+    assert succeeded("Welcome")
+    assert succeeded('{"success": true, "steps": []}')
+    assert not succeeded(False)
+    assert not succeeded("false")
+
+
+async def _drive(site: FixtureSite) -> dict:
+    plugin = BrowserInteractionPlugin(browser_automation=BrowserAutomationActions(headless=True))
+    results = {}
+    try:
+        results["navigate"] = await plugin.navigate_to_url(site.url("/login"))
+        results["fill_user"] = await plugin.find_and_fill("Username or email address", "octocat")
+        results["fill_password"] = await plugin.find_and_fill("Password", "hunter2")
+        results["click"] = await plugin.find_and_click("Sign in")
+        results["dashboard_url"] = plugin.browser_automation.page.url
+        results["elements"] = await plugin.get_page_elements()
+        search = next(entry[0] for entry in results["elements"].elements if entry[1] == "textbox" and entry[2] == "Search")
+        results["fill_by_id"] = await plugin.fill_by_id(search, "webmancer")
+        results["press"] = await plugin.press_key("Enter")
+        results["results_url"] = plugin.browser_automation.page.url
+        results["missing"] = await plugin.find_and_click("No such button")
+        results["steps"] = await plugin.execute_steps([
+            BrowserStep(action="navigate", target=site.url("/search")),
+            BrowserStep(action="fill", target="Search", text="bench"),
+            BrowserStep(action="press", target="Enter"),
+        ])
+        results["open_tab"] = await plugin.open_tab("docs", site.url("/large"))
+        results["tabs"] = await plugin.list_tabs()
+        results["switch"] = await plugin.switch_tab("main")
+        results["visits"] = await plugin.visit_pages([site.url("/repo/one"), site.url("/repo/two")], selector="h1")
+    finally:
+        await plugin.close()
+    return results
+
+
+def test_plugin_functions_return_typed_results(chromium, site):
+    results = asyncio.run(_drive(site))
+
+    for name in ("navigate", "fill_user", "fill_password", "click", "fill_by_id", "press", "open_tab", "switch"):
+        assert isinstance(results[name], ActionResult), name
+        assert results[name].success, (name, results[name].error)
+    assert results["fill_user"].strategy == "label_for"
+    assert results["click"].strategy is not None
+    assert "/dashboard?user=octocat" in results["dashboard_url"]
+    assert "/results?q=webmancer" in results["results_url"]
+
+    assert not results["missing"].success
+    assert "No such button" in results["missing"].error
+    assert not succeeded(results["missing"])
+
+    steps = results["steps"]
+    assert steps.success and [step["ok"] for step in steps.steps] == [True, True, True]
+
+    elements = results["elements"]
+    assert isinstance(elements, PageElements) and elements.success
+    assert elements.title == "Dashboard"
+    assert any(entry[1] == "button" and entry[2] == "Sign in" for entry in elements.elements)
+
+    tabs = results["tabs"]
+    assert isinstance(tabs, TabList)
+    assert [(tab.name, tab.active) for tab in tabs.tabs] == [("main", False), ("docs", True)]
+
+    visits = results["visits"]
+    assert isinstance(visits, PageVisits) and visits.success
+    assert [page.matches for page in visits.pages] == [["/repo/one"], ["/repo/two"]]
+    assert succeeded(str(visits))
@@ -0,0 +1,86 @@
+import asyncio
+
+from azure.ai.inference.models import UserMessage
+from azure.core.credentials import AzureKeyCredential
+
+from benchmarks.mock_model_endpoint import MockModelEndpoint
+from llm_scheduler import ModelScheduler, calls_from
+from pooled_chat_client import ScheduledChatCompletionsClient
+
+
+async def _calls(endpoint: MockModelEndpoint, scheduler: ModelScheduler, batches: list[tuple[str, int, int]]) -> list[str]:
+    """
+    Make calls through one scheduled client and return the agents in the order their calls completed.
+
+    The first batch is started on its own, so its first call holds the only
+    slot while the later batches queue up behind it.
+    """
+    client = ScheduledChatCompletionsClient(endpoint.url(), AzureKeyCredential("mock-key"), scheduler=scheduler)
+    completed = []
+
+    async def call(agent: str, priority: int, index: int):
+        with calls_from(agent, priority):
+            await client.complete(messages=[UserMessage(content=f"{agent} {index}")], max_tokens=5)
+        completed.append(agent)
+
+    try:
+        (agent, priority, count), *rest = batches
+        first = [asyncio.create_task(call(agent, priority, i)) for i in range(count)]
+        await asyncio.sleep(0.01)
+        await asyncio.gather(*first, *(call(agent, priority, i) for agent, priority, count in rest for i in range(count)))
+    finally:
+        await client.close()
+    return completed
+
+
+def test_throttled_calls_are_retried():
+    with MockModelEndpoint(latency_ms=5, requests_per_minute=1200, window_seconds=0.2) as endpoint:
+        # No budget of its own: the scheduler runs into the endpoint's limit and has to back off
+        scheduler = ModelScheduler(max_concurrency=8, backoff_base=0.05, max_retries=10)
+        completed = asyncio.run(_calls(endpoint, scheduler, [("agent", 0, 12)]))
+
+    assert len(completed) == 12
+    assert endpoint.throttled > 0
+    assert scheduler.counters["throttled"] > 0
+    assert scheduler.counters["failed"] == 0
+    assert scheduler.counters["completed"] == 12
+
+
+def test_urgent_calls_jump_the_queue():
+    with MockModelEndpoint(latency_ms=20) as endpoint:
+        scheduler = ModelScheduler(max_concurrency=1)
+        completed = asyncio.run(_calls(endpoint, scheduler, [("background", 5, 4), ("interactive", 0, 1)]))
+
+    # The first background call was already running; the interactive one goes next
+    assert completed[:2] == ["background", "interactive"]
+    assert endpoint.max_in_flight == 1
+
+
+def test_agents_take_turns():
+    with MockModelEndpoint(latency_ms=10) as endpoint:
+        scheduler = ModelScheduler(max_concurrency=1)
+        completed = asyncio.run(_calls(endpoint, scheduler, [("busy", 0, 10), ("quiet", 0, 2)]))
+
+    # The quiet agent's calls are interleaved with the busy agent's backlog instead of waiting behind all of it
+    assert completed.index("quiet") <= 2
+    assert [i for i, agent in enumerate(completed) if agent == "quiet"][-1] <= 4
+    stats = scheduler.stats()["agents"]
+    assert stats["busy"]["calls"] == 10 and stats["quiet"]["calls"] == 2
+    assert stats["quiet"]["mean_queue_wait_ms"] < stats["busy"]["mean_queue_wait_ms"]
+
+
+
+def test_client_serves_successive_event_loops():
+    with MockModelEndpoint(latency_ms=5) as endpoint:
+        client = ScheduledChatCompletionsClient(endpoint.url(), AzureKeyCredential("mock-key"),
+                                                scheduler=ModelScheduler(max_concurrency=1))
+
+        async def call():
+            try:
+                response = await client.complete(messages=[UserMessage(content="hello")], max_tokens=5)
+            finally:
+                await client.close()
+            return response.choices[0].message.content
+
+        # A shared client outlives asyncio.run(); the second run must not reuse the first loop's session
+        assert asyncio.run(call()) and asyncio.run(call())
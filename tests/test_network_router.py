@@ -0,0 +1,113 @@
+import asyncio
+import gzip
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pytest
+
+from network_router import AssetCache, NetworkRouter, RoutingRules, decide
+
+_PAGE = b"""<!DOCTYPE html>
+<html><head>
+<link rel="stylesheet" href="/style.css">
+<script src="https://cdn.stub.test/widget.js"></script>
+<script src="https://www.google-analytics.com/analytics.js"></script>
+</head><body><h1>Routed</h1><img src="/logo.png"></body></html>"""
+
+_STYLE = b"h1 { color: rgb(1, 2, 3); }" + b" " * 2000
+
+
+class _Handler(BaseHTTPRequestHandler):
+    requests = None
+
+    def do_GET(self):
+        self.requests.append(self.path)
+        if self.path == "/style.css":
+            body = gzip.compress(_STYLE)
+            headers = {"Content-Type": "text/css", "Content-Encoding": "gzip", "Cache-Control": "max-age=600"}
+        elif self.path == "/":
+            body, headers = _PAGE, {"Content-Type": "text/html"}
+        else:
+            return self.send_error(404)
+        self.send_response(200)
+        for name, value in headers.items():
+            self.send_header(name, value)
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        pass
+
+
+@pytest.fixture
+def site():
+    """A local site whose page loads a gzipped stylesheet, an image, a third-party script and a tracker."""
+    requests = []
+    server = ThreadingHTTPServer(("127.0.0.1", 0), type("Handler", (_Handler,), {"requests": requests}))
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    yield f"http://127.0.0.1:{server.server_address[1]}", requests
+    server.shutdown()
+    server.server_close()
+
+
+def test_decide():
+    rules = RoutingRules(stub_script_hosts=("cdn.stub.test",))
+    assert decide(rules, "https://www.google-analytics.com/analytics.js", "script") == "block"
+    assert decide(rules, "http://127.0.0.1/logo.png", "image") == "block"
+    assert decide(rules, "https://cdn.stub.test/widget.js", "script") == "stub"
+    assert decide(rules, "http://127.0.0.1/style.css", "stylesheet") == "cache"
+    assert decide(rules, "http://127.0.0.1/", "document") == "continue"
+
+
+def test_asset_cache_drops_transfer_headers(tmp_path):
+    cache = AssetCache(str(tmp_path))
+    headers = {"content-type": "text/css", "content-encoding": "gzip", "content-length": "42",
+               "cache-control": "max-age=60"}
+    assert cache.put("http://127.0.0.1/style.css", 200, headers, _STYLE, 5.0)
+    meta, body = cache.get("http://127.0.0.1/style.css")
+    assert body == _STYLE
+    assert meta["headers"] == {"content-type": "text/css", "cache-control": "max-age=60"}
+    assert not cache.put("http://127.0.0.1/private.css", 200, {"cache-control": "no-store"}, _STYLE, 5.0)
+
+
+async def _load_twice(url: str, router: NetworkRouter) -> list[dict]:
+    from playwright.async_api import async_playwright
+    results = []
+    async with async_playwright() as playwright:
+        browser = await playwright.chromium.launch(headless=True)
+        try:
+            # Two contexts, as two agents would have; the asset cache is shared between them
+            for _ in range(2):
+                context = await browser.new_context()
+                await router.install(context)
+                page = await context.new_page()
+                router.begin_navigation()
+                await page.goto(url)
+                results.append({
+                    "stats": dict(router.navigation_stats),
+                    "color": await page.evaluate("getComputedStyle(document.querySelector('h1')).color"),
+                })
+                await context.close()
+        finally:
+            await browser.close()
+    return results
+
+
+def test_router_blocks_stubs_and_caches(chromium, site, tmp_path):
+    url, requests = site
+    router = NetworkRouter(RoutingRules(stub_script_hosts=("cdn.stub.test",)), cache_dir=str(tmp_path))
+    first, second = asyncio.run(_load_twice(url + "/", router))
+
+    assert first["stats"]["blocked"] == 2  # the image and the tracker
+    assert first["stats"]["stubbed"] == 1
+    assert first["stats"]["cache_misses"] == 1
+    assert first["stats"]["cache_hits"] == 0
+    assert second["stats"]["cache_hits"] == 1
+    assert second["stats"]["bytes_saved"] == len(_STYLE)
+    # The cached, decoded stylesheet still applies
+    assert first["color"] == second["color"] == "rgb(1, 2, 3)"
+    assert requests.count("/style.css") == 1
+    assert "/logo.png" not in requests
+    assert router.total_stats["cache_hits"] == 1
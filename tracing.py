@@ -0,0 +1,203 @@
+import contextvars
+import functools
+import itertools
+import json
+import threading
+import time
+from collections import deque
+
+from metrics import latency_summary
+
+_current_span = contextvars.ContextVar("webmancer_current_span", default=None)
+_span_ids = itertools.count(1)
+
+
+class Span:
+    """
+    A timed operation with attributes and an outcome.
+
+    Spans nest through a context variable, so a span opened while another is
+    active (in the same task, or in a task created from it) becomes its child.
+    """
+    __slots__ = ("tracer", "name", "attrs", "span_id", "parent_id", "trace_id", "start", "duration_ms",
+                 "outcome", "error", "_token", "_started")
+
+    def __init__(self, tracer: "Tracer", name: str, attrs: dict):
+        self.tracer = tracer
+        self.name = name
+        self.attrs = attrs
+        self.span_id = next(_span_ids)
+        self.outcome = "ok"
+        self.error = None
+        self.duration_ms = 0.0
+
+    def set(self, **attrs):
+        """Add attributes; an ``ok=False`` attribute marks the span as failed."""
+        if attrs.get("ok") is False:
+            self.outcome = "failed"
+        self.attrs.update(attrs)
+
+    def __enter__(self):
+        parent = _current_span.get()
+        self.parent_id = parent.span_id if parent else None
+        self.trace_id = parent.trace_id if parent else self.span_id
+        self._token = _current_span.set(self)
+        self.start = time.time()
+        self._started = time.perf_counter()
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.duration_ms = (time.perf_counter() - self._started) * 1000
+        if exc is not None:
+            self.outcome = "error"
+            self.error = f"{exc_type.__name__}: {exc}"
+        _current_span.reset(self._token)
+        self.tracer._finish(self)
+        return False
+
+    def to_dict(self) -> dict:
+        return {
+            "name": self.name,
+            "span_id": self.span_id,
+            "parent_id": self.parent_id,
+            "trace_id": self.trace_id,
+            "start": self.start,
+            "duration_ms": round(self.duration_ms, 3),
+            "outcome": self.outcome,
+            "error": self.error,
+            "attrs": self.attrs,
+        }
+
+
+class _NoopSpan:
+    """Shared stand-in returned while tracing is disabled."""
+    __slots__ = ()
+
+    def set(self, **attrs):
+        pass
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        return False
+
+
+NOOP_SPAN = _NoopSpan()
+
+
+class JsonlSink:
+    """Appends every finished span to a JSONL file."""
+
+    def __init__(self, path: str):
+        self.path = path
+        self._file = open(path, "a", encoding="utf-8")
+        self._lock = threading.Lock()
+
+    def __call__(self, span: Span):
+        line = json.dumps(span.to_dict(), default=str)
+        with self._lock:
+            self._file.write(line + "\n")
+            self._file.flush()
+
+    def close(self):
+        self._file.close()
+
+
+class LatencyAggregator:
+    """
+    Keeps recent span durations per span name and per (name, strategy).
+
+    Only the last ``window`` durations of each key are kept, so memory stays
+    constant however long the process runs.
+    """
+
+    def __init__(self, window: int = 1000):
+        self.window = window
+        self._by_name = {}
+        self._by_strategy = {}
+        self._failures = {}
+
+    def __call__(self, span: Span):
+        self._by_name.setdefault(span.name, deque(maxlen=self.window)).append(span.duration_ms)
+        strategy = span.attrs.get("strategy")
+        if strategy:
+            self._by_strategy.setdefault(f"{span.name}:{strategy}", deque(maxlen=self.window)).append(span.duration_ms)
+        if span.outcome != "ok":
+            self._failures[span.name] = self._failures.get(span.name, 0) + 1
+
+    def report(self) -> dict:
+        """p50/p95 latency per span name and per strategy, with failure counts."""
+        return {
+            "by_name": {name: {**latency_summary(list(values)), "failures": self._failures.get(name, 0)}
+                        for name, values in self._by_name.items()},
+            "by_strategy": {key: latency_summary(list(values)) for key, values in self._by_strategy.items()},
+        }
+
+
+class Tracer:
+    """
+    Entry point for creating spans.
+
+    While disabled, span() returns a shared no-op span, so instrumented code
+    pays only for one attribute check per span.
+    """
+
+    def __init__(self):
+        self.enabled = False
+        self.sinks = []
+        self.aggregator = None
+
+    def configure(self, enabled: bool = True, jsonl_path: str = None, aggregate: bool = True) -> "Tracer":
+        """
+        Enable or disable tracing and choose where spans go.
+
+        Args:
+            enabled: Whether spans are recorded
+            jsonl_path: Optional file every finished span is appended to
+            aggregate: Whether to keep an in-memory LatencyAggregator
+        """
+        self.close()
+        self.enabled = enabled
+        if jsonl_path:
+            self.sinks.append(JsonlSink(jsonl_path))
+        if aggregate:
+            self.aggregator = LatencyAggregator()
+            self.sinks.append(self.aggregator)
+        return self
+
+    def span(self, name: str, **attrs):
+        if not self.enabled:
+            return NOOP_SPAN
+        return Span(self, name, attrs)
+
+    def instrument(self, name: str):
+        """Decorator wrapping every call of a coroutine function in a span."""
+        def decorator(function):
+            @functools.wraps(function)
+            async def wrapper(*args, **kwargs):
+                if not self.enabled:
+                    return await function(*args, **kwargs)
+                with self.span(name):
+                    return await function(*args, **kwargs)
+            return wrapper
+        return decorator
+
+    def _finish(self, span: Span):
+        for sink in self.sinks:
+            sink(span)
+
+    def report(self) -> dict:
+        return self.aggregator.report() if self.aggregator else {}
+
+    def close(self):
+        for sink in self.sinks:
+            if isinstance(sink, JsonlSink):
+                sink.close()
+        self.sinks = []
+        self.aggregator = None
+        self.enabled = False
+
+
+# Process-wide tracer used by the agent, plugin and actions layers
+tracer = Tracer()
@@ -0,0 +1,9 @@
+from urllib.parse import urlsplit
+
+
+def origin_of(url: str) -> str:
+    """scheme://host[:port] of a URL, or an empty string for blank pages."""
+    if not url or url == "about:blank":
+        return ""
+    parts = urlsplit(url)
+    return f"{parts.scheme}://{parts.netloc}"
@@ -0,0 +1,355 @@
+import asyncio
+import itertools
+import logging
+import multiprocessing
+import queue
+import time
+from typing import Iterable, Iterator
+
+from metrics import latency_summary
+
+# Modules a forkserver imports once, so that forked workers start with them loaded
+_PRELOAD = ["BrowserAgentHandler", "browser_interaction_plugin", "credentials_plugin", "history_manager"]
+
+
+# Lease value of a worker that holds no task
+_NO_LEASE = -1
+
+
+def _worker_main(worker_id: int, task_queue, result_queue, lease, headless: bool, prewarm: bool = False,
+                 trace_file: str = None):
+    """
+    Entry point of a worker process.
+
+    The worker owns one BrowserAgentHandler, and therefore one browser, for its
+    whole life and runs the tasks it pulls from the shared queue one by one on
+    a private event loop, each with a fresh chat history. A prewarmed worker
+    loads the model stack and launches its browser before it reports "ready"
+    and takes its first task.
+
+    The sequence number of the task it holds is written to ``lease``, a value
+    in shared memory, as soon as the task leaves the queue. Unlike a queued
+    message it cannot be lost when the process dies, so the supervisor always
+    knows which task a dead worker was running.
+
+    With a trace_file, the worker appends its spans to it; the tracer of the
+    supervisor's process is not inherited by spawned workers.
+    """
+    from BrowserAgentHandler import BrowserAgentHandler
+    from tracing import tracer
+
+    if trace_file:
+        tracer.configure(jsonl_path=trace_file)
+    loop = asyncio.new_event_loop()
+    asyncio.set_event_loop(loop)
+    agent = BrowserAgentHandler(headless=headless)
+    try:
+        if prewarm:
+            loop.run_until_complete(agent.prewarm())
+        result_queue.put(("ready", worker_id, None))
+        while True:
+            item = task_queue.get()
+            if item is None:
+                break
+            seq, task_id, instruction = item
+            lease.value = seq
+            started = time.perf_counter()
+            try:
+                # Tasks are unrelated; none should see the conversation of the one before
+                agent.reset_history()
+                history = loop.run_until_complete(agent.interact(instruction))
+                result = {"ok": True, "output": str(history.messages[-1].content), "error": None}
+            except Exception as e:
+                result = {"ok": False, "output": None, "error": str(e)}
+            result.update(task_id=task_id, worker=worker_id, latency_ms=(time.perf_counter() - started) * 1000)
+            result_queue.put(("done", worker_id, (seq, result)))
+            lease.value = _NO_LEASE
+    finally:
+        loop.run_until_complete(agent.close())
+        loop.run_until_complete(BrowserAgentHandler.close_shared_services())
+        loop.close()
+        tracer.close()
+
+
+class WorkerFarm:
+    """
+    Runs a batch of instructions across several worker processes.
+
+    Workers pull tasks from a shared bounded queue, so the batch is sharded
+    dynamically and a slow task never holds up the other workers. The
+    supervisor streams results back as they complete, restarts workers that
+    die, and re-queues the task a crashed worker was holding (see the lease
+    in _worker_main). A task's deadline starts when a worker takes it off
+    the queue; a worker still running it past the deadline is terminated.
+    """
+
+    def __init__(self, workers: int = None, headless: bool = True, max_attempts: int = 2,
+                 max_restarts: int = 10, poll_interval: float = 0.5, prewarm: bool = False,
+                 start_method: str = "spawn", task_timeout: float = 900.0, trace_file: str = None):
+        """
+        Initialize the farm.
+
+        Args:
+            workers: Number of worker processes; defaults to the CPU count
+            headless: Whether the workers run their browsers headless
+            max_attempts: How many times a task is tried before it is reported as failed
+            max_restarts: Maximum number of crashed workers the supervisor replaces
+            poll_interval: Seconds between liveness checks while waiting for results
+            prewarm: Have every worker load the model stack and launch its browser before taking tasks
+            start_method: multiprocessing start method; with 'forkserver' the heavy modules are
+                imported once by the server and inherited by every worker it forks
+            task_timeout: Seconds a task may run on a worker before the worker is terminated
+            trace_file: JSONL file every worker appends its tracing spans to; tracing is off without it
+        """
+        self.workers = workers or multiprocessing.cpu_count()
+        self.headless = headless
+        self.max_attempts = max_attempts
+        self.max_restarts = max_restarts
+        self.poll_interval = poll_interval
+        self.prewarm = prewarm
+        self.task_timeout = task_timeout
+        self.trace_file = trace_file
+        self.logger = logging.getLogger(__name__)
+        self._mp = multiprocessing.get_context(start_method)
+        if start_method == "forkserver":
+            self._mp.set_forkserver_preload(_PRELOAD)
+        self._processes = {}
+        self._leases = {}
+        self._attempts = {}
+        self._seq = itertools.count()
+        self._latencies = []
+        self.restarts = 0
+        self.completed = 0
+        self.failed = 0
+        self.elapsed = 0.0
+
+    def _spawn(self, worker_id: int):
+        # No lock: a worker killed while holding it would leave the lease unreadable
+        self._leases[worker_id] = self._mp.Value("q", _NO_LEASE, lock=False)
+        self._running.pop(worker_id, None)
+        process = self._mp.Process(
+            target=_worker_main,
+            args=(worker_id, self._task_queue, self._result_queue, self._leases[worker_id], self.headless,
+                  self.prewarm, self.trace_file),
+            name=f"webmancer-worker-{worker_id}",
+            daemon=True,
+        )
+        process.start()
+        self._processes[worker_id] = process
+
+    def _retry_or_fail(self, seq: int, worker_id: int, error: str) -> dict:
+        """Re-queue a task that did not finish, or return its failure result once it is out of attempts."""
+        task = self._outstanding.pop(seq)
+        task_id = task[0]
+        if self._attempts[task_id] < self.max_attempts:
+            # _feed() hands the task out again
+            self._pending.append(task)
+            return None
+        self._attempts.pop(task_id, None)
+        return {"task_id": task_id, "worker": worker_id, "ok": False, "output": None, "error": error,
+                "latency_ms": None}
+
+    def _reap_crashed(self) -> list[dict]:
+        """Restart dead workers and return failure results for tasks out of attempts."""
+        failures = []
+        for worker_id, process in list(self._processes.items()):
+            if process.is_alive():
+                continue
+            self.logger.warning(f"Worker {worker_id} exited with code {process.exitcode}")
+            seq = self._leases[worker_id].value
+            if seq in self._outstanding:
+                failure = self._retry_or_fail(seq, worker_id, f"worker crashed (exit code {process.exitcode})")
+                if failure is not None:
+                    failures.append(failure)
+            if self._outstanding:
+                # The death may have lost other tasks as well; see _find_lost()
+                self._death_seen = time.monotonic()
+            if self.restarts >= self.max_restarts:
+                raise RuntimeError(f"Worker restart limit ({self.max_restarts}) reached")
+            self.restarts += 1
+            self._spawn(worker_id)
+        return failures
+
+    def _feed(self, tasks: Iterator) -> bool:
+        """Top up the task queue; returns False once the input is exhausted and nothing is pending."""
+        while not self._task_queue.full():
+            if self._pending:
+                task = self._pending.pop(0)
+            else:
+                task = next(tasks, None)
+                if task is None:
+                    return False
+            self._attempts[task[0]] = self._attempts.get(task[0], 0) + 1
+            seq = next(self._seq)
+            self._outstanding[seq] = task
+            self._task_queue.put((seq, *task))
+        return True
+
+    def _expire(self):
+        """Note which task each worker holds and terminate workers that have been running one past its deadline."""
+        now = time.monotonic()
+        for worker_id, lease in self._leases.items():
+            seq = lease.value
+            if seq == _NO_LEASE:
+                self._running.pop(worker_id, None)
+                continue
+            entry = self._running.get(worker_id)
+            if entry is None or entry[0] != seq:
+                self._running[worker_id] = [seq, now + self.task_timeout]
+            elif now >= entry[1] and self._processes[worker_id].is_alive():
+                # Hung on the task: _reap_crashed() re-queues or fails it once the worker is gone
+                task_id = self._outstanding.get(seq, (None,))[0]
+                self.logger.warning(f"Task {task_id} exceeded {self.task_timeout}s on worker {worker_id}; terminating it")
+                self._processes[worker_id].terminate()
+                entry[1] = float("inf")
+
+    def _find_lost(self) -> list[dict]:
+        """
+        Re-queue or fail tasks that a worker death lost without holding them.
+
+        A worker that dies between taking a task and writing its lease loses
+        the task, and one killed while using a queue can take messages of
+        other workers down with it. So after a worker died, a task that is
+        outstanding, held by no worker and no longer on the queue counts as
+        lost once that has been true, with no results in transit, for a few
+        polls in a row.
+        """
+        if self._death_seen is None:
+            return []
+        held = {lease.value for lease in self._leases.values()}
+        unheld = [seq for seq in self._outstanding if seq not in held]
+        if not unheld:
+            self._death_seen = None
+            return []
+        if not (self._task_queue.empty() and self._result_queue.empty()):
+            self._death_seen = time.monotonic()
+            return []
+        if time.monotonic() - self._death_seen < max(5 * self.poll_interval, 2.0):
+            return []
+        self._death_seen = None
+        failures = []
+        for seq in unheld:
+            self.logger.warning(f"Task {self._outstanding[seq][0]} was lost after a worker died")
+            failure = self._retry_or_fail(seq, None, "task was lost after a worker died")
+            if failure is not None:
+                failures.append(failure)
+        return failures
+
+    def start(self, wait: bool = True, timeout: float = 120.0) -> int:
+        """
+        Spawn the workers ahead of the first batch.
+
+        Args:
+            wait: Block until every worker has reported ready (prewarmed, if enabled)
+            timeout: Maximum number of seconds to wait for the workers
+
+        Returns:
+            Number of workers that reported ready (0 when not waiting)
+        """
+        self._task_queue = self._mp.Queue(maxsize=self.workers * 2)
+        self._result_queue = self._mp.Queue()
+        self._pending = []
+        # seq -> task for every task put on the queue and not yet finished
+        self._outstanding = {}
+        # worker_id -> [seq, deadline] of the task each worker is running
+        self._running = {}
+        self._death_seen = None
+        for worker_id in range(self.workers):
+            self._spawn(worker_id)
+        if not wait:
+            return 0
+
+        ready = set()
+        deadline = time.perf_counter() + timeout
+        while len(ready) < self.workers and time.perf_counter() < deadline:
+            try:
+                kind, worker_id, _ = self._result_queue.get(timeout=self.poll_interval)
+            except queue.Empty:
+                if not any(process.is_alive() for process in self._processes.values()):
+                    break
+                continue
+            if kind == "ready":
+                ready.add(worker_id)
+        if len(ready) < self.workers:
+            self.logger.warning(f"Only {len(ready)} of {self.workers} workers became ready within {timeout} seconds")
+        return len(ready)
+
+    def run(self, tasks: Iterable[tuple[str, str]]) -> Iterator[dict]:
+        """
+        Run the tasks and yield one result dict per task as soon as it finishes.
+
+        The workers are spawned here unless start() was called first; they are
+        shut down when the run ends.
+
+        Args:
+            tasks: (task_id, instruction) pairs, e.g. from task_io.iter_tasks
+
+        Yields:
+            Dicts with task_id, worker, ok, output, error and latency_ms
+        """
+        if not self._processes:
+            self.start(wait=False)
+        started = time.perf_counter()
+
+        tasks = iter(tasks)
+        more = True
+        try:
+            while more or self._outstanding or self._pending:
+                self._expire()
+                for failure in self._reap_crashed() + self._find_lost():
+                    self.failed += 1
+                    yield failure
+                if more or self._pending:
+                    more = self._feed(tasks)
+                try:
+                    kind, worker_id, payload = self._result_queue.get(timeout=self.poll_interval)
+                except queue.Empty:
+                    continue
+
+                if kind == "ready":
+                    continue
+                seq, payload = payload
+                task_id = payload["task_id"]
+                if self._outstanding.pop(seq, None) is None:
+                    if task_id not in self._attempts:
+                        # A copy of a task that has already finished, or failed for good
+                        continue
+                    # Its worker died right after sending this and the task was re-queued: keep this
+                    # result and forget the copy, so whichever one runs first wins
+                    self._pending = [task for task in self._pending if task[0] != task_id]
+                    for other in [other for other, task in self._outstanding.items() if task[0] == task_id]:
+                        del self._outstanding[other]
+                self._attempts.pop(task_id, None)
+                if payload["ok"]:
+                    self.completed += 1
+                    self._latencies.append(payload["latency_ms"])
+                else:
+                    self.failed += 1
+                yield payload
+        finally:
+            self.elapsed = time.perf_counter() - started
+            self._shutdown()
+
+    def _shutdown(self):
+        for _ in self._processes:
+            try:
+                self._task_queue.put_nowait(None)
+            except queue.Full:
+                break
+        for process in self._processes.values():
+            process.join(timeout=10)
+            if process.is_alive():
+                process.terminate()
+        self._processes = {}
+
+    def report(self) -> dict:
+        """Aggregate throughput and latency of the last run."""
+        return {
+            "workers": self.workers,
+            "completed": self.completed,
+            "failed": self.failed,
+            "restarts": self.restarts,
+            "elapsed_s": self.elapsed,
+            "tasks_per_sec": (self.completed + self.failed) / self.elapsed if self.elapsed else 0.0,
+            **latency_summary(self._latencies),
+        }